@@ -1,1115 +1,1620 @@
-import os
-import shutil
-import re
-import time
-import json
-
-PROJECTS_DIR = "projects"
-TRASH_DIR = ".trash"
-TRASH_PROJECTS = os.path.join(TRASH_DIR, "projects")
-TRASH_TASKS = os.path.join(TRASH_DIR, "tasksfiles")
-TRASH_MANIFEST = os.path.join(TRASH_DIR, "manifest.json")
-
-class ProjectAgent:
-    def __init__(self):
-            self.current_project = None 
-            self.current_tasks_file = None
-            self.pending_delete = None
-            self.undo_stack = []
-            self._init_trash()
-            self.setup_tools()
-            self.messages = [
-                {
-                    "role": "system",
-                    "content": (
-                        "Eres un agente que gestiona proyectos. "
-                        "Debes usar select_project antes de trabajar en un proyecto."
-                    )
-                }
-            ]   
-            
-    def _init_trash(self):
-        os.makedirs(TRASH_PROJECTS, exist_ok=True)
-        os.makedirs(TRASH_TASKS, exist_ok=True)
-        if not os.path.exists(TRASH_MANIFEST):
-            with open(TRASH_MANIFEST, "w") as f:
-                json.dump([], f)
-                
-    def _log_trash(self, entry):
-        with open(TRASH_MANIFEST, "r+", encoding="utf-8") as f:
-            data = json.load(f)
-            data.append(entry)
-            f.seek(0)
-            json.dump(data, f, indent=2)
-            f.truncate()
-
-    def _pop_last_trash(self):
-        with open(TRASH_MANIFEST, "r+", encoding="utf-8") as f:
-            data = json.load(f)
-            if not data:
-                return None
-            entry = data.pop()
-            f.seek(0)
-            json.dump(data, f, indent=2)
-            f.truncate()
-            return entry
-
-    def setup_tools(self):
-        self.tools = [
-                        {
-                ############PROJECTS##############
-                
-                #Create project
-                "type": "function",
-                "name": "create_project",
-                "description": (
-                    "Crea un nuevo proyecto si no existe y lo selecciona automáticamente"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "project": {
-                            "type": "string",
-                            "description": "Nombre del proyecto a crear"
-                        }
-                    },
-                    "required": ["project"]
-                }
-            },
-            {
-                #Select project
-                "type": "function",
-                "name": "select_project",
-                "description": (
-                    "Selecciona el proyecto activo sobre el que trabajará el agente a partir de ahora"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "project": {
-                            "type": "string",
-                            "description": "Nombre del proyecto a seleccionar"
-                        }
-                    },
-                    "required": ["project"]
-                }
-            },
-             {
-                #Summarize Project
-                "type": "function",
-                "name": "summarize_project",
-                "description": (
-                    "Genera un resumen del archivo de tareas activo del proyecto"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {}
-                }
-            },
-             {
-                 #Rename Project
-                "type": "function",
-                "name": "rename_project",
-                "description": (
-                    "Renombra el proyecto actualmente seleccionado cambiando el nombre "
-                    "de su carpeta dentro del directorio projects/"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "new_name": {
-                            "type": "string",
-                            "description": "Nuevo nombre para el proyecto"
-                        }
-                    },
-                    "required": ["new_name"]
-                }
-            },
-
-            {
-                #Delete Project
-                "type": "function",
-                "name": "delete_project",
-                "description": (
-                    "Solicita la eliminación del proyecto actualmente seleccionado "
-                    "y pide confirmación antes de borrar"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {}
-                }
-            },
-            {
-                #Confirm Delete
-                "type": "function",
-                "name": "confirm_delete",
-                "description": (
-                    "Confirma y ejecuta la eliminación del proyecto previamente marcado"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {}
-                }
-            },
-            {
-                #Cancel Delete
-                "type": "function",
-                "name": "cancel_delete",
-                "description": (
-                    "Cancela la eliminación de un proyecto que estaba pendiente de confirmación"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {}
-                }
-            },
-            {
-                #########FILES########
-                
-                #List files
-                "type": "function",
-                "name": "list_files",
-                "description": (
-                    "Lista los archivos del proyecto actualmente seleccionado"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {}
-                }
-            },
-            {
-                #Read Files
-                "type": "function",
-                "name": "read_file",
-                "description": (
-                    "Lee el contenido de un archivo dentro del proyecto seleccionado"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "filename": {
-                            "type": "string",
-                            "description": "Nombre del archivo a leer (ej: tasks.md)"
-                        }
-                    },
-                    "required": ["filename"]
-                }
-            },
-            {
-                #Edit Files
-                "type": "function",
-                "name": "edit_file",
-                "description": (
-                    "Edita o crea un archivo dentro del proyecto seleccionado, "
-                    "reemplazando texto o escribiendo contenido nuevo"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "filename": {
-                            "type": "string",
-                            "description": "Nombre del archivo (ej: tasks.md)"
-                        },
-                        "prev_text": {
-                            "type": "string",
-                            "description": "Texto a reemplazar (vacío si es archivo nuevo)",
-                            "default": ""
-                        },
-                        "new_text": {
-                            "type": "string",
-                            "description": "Texto nuevo a escribir"
-                        }
-                    },
-                    "required": ["filename", "new_text"]
-                }
-            },
-                ###########Tasks###############
-            
-            {
-                #Create Task File
-                "type": "function",
-                "name": "create_tasks_file",
-                "description": (
-                    "Crea un nuevo archivo de tareas dentro del proyecto seleccionado "
-                    "y lo establece como el archivo de tareas activo"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "filename": {
-                            "type": "string",
-                            "description": "Nombre del archivo de tareas (ej: backend_tasks.md)"
-                        }
-                    },
-                    "required": ["filename"]
-                }
-            },
-            {
-                #Select Task File
-                "type": "function",
-                "name": "select_tasks_file",
-                "description": (
-                    "Selecciona un archivo de tareas existente como el archivo de tareas activo "
-                    "dentro del proyecto actual"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "filename": {
-                            "type": "string",
-                            "description": "Nombre del archivo de tareas a seleccionar"
-                        }
-                    },
-                    "required": ["filename"]
-                }
-            },
-
-            {
-                
-                #Create Task
-                "type": "function",
-                "name": "create_task",
-                "description": (
-                    "Agrega una nueva tarea al archivo tasks.md del proyecto seleccionado"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "task": {
-                            "type": "string",
-                            "description": "Descripción de la tarea"
-                        }
-                    },
-                    "required": ["task"]
-                }
-            },
-            {
-                #Listar Tasks
-                "type": "function",
-                "name": "list_tasks",
-                "description": (
-                    "Lista las tareas del archivo tasks.md del proyecto seleccionado, "
-                    "incluyendo su estado (pendiente o completada)"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {}
-                }
-            },
-            {
-                #Complete Task
-                "type": "function",
-                "name": "complete_task",
-                "description": (
-                    "Marca una tarea como completada [x] en el archivo tasks.md "
-                    "del proyecto seleccionado"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "task": {
-                            "type": "string",
-                            "description": "Texto exacto de la tarea a completar"
-                        }
-                    },
-                    "required": ["task"]
-                }
-            },
-            {
-                #Delete Task
-                "type": "function",
-                "name": "delete_task_file",
-                "description": (
-                    "Elimina un archivo de tareas específico dentro del proyecto seleccionado "
-                    "(por ejemplo: frontend_tasks.md o tasks.md). "
-                    "No afecta a otros archivos ni al proyecto completo."
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "filename": {
-                            "type": "string",
-                            "description": "Nombre exacto del archivo de tareas a eliminar"
-                        }
-                    },
-                    "required": ["filename"]
-                }
-            },
-            {
-                #Rename Task File
-                "type": "function",
-                "name": "rename_task_file",
-                "description": (
-                    "Renombra un archivo de tareas dentro del proyecto seleccionado "
-                    "(por ejemplo: tasks.md → backend_tasks.md)"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "old_name": {
-                            "type": "string",
-                            "description": "Nombre actual del archivo (ej: tasks.md)"
-                        },
-                        "new_name": {
-                            "type": "string",
-                            "description": "Nuevo nombre del archivo (ej: backend_tasks.md)"
-                        }
-                    },
-                    "required": ["old_name", "new_name"]
-                }
-            },
-            ################# UNDO ########################
-            
-            ##Eliminación###
-            #Undo Delete
-            {
-                "type": "function",
-                "name": "undo_delete",
-                "description": (
-                    "Deshace la última eliminación (proyecto o archivo) "
-                    "restaurándolo desde la papelera"
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {}
-                }
-                },
-                {
-                #Restore From Trash
-                    
-                "type": "function",
-                "name": "restore_from_trash",
-                "description": (
-                    "Restaura el último proyecto o archivo eliminado desde la papelera. "
-                    "Si existe un conflicto de nombre, se restaurará con un sufijo automático."
-                ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {}
-                }
-                },
-                {
-                 #Undo Last Action
-                "type": "function",
-                "name": "undo_last_action",
-                "description": (
-                    "Deshace la última eliminación realizada durante esta sesión, "
-                    "restaurando el proyecto o archivo eliminado más recientemente."
-                    ),
-                "parameters": {
-                    "type": "object",
-                    "properties": {}
-                    }
-                }
-
-
-
-        ]
-
- ########PROJECTS#########
-    
-    #Create Project
-    def create_project(self, project):
-        if not re.match(r'^[a-zA-Z0-9_-]+$', project):
-            return "Nombre de proyecto inválido. Usa solo letras, números, guiones y underscores."
-
-        path = f"{PROJECTS_DIR}/{project}"
-        
-        if os.path.isdir(path):
-            return f"El proyecto '{project}' ya existe."
-        
-        os.makedirs(path)
-        tasks_path = f"{path}/tasks.md"
-        with open(tasks_path, "w", encoding="utf-8") as f:
-            f.write("# Tareas del proyecto\n\n")
-        
-        self.current_project = project
-        self.current_tasks_file = "tasks.md"
-        
-        self.undo_stack.append(
-            {
-            "action": "create_project",
-            "payload": {
-                "project": project
-            }
-            })
-
-
-        return f"Proyecto '{project}' creado y seleccionado."
-    
-    #Select Project
-    def select_project(self, project):
-        path = f"projects/{project}"
-        self.current_tasks_file = None
-
-        if not os.path.isdir(path):
-            return f"El proyecto '{project}' no existe."
-
-        self.current_project = project
-        return f"Proyecto activo: {project}"
-    
-    #Rename Project
-    def rename_project(self, new_name):
-        if not self.current_project:
-            return "No hay proyecto seleccionado."
-        if not re.match(r'^[a-zA-Z0-9_-]+$', new_name):
-            return "Nombre de proyecto inválido."
-
-        old_path = os.path.join(PROJECTS_DIR, self.current_project)
-        new_path = os.path.join(PROJECTS_DIR, new_name)
-
-        if not os.path.isdir(old_path):
-            return f"El proyecto '{self.current_project}' no existe."
-
-        if os.path.exists(new_path):
-            return f"Ya existe un proyecto llamado '{new_name}'."
-        
-        old_name = self.current_project
-
-        os.rename(old_path, new_path)
-        
-        self.current_project = new_name
-        
-        self.undo_stack.append(
-        {
-        "action": "rename_project",
-        "payload": {
-            "old_name": old_name,
-            "new_name": new_name
-                     }
-        })
-
-
-        return f"Proyecto '{old_name}' renombrado a '{new_name}'."
-
-    #Delete Project
-    def delete_project(self):
-        if not self.current_project:
-            return "No hay proyecto seleccionado."
-
-        self.pending_delete = {
-        "type": "project",
-        "name": self.current_project
-        }
-
-        return (
-            f"¿Estás seguro que deseas eliminar el proyecto "
-            f"'{self.current_project}'?\n"
-            f"Escribe 'confirmar' para continuar."
-        )
-    
-    #Confirm Delete
-    def confirm_delete(self):   
-        if not self.pending_delete:
-            return "No hay ninguna eliminación pendiente."
-
-        if self.pending_delete["type"] == "project":
-            project = self.pending_delete["name"]
-            src = os.path.join(PROJECTS_DIR, project)
-
-            timestamp = int(time.time())
-            trash_name = f"{project}__{timestamp}"
-            dst = os.path.join(TRASH_PROJECTS, trash_name)
-
-            shutil.move(src, dst)
-
-            self._log_trash({
-                "type": "project",
-                "original_name": project,
-                "trash_name": trash_name,
-                "timestamp": timestamp
-                })
-
-            self.current_project = None
-            self.current_tasks_file = None
-
-            self.pending_delete = None
-            return "Proyecto movido a la papelera."
-        
-    #Cancel Delete
-    def cancel_delete(self):
-        if not self.pending_delete:
-            return "No hay ninguna eliminación pendiente que cancelar."
-
-        cancelled = self.pending_delete
-        self.pending_delete = None
-
-        return f"Eliminación del proyecto '{cancelled['name']}' cancelada."
-    
-    #Summarize Project
-    def summarize_project(self):
-        tasks_file = self._get_tasks_file()
-        if not tasks_file or not os.path.exists(tasks_file):
-            return "No hay archivo de tareas activo."
-        
-        with open(tasks_file, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        total = content.count("- [")
-        completed = content.count("- [x]")
-        pending = total - completed
-
-        return (
-            f"Estado del proyecto '{self.current_project}':\n"
-            f"- Total: {total}\n"
-            f"- Completadas: {completed}\n"
-            f"- Pendientes: {pending}"
-        )
-
-    #########FILES###############
-    
-    #list Files
-    def list_files(self):
-        if not self.current_project:
-            return "No hay proyecto seleccionado."
-
-        path = f"projects/{self.current_project}"
-        return os.listdir(path)
-
-    #Read Files
-    def read_file(self, filename):
-        if not self.current_project:
-            return "No hay proyecto seleccionado."
-
-        path = f"projects/{self.current_project}/{filename}"
-
-        if not os.path.exists(path):
-            return "El archivo no existe."
-
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read()
-
-    #Edit Files
-    def edit_file(self, filename, prev_text="", new_text=""):
-        if not self.current_project:
-            return "No hay proyecto seleccionado."
-
-        path = os.path.join(PROJECTS_DIR, self.current_project, filename)
-
-        existed = os.path.exists(path)
-        before_content = ""
-
-        if existed:
-            with open(path, "r", encoding="utf-8") as f:
-                before_content = f.read()
-            content = before_content.replace(prev_text, new_text)
-        else:
-            content = new_text
-
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(content)
-
-        #Registrar undo
-        self.undo_stack.append({
-            "action": "edit_file",
-            "payload": {
-                "project": self.current_project,
-                "filename": filename,
-                "before": before_content,
-                "existed": existed
-            }
-        })
-
-        return f"✏️ Archivo '{filename}' actualizado."
-
-    ################TASKS##################
-    
-    #Create Tasks Files
-    def create_tasks_file(self, filename):
-        if not self.current_project:
-            return "No hay proyecto seleccionado."
-
-        if not filename.endswith(".md"):
-            return "El archivo debe tener extensión .md"
-
-        project_path = os.path.join(PROJECTS_DIR, self.current_project)
-        file_path = os.path.join(project_path, filename)
-
-        if os.path.exists(file_path):
-            return f"El archivo '{filename}' ya existe."
-
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write("# Tareas\n\n")
-
-        self.current_tasks_file = filename
-        
-        self.undo_stack.append({
-            "action": "create_tasks_file",
-            "payload": {
-                "project": self.current_project,
-                "filename": filename
-            }
-        })
-
-        return f"📄 Archivo de tareas '{filename}' creado y activado."
-    
-    #Select Tasks File
-    def select_tasks_file(self, filename):
-        if not self.current_project:
-            return "No hay proyecto seleccionado."
-
-        project_path = os.path.join(PROJECTS_DIR, self.current_project)
-        file_path = os.path.join(project_path, filename)
-
-        if not os.path.isfile(file_path):
-            return f"El archivo '{filename}' no existe."
-
-        self.current_tasks_file = filename
-       
-
-        return f"Archivo de tareas activo: {filename}"
-
-    #Create Task
-    def create_task(self, task):
-        tasks_file = self._get_tasks_file()
-
-        with open(tasks_file, "a", encoding="utf-8") as f:
-            f.write(f"- [ ] {task}\n")
-        self.undo_stack.append({
-        "action": "create_task",
-        "payload": {
-            "project": self.current_project,
-            "tasks_file": self.current_tasks_file,
-            "task": task
-        }
-    })
-
-
-        return f"Tarea creada: {task}"
-    
-    #Get Tasks Files
-    def _get_tasks_file(self):
-        if not self.current_project:
-            return None
-
-        if not self.current_tasks_file:
-            return None
-
-        return os.path.join(
-            PROJECTS_DIR,
-            self.current_project,
-            self.current_tasks_file
-        )
-
-    #List Tasks
-    def list_tasks(self):
-        if not self.current_project or not self.current_tasks_file:
-            return "No hay archivo de tareas activo."
-
-        tasks_file = self._get_tasks_file()
-
-        if not os.path.exists(tasks_file):
-            return "No hay archivo de tareas."
-
-        tasks = []
-
-        with open(tasks_file, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith("- [ ]"):
-                    tasks.append({"task": line[6:], "status": "pending"})
-                elif line.startswith("- [x]"):
-                    tasks.append({"task": line[6:], "status": "completed"})
-
-        if not tasks:
-            return "No hay tareas."
-
-        lines = []
-        for i, t in enumerate(tasks, 1):
-            status = "[x]" if t["status"] == "completed" else "[]"
-            lines.append(f"{i}. {status} {t['task']}")
-
-        return "\n".join(lines)
-    
-    #Complete Task
-    def complete_task(self, task):
-        tasks_file = self._get_tasks_file()
-        
-
-        with open(tasks_file, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        if f"- [ ] {task}" not in content:
-            return "La tarea no existe o ya está completada."
-
-        updated = content.replace(f"- [ ] {task}", f"- [x] {task}")
-
-        with open(tasks_file, "w", encoding="utf-8") as f:
-            f.write(updated)
-        self.undo_stack.append({
-            "action": "complete_task",
-            "payload": {
-                "project": self.current_project,
-                "tasks_file": self.current_tasks_file,
-                "task": task
-            }
-        })
-
-        return f"Tarea completada: {task}"
-    
-    #Delete Task File
-    def delete_task_file(self, filename):
-        
-        if not self.current_project:
-            return "No hay proyecto seleccionado."
-
-        project_path = os.path.join(PROJECTS_DIR, self.current_project)
-        src = os.path.join(project_path, filename)
-        
-        if not os.path.isfile(src):
-            return f"El archivo '{filename}' no existe."
-
-        timestamp = int(time.time())
-        dst_name = f"{filename}__{timestamp}"
-        dst = os.path.join(TRASH_TASKS, dst_name)
-
-        shutil.move(src, dst)
-
-        self._log_trash({
-            "type": "task_file",
-            "original_name": filename,
-            "project": self.current_project,
-            "trash_name": dst_name,
-            "timestamp": timestamp
-        })
-
-        if self.current_tasks_file == filename:
-            self.current_tasks_file = None
-
-        return f"Archivo '{filename}' movido a la papelera."
-
-    #Rename Task File
-    def rename_task_file(self, old_name, new_name):
-        if not self.current_project:
-            return "No hay proyecto seleccionado."
-
-        if not old_name.endswith(".md") or not new_name.endswith(".md"):
-            return "Solo se pueden renombrar archivos .md"
-
-        project_path = os.path.join(PROJECTS_DIR, self.current_project)
-        old_path = os.path.join(project_path, old_name)
-        new_path = os.path.join(project_path, new_name)
-
-        if not os.path.isfile(old_path):
-            return f"El archivo '{old_name}' no existe."
-
-        if os.path.exists(new_path):
-            return f"Ya existe un archivo llamado '{new_name}'."
-
-        os.rename(old_path, new_path)
-        self.undo_stack.append(
-            {
-        "action": "rename_task_file",
-        "payload": {
-        "project": self.current_project,
-        "old_name": old_name,
-        "new_name": new_name
-                    }
-            })
-
-        if self.current_tasks_file == old_name:
-            self.current_tasks_file = new_name
-
-
-        return f"Archivo renombrado: {old_name} → {new_name}"
-
-    ##################### UNDO ##########################
-    
-    #Undo Delete
-    def undo_delete(self):
-        entry = self._pop_last_trash()
-        if not entry:
-            return "No hay eliminaciones para deshacer."
-
-        if entry["type"] == "project":
-            src = os.path.join(TRASH_PROJECTS, entry["trash_name"])
-            dst = os.path.join(PROJECTS_DIR, entry["original_name"])
-        else:
-            src = os.path.join(TRASH_TASKS, entry["trash_name"])
-            dst = os.path.join(
-                PROJECTS_DIR,
-                entry["project"],
-                entry["original_name"]
-            )
-            
-        dst = self._resolve_restore_collision(dst)
-        shutil.move(src, dst)
-        
-        if entry["type"] == "project":
-            self.current_project = entry["original_name"]
-            self.current_tasks_file = None
-
-        if entry["type"] == "task_file":
-            self.current_project = entry["project"]
-            self.current_tasks_file = entry["original_name"]
-                    
-        return f"Restaurado: {entry['original_name']}"
-    
-    #Resolve Restore Collision
-    def _resolve_restore_collision(self, path):
-        if not os.path.exists(path):
-            return path
-
-        base, ext = os.path.splitext(path)
-        i = 1
-        while os.path.exists(f"{base}_restored({i}){ext}"):
-            i += 1
-        return f"{base}_restored({i}){ext}"
-   
-    #Restore From Trash
-    def restore_from_trash(self):
-        return self.undo_delete()
-
-
-    #Undo Last Action
-    def undo_last_action(self):
-        if not self.undo_stack:
-            return "No hay acciones para deshacer."
-
-        action_entry = self.undo_stack.pop()
-        action = action_entry.get("action")
-        payload = action_entry.get("payload", {})
-
-        # Undo rename project
-        if action == "rename_project":
-            old_name = payload["old_name"]
-            new_name = payload["new_name"]
-
-            old_path = os.path.join(PROJECTS_DIR, old_name)
-            new_path = os.path.join(PROJECTS_DIR, new_name)
-
-            if not os.path.isdir(new_path):
-                return "No se puede deshacer: la carpeta ya no existe."
-
-            if os.path.exists(old_path):
-                return "No se puede deshacer: el nombre original ya existe."
-
-            os.rename(new_path, old_path)
-            if self.current_project == new_name:
-                self.current_project = old_name
-
-            return f"Proyecto restaurado: {new_name} → {old_name}"
-
-        # Undo create project
-        if action == "create_project":
-            project = payload["project"]
-            path = os.path.join(PROJECTS_DIR, project)
-
-            if os.path.isdir(path):
-                shutil.rmtree(path)
-
-            if self.current_project == project:
-                self.current_project = None
-                self.current_tasks_file = None
-
-            return f"Proyecto '{project}' eliminado (undo create)."
-
-        # Undo edit file
-        if action == "edit_file":
-            path = os.path.join(
-                PROJECTS_DIR,
-                payload["project"],
-                payload["filename"]
-            )
-
-            if payload["existed"]:
-                with open(path, "w", encoding="utf-8") as f:
-                    f.write(payload["before"])
-                return f"Cambios revertidos en '{payload['filename']}'."
-            else:
-                if os.path.exists(path):
-                    os.remove(path)
-                return f"Archivo '{payload['filename']}' eliminado (undo edit)."
-        
-        # Undo create tasks file
-        if action == "create_tasks_file":
-            project = payload["project"]
-            filename = payload["filename"]
-
-            path = os.path.join(PROJECTS_DIR, project, filename)
-
-            if os.path.exists(path):
-                os.remove(path)
-
-            if self.current_tasks_file == filename:
-                self.current_tasks_file = None
-
-            return f"Archivo de tareas '{filename}' eliminado (undo create)."
-
-        # Undo rename task file
-        if action == "rename_task_file":
-            project = payload["project"]
-            old_name = payload["old_name"]
-            new_name = payload["new_name"]
-
-            project_path = os.path.join(PROJECTS_DIR, project)
-            new_path = os.path.join(project_path, new_name)
-            old_path = os.path.join(project_path, old_name)
-
-            if os.path.exists(new_path):
-                os.rename(new_path, old_path)
-
-            if self.current_tasks_file == new_name:
-                self.current_tasks_file = old_name
-
-            return f"Archivo restaurado: {new_name} → {old_name}"
-
-        # Undo complete task
-        if action == "complete_task":
-            path = os.path.join(
-                PROJECTS_DIR,
-                payload["project"],
-                payload["tasks_file"]
-            )
-
-            with open(path, "r", encoding="utf-8") as f:
-                content = f.read()
-
-            content = content.replace(
-                f"- [x] {payload['task']}",
-                f"- [ ] {payload['task']}"
-            )
-
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(content)
-
-            return f"Tarea desmarcada: {payload['task']}"
-
-        # Undo create task
-        if action == "create_task":
-            path = os.path.join(
-                PROJECTS_DIR,
-                payload["project"],
-                payload["tasks_file"]
-            )
-
-            with open(path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-
-            task_line = f"- [ ] {payload['task']}\n"
-            if task_line in lines:
-                lines.remove(task_line)
-
-            with open(path, "w", encoding="utf-8") as f:
-                f.writelines(lines)
-
-            return f"Tarea eliminada: {payload['task']}"
-
-        return "Acción no reversible."
-
-
-####################### PROCESS RESPONSE #################################
-  
-    def process_response(self, response):
-        self.messages += response.output
-
-        for output in response.output:
-            if output.type == "function_call":
-                fn_name = output.name
-                args = json.loads(output.arguments)
-                
-
-                if self.pending_delete and fn_name not in ("confirm_delete", "cancel_delete","restore_from_trash","undo_delete"):
-                    return "Debes confirmar o cancelar la eliminación pendiente."
-
-
-                project_required = (
-                    "list_files", "read_file", "edit_file",
-                    "create_tasks_file", "select_tasks_file",
-                    "create_task", "list_tasks", "complete_task",
-                    "delete_task_file", "rename_task_file", "rename_project"
-                )
-
-                if fn_name in project_required and not self.current_project:
-                    result = "Debes seleccionar un proyecto primero."
-
-                    self.messages.append({
-                        "type": "function_call_output",
-                        "call_id": output.call_id,
-                        "output": json.dumps({"result": result})
-                    })
-                    return True
-
-                tasks_required = (
-                    "create_task", "list_tasks","complete_task"
-                    )
-
-                if fn_name in tasks_required and not self.current_tasks_file:
-                    result = "Debes seleccionar o crear un archivo de tareas primero."
-
-                    self.messages.append({
-                        "type": "function_call_output",
-                        "call_id": output.call_id,
-                        "output": json.dumps({"result": result})
-                    })
-                    return True
-            
-                #Projects
-                
-                if fn_name == "create_project":
-                    result = self.create_project(**args)
-                elif fn_name == "select_project":
-                    result = self.select_project(**args)
-                elif fn_name == "rename_project":
-                    result = self.rename_project(**args)
-                elif fn_name == "delete_project":
-                    result = self.delete_project()
-                elif fn_name == "confirm_delete":
-                    result = self.confirm_delete()
-                elif fn_name == "cancel_delete":
-                    result = self.cancel_delete()
-                elif fn_name == "summarize_project":
-                    result = self.summarize_project()
-                    
-                #files
-                
-                elif fn_name == "list_files":
-                    result = self.list_files()
-                elif fn_name == "read_file":
-                    result = self.read_file(**args)
-                elif fn_name == "edit_file":
-                    result = self.edit_file(**args)
-                    
-                #Tasks
-                
-                elif fn_name == "create_tasks_file":
-                    result = self.create_tasks_file(**args)
-                elif fn_name == "select_tasks_file":
-                    result = self.select_tasks_file(**args)
-                elif fn_name == "create_task":
-                    result = self.create_task(**args)
-                elif fn_name == "list_tasks":
-                    result = self.list_tasks()
-                elif fn_name == "complete_task":
-                    result = self.complete_task(**args)
-                elif fn_name == "delete_task_file":
-                    result = self.delete_task_file(**args)
-                elif fn_name == "rename_task_file":
-                    result = self.rename_task_file(**args)
-                    
-                    #UNDO
-                    
-                elif fn_name == "undo_delete":
-                    result = self.undo_delete()
-                elif fn_name == "restore_from_trash":
-                    result = self.restore_from_trash()
-                elif fn_name == "undo_last_action":
-                    result = self.undo_last_action()
-                else:
-                    result = "Herramienta no reconocida"
-                
-                self.messages.append({
-                    "type": "function_call_output",
-                    "call_id": output.call_id,
-                    "output": json.dumps({"result": result})
-                })
-
-                return True
-
-            elif output.type == "message":
-                reply = "\n".join(part.text for part in output.content)
-                print(f"Asistente: {reply}")
-
-        return False
-
-
+import os
+import shutil
+import re
+import time
+import json
+import asyncio
+import threading
+from itertools import islice
+from concurrent.futures import Future, ThreadPoolExecutor, wait as futures_wait
+from context import ContextManager
+import taskfile
+import textfile
+import writebuffer
+import taskdb
+import counters
+import search
+import trash
+from undo import UndoStack
+import tools
+from tools import tool, FREE, FILE, TASKS, SESSION, FLUSH_FILE, FLUSH_PROJECT
+
+PROJECTS_DIR = "projects"
+TRASH_DIR = ".trash"
+TRASH_PROJECTS = os.path.join(TRASH_DIR, "projects")
+TRASH_TASKS = os.path.join(TRASH_DIR, "tasksfiles")
+TRASH_MANIFEST = os.path.join(TRASH_DIR, "manifest.json")
+TRASH_JOURNAL = os.path.join(TRASH_DIR, "journal.jsonl")
+TRASH_UNDO = os.path.join(TRASH_DIR, "undo")
+INDEX_DIR = ".index"
+SEARCH_INDEX = os.path.join(INDEX_DIR, "search.sqlite")
+TASK_STATS = os.path.join(INDEX_DIR, "stats.json")
+TASKS_DB = os.getenv("AGENT_STORAGE_DB", os.path.join(".data", "tasks.sqlite"))
+
+# Tamaño de página de list_tasks
+LIST_LIMIT = 50
+LIST_MAX_LIMIT = 200
+
+TOOL_WORKERS = int(os.getenv("AGENT_TOOL_WORKERS", "4"))
+TOOL_POOL = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+# Prefijo estático de cada petición: debe ser idéntico en todas las llamadas
+# para que el caché de prompt del proveedor acierte
+SYSTEM_PROMPT = (
+    "Eres un agente que gestiona proyectos. "
+    "Debes usar select_project antes de trabajar en un proyecto."
+)
+
+def format_user_message(text):
+    return {
+        "role": "user",
+        "content": [
+            {"type": "input_text", "text": text}
+        ]
+    }
+
+@tools.register
+class ProjectAgent:
+    def __init__(self):
+            self.current_project = None 
+            self.current_tasks_file = None
+            self.pending_delete = None
+            self.echo = True
+            self.replies = []
+            self.undo_stack = UndoStack(TRASH_UNDO)
+            # Almacenamiento de las tareas: los .md directamente (taskfile),
+            # los .md con escrituras acumuladas hasta el final del turno
+            # (AGENT_WRITE_BEHIND) o una base SQLite (AGENT_STORAGE=sqlite)
+            self.tasks_io = (
+                taskdb.storage_from_env(TASKS_DB)
+                or writebuffer.buffer_from_env()
+                or taskfile
+            )
+            self.counters = counters.open_counters(TASK_STATS, PROJECTS_DIR)
+            self.context = ContextManager()
+            # Con AGENT_CHAIN=1: (id de la última respuesta del modelo, su
+            # último item en messages); lo mantiene ModelClient
+            self.chain = None
+            self._init_trash()
+            self.messages = [
+                {
+                    "role": "system",
+                    "content": SYSTEM_PROMPT
+                }
+            ]   
+            
+    def _init_trash(self):
+        os.makedirs(TRASH_PROJECTS, exist_ok=True)
+        os.makedirs(TRASH_TASKS, exist_ok=True)
+        # El manifest.json antiguo se migra al diario la primera vez
+        self.trash = trash.open_journal(TRASH_JOURNAL, legacy_manifest=TRASH_MANIFEST)
+                
+    def _log_trash(self, entry):
+        self.trash.push(entry)
+
+    def _pop_last_trash(self):
+        return self.trash.pop()
+
+    # Avisos a tasks_io y a los contadores de que un archivo de tareas o la
+    # carpeta de un proyecto cambió de sitio o desapareció
+    def _moved(self, old, new):
+        self.tasks_io.moved(old, new)
+        self.counters.moved(old, new)
+
+    def _removed(self, path):
+        self.tasks_io.removed(path)
+        self.counters.removed(path)
+
+    def _count(self, path):
+        # Contadores de `path` tras escribirlo (el TaskFile ya los lleva al día)
+        self.counters.update(path, self.tasks_io.load(path))
+
+ ########PROJECTS#########
+    
+    #Create Project
+    @tool(
+        "Crea un nuevo proyecto si no existe y lo selecciona automáticamente",
+        properties={
+            "project": {
+                "type": "string",
+                "description": "Nombre del proyecto a crear"
+            }
+        },
+        required=["project"],
+        flush=None
+    )
+    def create_project(self, project):
+        if not re.match(r'^[a-zA-Z0-9_-]+$', project):
+            return "Nombre de proyecto inválido. Usa solo letras, números, guiones y underscores."
+
+        path = f"{PROJECTS_DIR}/{project}"
+        
+        if os.path.isdir(path):
+            return f"El proyecto '{project}' ya existe."
+        
+        os.makedirs(path)
+        tasks_path = f"{path}/tasks.md"
+        with open(tasks_path, "w", encoding="utf-8") as f:
+            f.write("# Tareas del proyecto\n\n")
+        
+        self.current_project = project
+        self.current_tasks_file = "tasks.md"
+        
+        self.undo_stack.append(
+            {
+            "action": "create_project",
+            "payload": {
+                "project": project
+            }
+            })
+
+
+        return f"Proyecto '{project}' creado y seleccionado."
+    
+    #Select Project
+    @tool(
+        "Selecciona el proyecto activo sobre el que trabajará el agente a partir de ahora",
+        properties={
+            "project": {
+                "type": "string",
+                "description": "Nombre del proyecto a seleccionar"
+            }
+        },
+        required=["project"],
+        flush=None
+    )
+    def select_project(self, project):
+        path = f"projects/{project}"
+        self.current_tasks_file = None
+
+        if not os.path.isdir(path):
+            return f"El proyecto '{project}' no existe."
+
+        self.current_project = project
+        return f"Proyecto activo: {project}"
+    
+    #Rename Project
+    @tool(
+        (
+            "Renombra el proyecto actualmente seleccionado cambiando el nombre "
+            "de su carpeta dentro del directorio projects/"
+        ),
+        properties={
+            "new_name": {
+                "type": "string",
+                "description": "Nuevo nombre para el proyecto"
+            }
+        },
+        required=["new_name"],
+        project_required=True,
+        flush=FLUSH_PROJECT
+    )
+    def rename_project(self, new_name):
+        if not self.current_project:
+            return "No hay proyecto seleccionado."
+        if not re.match(r'^[a-zA-Z0-9_-]+$', new_name):
+            return "Nombre de proyecto inválido."
+
+        old_path = os.path.join(PROJECTS_DIR, self.current_project)
+        new_path = os.path.join(PROJECTS_DIR, new_name)
+
+        if not os.path.isdir(old_path):
+            return f"El proyecto '{self.current_project}' no existe."
+
+        if os.path.exists(new_path):
+            return f"Ya existe un proyecto llamado '{new_name}'."
+        
+        old_name = self.current_project
+
+        os.rename(old_path, new_path)
+        self._moved(old_path, new_path)
+        
+        self.current_project = new_name
+        
+        self.undo_stack.append(
+        {
+        "action": "rename_project",
+        "payload": {
+            "old_name": old_name,
+            "new_name": new_name
+                     }
+        })
+
+
+        return f"Proyecto '{old_name}' renombrado a '{new_name}'."
+
+    #Delete Project
+    @tool(
+        (
+            "Solicita la eliminación del proyecto actualmente seleccionado "
+            "y pide confirmación antes de borrar"
+        ),
+        flush=None
+    )
+    def delete_project(self):
+        if not self.current_project:
+            return "No hay proyecto seleccionado."
+
+        self.pending_delete = {
+        "type": "project",
+        "name": self.current_project
+        }
+
+        return (
+            f"¿Estás seguro que deseas eliminar el proyecto "
+            f"'{self.current_project}'?\n"
+            f"Escribe 'confirmar' para continuar."
+        )
+    
+    #Confirm Delete
+    @tool(
+        "Confirma y ejecuta la eliminación del proyecto previamente marcado",
+        allowed_pending=True,
+        flush=FLUSH_PROJECT
+    )
+    def confirm_delete(self):   
+        if not self.pending_delete:
+            return "No hay ninguna eliminación pendiente."
+
+        if self.pending_delete["type"] == "project":
+            project = self.pending_delete["name"]
+            src = os.path.join(PROJECTS_DIR, project)
+
+            timestamp = int(time.time())
+            trash_name = f"{project}__{timestamp}"
+            dst = os.path.join(TRASH_PROJECTS, trash_name)
+
+            shutil.move(src, dst)
+            # Fuera de PROJECTS_DIR los contadores se olvidan (ver counters)
+            self.tasks_io.removed(src)
+            self.counters.moved(src, dst)
+
+            self._log_trash({
+                "type": "project",
+                "original_name": project,
+                "trash_name": trash_name,
+                "timestamp": timestamp
+                })
+
+            self.current_project = None
+            self.current_tasks_file = None
+
+            self.pending_delete = None
+            return "Proyecto movido a la papelera."
+        
+    #Cancel Delete
+    @tool(
+        "Cancela la eliminación de un proyecto que estaba pendiente de confirmación",
+        allowed_pending=True,
+        flush=None
+    )
+    def cancel_delete(self):
+        if not self.pending_delete:
+            return "No hay ninguna eliminación pendiente que cancelar."
+
+        cancelled = self.pending_delete
+        self.pending_delete = None
+
+        return f"Eliminación del proyecto '{cancelled['name']}' cancelada."
+    
+    #Summarize Project
+    @tool(
+        (
+            "Genera un resumen del archivo de tareas activo del proyecto, "
+            "o de todos sus archivos de tareas con all_files=true"
+        ),
+        properties={
+            "all_files": {
+                "type": "boolean",
+                "description": "Resumir todos los archivos de tareas del proyecto (opcional)"
+            }
+        },
+        scope=TASKS
+    )
+    def summarize_project(self, all_files=False):
+        if all_files:
+            return self._summarize_all_files()
+
+        tasks_file = self._get_tasks_file()
+        if not tasks_file or not os.path.exists(tasks_file):
+            return "No hay archivo de tareas activo."
+
+        tf = self.tasks_io.load(tasks_file)
+
+        return (
+            f"Estado del proyecto '{self.current_project}':\n"
+            f"- Total: {tf.total}\n"
+            f"- Completadas: {tf.completed}\n"
+            f"- Pendientes: {tf.pending}"
+        )
+
+    def _summarize_all_files(self):
+        if not self.current_project:
+            return "No hay proyecto seleccionado."
+        path = os.path.join(PROJECTS_DIR, self.current_project)
+        if not os.path.isdir(path):
+            return f"El proyecto '{self.current_project}' no existe."
+
+        project = self.counters.project(path, self.tasks_io.load)
+        lines = [f"Estado del proyecto '{self.current_project}' ({len(project.files)} archivos):"]
+        for key in sorted(project.files):
+            entry = self.counters.files.get(key)
+            if entry is None:
+                continue
+            lines.append(
+                f"- {os.path.basename(key)}: {entry[2]} tareas, "
+                f"{entry[3]} completadas, {entry[2] - entry[3]} pendientes"
+            )
+        lines += [
+            f"- Total: {project.total}",
+            f"- Completadas: {project.completed}",
+            f"- Pendientes: {project.pending}"
+        ]
+        return "\n".join(lines)
+
+    #Summarize Workspace
+    @tool(
+        "Resume el estado de todos los proyectos: tareas totales, completadas y pendientes",
+        scope=FREE
+    )
+    def summarize_workspace(self):
+        projects = self.counters.workspace(PROJECTS_DIR, self.tasks_io.load)
+        if not projects:
+            return "No hay proyectos."
+
+        total = sum(p.total for p in projects.values())
+        completed = sum(p.completed for p in projects.values())
+        lines = [f"Estado del workspace ({len(projects)} proyectos):"]
+        # Los proyectos con más pendientes primero
+        ranked = sorted(projects.items(), key=lambda item: (-item[1].pending, item[0]))
+        for name, p in ranked[:LIST_LIMIT]:
+            lines.append(
+                f"- {name}: {p.total} tareas, {p.completed} completadas, {p.pending} pendientes"
+            )
+        if len(ranked) > LIST_LIMIT:
+            lines.append(f"- ... y {len(ranked) - LIST_LIMIT} proyectos más")
+        lines += [
+            f"- Total: {total}",
+            f"- Completadas: {completed}",
+            f"- Pendientes: {total - completed}"
+        ]
+        return "\n".join(lines)
+
+    #########FILES###############
+    
+    #list Files
+    @tool(
+        "Lista los archivos del proyecto actualmente seleccionado",
+        scope=FREE,
+        project_required=True,
+        flush=None
+    )
+    def list_files(self):
+        if not self.current_project:
+            return "No hay proyecto seleccionado."
+
+        path = f"projects/{self.current_project}"
+        return os.listdir(path)
+
+    #Read Files
+    @tool(
+        (
+            "Lee el contenido de un archivo dentro del proyecto seleccionado. "
+            "En archivos grandes se puede pedir un rango de líneas; si la salida "
+            "supera max_bytes se corta y se indica cómo seguir"
+        ),
+        properties={
+            "filename": {
+                "type": "string",
+                "description": "Nombre del archivo a leer (ej: tasks.md)"
+            },
+            "start_line": {
+                "type": "integer",
+                "description": "Primera línea a leer, empezando en 1 (opcional)"
+            },
+            "end_line": {
+                "type": "integer",
+                "description": "Última línea a leer, incluida (opcional)"
+            },
+            "max_bytes": {
+                "type": "integer",
+                "description": f"Tamaño máximo de la salida (por defecto {textfile.MAX_READ_BYTES})"
+            },
+            "line_offset": {
+                "type": "integer",
+                "description": "Byte de start_line desde el que empezar, para seguir una línea cortada (opcional)"
+            }
+        },
+        required=["filename"],
+        scope=FILE,
+        project_required=True
+    )
+    def read_file(self, filename, start_line=1, end_line=None, max_bytes=None, line_offset=0):
+        if not self.current_project:
+            return "No hay proyecto seleccionado."
+
+        path = f"projects/{self.current_project}/{filename}"
+
+        if not os.path.exists(path):
+            return "El archivo no existe."
+
+        start_line = max(1, start_line or 1)
+        if end_line is not None and end_line < start_line:
+            return f"Rango vacío: end_line ({end_line}) es menor que start_line ({start_line})."
+
+        max_bytes = max(1, min(max_bytes or textfile.MAX_READ_BYTES, textfile.MAX_READ_BYTES))
+        part = textfile.read_lines(path, start_line, end_line, max_bytes, line_offset or 0)
+
+        if part.binary:
+            return f"El archivo '{filename}' es binario ({part.size} bytes); no se muestra su contenido."
+
+        if part.end < part.start:
+            if part.total is None:
+                return f"El archivo '{filename}' no tiene la línea {part.start}."
+            return f"El archivo '{filename}' tiene {part.total} líneas."
+
+        if not part.truncated:
+            return part.text
+
+        if part.cut is not None:
+            return (
+                f"{part.text}\n"
+                f"[... la línea {part.end} no cabe en {max_bytes} bytes: cortada en su byte "
+                f"{part.cut}; usa start_line={part.end}, line_offset={part.cut} para continuar]"
+            )
+
+        total = f" de {part.total}" if part.total is not None else ""
+        return (
+            f"{part.text.rstrip(chr(10))}\n"
+            f"[... truncado a {max_bytes} bytes: líneas {part.start}-{part.end}{total} "
+            f"({part.size} bytes en total); usa start_line={part.end + 1} para continuar]"
+        )
+
+    #Edit Files
+    @tool(
+        (
+            "Edita o crea un archivo dentro del proyecto seleccionado, "
+            "reemplazando texto o escribiendo contenido nuevo"
+        ),
+        properties={
+            "filename": {
+                "type": "string",
+                "description": "Nombre del archivo (ej: tasks.md)"
+            },
+            "prev_text": {
+                "type": "string",
+                "description": (
+                    "Texto a reemplazar (vacío si es archivo nuevo o para "
+                    "sustituir todo el contenido)"
+                ),
+                "default": ""
+            },
+            "new_text": {
+                "type": "string",
+                "description": "Texto nuevo a escribir"
+            },
+            "count": {
+                "type": "integer",
+                "description": "Máximo de reemplazos (por defecto, todas las apariciones)"
+            }
+        },
+        required=["filename", "new_text"],
+        scope=FILE,
+        project_required=True
+    )
+    def edit_file(self, filename, prev_text="", new_text="", count=None):
+        if not self.current_project:
+            return "No hay proyecto seleccionado."
+
+        path = os.path.join(PROJECTS_DIR, self.current_project, filename)
+
+        existed = os.path.exists(path)
+        snapshot = None
+
+        # El original se guarda para undo justo antes de sustituirlo
+        def keep_original():
+            nonlocal snapshot
+            snapshot = self.undo_stack.snapshot(path)
+
+        try:
+            if existed and prev_text:
+                replaced = textfile.replace_in_file(
+                    path, prev_text.encode("utf-8"), new_text.encode("utf-8"),
+                    count=count if count and count > 0 else None, before=keep_original
+                )
+                if not replaced:
+                    return f"No se encontró el texto a reemplazar en '{filename}'."
+            else:
+                textfile.write_atomic(
+                    path, new_text.encode("utf-8"), before=keep_original if existed else None
+                )
+        except Exception:
+            if snapshot is not None:
+                snapshot.release()
+            raise
+        taskfile.invalidate(path)
+        # No se sabe cuántas tareas cambiaron: se recuentan al pedir un resumen
+        self.counters.invalidate(path)
+
+        #Registrar undo
+        self.undo_stack.append({
+            "action": "edit_file",
+            "payload": {
+                "project": self.current_project,
+                "filename": filename,
+                "snapshot": snapshot,
+                "existed": existed
+            }
+        })
+
+        return f"✏️ Archivo '{filename}' actualizado."
+
+    ################TASKS##################
+    
+    #Create Tasks Files
+    @tool(
+        (
+            "Crea un nuevo archivo de tareas dentro del proyecto seleccionado "
+            "y lo establece como el archivo de tareas activo"
+        ),
+        properties={
+            "filename": {
+                "type": "string",
+                "description": "Nombre del archivo de tareas (ej: backend_tasks.md)"
+            }
+        },
+        required=["filename"],
+        project_required=True,
+        flush=None
+    )
+    def create_tasks_file(self, filename):
+        if not self.current_project:
+            return "No hay proyecto seleccionado."
+
+        if not filename.endswith(".md"):
+            return "El archivo debe tener extensión .md"
+
+        project_path = os.path.join(PROJECTS_DIR, self.current_project)
+        file_path = os.path.join(project_path, filename)
+
+        if os.path.exists(file_path):
+            return f"El archivo '{filename}' ya existe."
+
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write("# Tareas\n\n")
+
+        self.current_tasks_file = filename
+        
+        self.undo_stack.append({
+            "action": "create_tasks_file",
+            "payload": {
+                "project": self.current_project,
+                "filename": filename
+            }
+        })
+
+        return f"📄 Archivo de tareas '{filename}' creado y activado."
+    
+    #Select Tasks File
+    @tool(
+        (
+            "Selecciona un archivo de tareas existente como el archivo de tareas activo "
+            "dentro del proyecto actual"
+        ),
+        properties={
+            "filename": {
+                "type": "string",
+                "description": "Nombre del archivo de tareas a seleccionar"
+            }
+        },
+        required=["filename"],
+        project_required=True,
+        flush=None
+    )
+    def select_tasks_file(self, filename):
+        if not self.current_project:
+            return "No hay proyecto seleccionado."
+
+        project_path = os.path.join(PROJECTS_DIR, self.current_project)
+        file_path = os.path.join(project_path, filename)
+
+        if not os.path.isfile(file_path):
+            return f"El archivo '{filename}' no existe."
+
+        self.current_tasks_file = filename
+       
+
+        return f"Archivo de tareas activo: {filename}"
+
+    #Create Task
+    @tool(
+        "Agrega una nueva tarea al archivo tasks.md del proyecto seleccionado",
+        properties={
+            "task": {
+                "type": "string",
+                "description": "Descripción de la tarea"
+            }
+        },
+        required=["task"],
+        scope=TASKS,
+        tasks_required=True
+    )
+    def create_task(self, task):
+        tasks_file = self._get_tasks_file()
+
+        self.tasks_io.append_tasks(tasks_file, [task])
+        self._count(tasks_file)
+        self.undo_stack.append({
+        "action": "create_task",
+        "payload": {
+            "project": self.current_project,
+            "tasks_file": self.current_tasks_file,
+            "task": task
+        }
+    })
+
+
+        return f"Tarea creada: {task}"
+
+    #Create Tasks
+    @tool(
+        (
+            "Agrega varias tareas de una vez al archivo de tareas activo "
+            "(una sola escritura y un solo paso de undo)"
+        ),
+        properties={
+            "tasks": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Descripciones de las tareas a crear"
+            }
+        },
+        required=["tasks"],
+        scope=TASKS,
+        tasks_required=True
+    )
+    def create_tasks(self, tasks):
+        tasks = [t.strip() for t in tasks if t and t.strip()]
+        if not tasks:
+            return "No hay tareas que crear."
+
+        self.tasks_io.append_tasks(self._get_tasks_file(), tasks)
+        self._count(self._get_tasks_file())
+        self.undo_stack.append({
+            "action": "create_tasks",
+            "payload": {
+                "project": self.current_project,
+                "tasks_file": self.current_tasks_file,
+                "tasks": tasks
+            }
+        })
+
+        return f"{len(tasks)} tareas creadas."
+    
+    #Get Tasks Files
+    def _get_tasks_file(self):
+        if not self.current_project:
+            return None
+
+        if not self.current_tasks_file:
+            return None
+
+        return os.path.join(
+            PROJECTS_DIR,
+            self.current_project,
+            self.current_tasks_file
+        )
+
+    #List Tasks
+    @tool(
+        (
+            "Lista las tareas del archivo tasks.md del proyecto seleccionado, "
+            "incluyendo su estado (pendiente o completada). Devuelve una página "
+            "(por defecto las primeras 50) con el total y, si hay más, el offset "
+            "para pedir la siguiente"
+        ),
+        properties={
+            "status": {
+                "type": "string",
+                "enum": ["pending", "completed"],
+                "description": "Filtrar por estado (opcional)"
+            },
+            "offset": {
+                "type": "integer",
+                "description": "Empezar después de este número de tarea (el que devolvió la página anterior)"
+            },
+            "limit": {
+                "type": "integer",
+                "description": f"Máximo de tareas a devolver (por defecto {LIST_LIMIT}, máximo {LIST_MAX_LIMIT})"
+            },
+            "contains": {
+                "type": "string",
+                "description": "Solo tareas que contengan este texto (opcional)"
+            }
+        },
+        scope=TASKS,
+        tasks_required=True
+    )
+    def list_tasks(self, status=None, offset=0, limit=LIST_LIMIT, contains=None):
+        if not self.current_project or not self.current_tasks_file:
+            return "No hay archivo de tareas activo."
+
+        tasks_file = self._get_tasks_file()
+
+        if not os.path.exists(tasks_file):
+            return "No hay archivo de tareas."
+
+        tf = self.tasks_io.load(tasks_file)
+        offset = max(0, offset or 0)
+        limit = min(max(1, limit or LIST_LIMIT), LIST_MAX_LIMIT)
+
+        # Se pide una tarea de más para saber si hay otra página sin recorrer el resto
+        page = list(islice(tf.iter(status, contains, after=offset), limit + 1))
+        more = len(page) > limit
+        page = page[:limit]
+
+        if not page:
+            return "No hay tareas." if offset == 0 else "No hay más tareas."
+
+        lines = []
+        for i, t in page:
+            status_mark = "[x]" if t.done else "[]"
+            lines.append(f"{i}. {status_mark} {t.text}")
+
+        # Sin `contains` el total sale de los contadores del índice
+        if contains:
+            total = f"{len(page)}{'+' if more else ''} coincidencias"
+        else:
+            total = f"{tf.count(status)} tareas"
+            if status in ("pending", "completed"):
+                total += " pendientes" if status == "pending" else " completadas"
+        header = f"Mostrando {len(page)} de {total}"
+        lines.insert(0, header + (":" if offset == 0 else f" (después de la {offset}):"))
+        if more:
+            lines.append(f"Hay más: usa offset={page[-1][0]} para continuar.")
+
+        return "\n".join(lines)
+    
+    #Complete Task
+    @tool(
+        (
+            "Marca una tarea como completada [x] en el archivo tasks.md "
+            "del proyecto seleccionado. Acepta el texto de la tarea (si no es exacto "
+            "se busca la más parecida) o el número que muestra list_tasks"
+        ),
+        properties={
+            "task": {
+                "type": "string",
+                "description": "Texto de la tarea o su número en list_tasks"
+            }
+        },
+        required=["task"],
+        scope=TASKS,
+        tasks_required=True
+    )
+    def complete_task(self, task):
+        tasks_file = self._get_tasks_file()
+        tf = self.tasks_io.load(tasks_file)
+        task = str(task).strip()
+
+        found = tf.find(task)
+        number = task.lstrip("#")
+        if not found and number.isdigit():
+            i = int(number)
+            if not 1 <= i <= tf.total:
+                return f"No existe la tarea {i}: la lista tiene {tf.total} tareas."
+            found = tf.task(i)
+            if found.done:
+                return f"La tarea {i} ya está completada: {found.text}"
+        elif not found:
+            # El texto exacto de una tarea ya hecha no busca otra parecida
+            if tf.find(task, done=True):
+                return f"La tarea ya está completada: {task}"
+            ranked = tf.closest(task)
+            if not ranked:
+                return "La tarea no existe o ya está completada."
+            options = "\n".join(f"{n}. {t.text}" for _, n, t in ranked)
+            # Nunca se completa sola una tarea que solo cambia en los números
+            if taskfile.only_numbers_differ(task, ranked[0][2].text):
+                return f"Ninguna tarea pendiente es '{task}'. Las más parecidas (indica el número):\n{options}"
+            if len(ranked) > 1 and ranked[0][0] - ranked[1][0] < taskfile.FUZZY_MARGIN:
+                return f"Varias tareas pendientes se parecen a '{task}', indica el número:\n{options}"
+            found = ranked[0][2]
+
+        self.tasks_io.set_done(tasks_file, found, True)
+        self._count(tasks_file)
+        self.undo_stack.append({
+            "action": "complete_task",
+            "payload": {
+                "project": self.current_project,
+                "tasks_file": self.current_tasks_file,
+                "task": found.text,
+                "mark": found.mark
+            }
+        })
+
+        return f"Tarea completada: {found.text}"
+
+    #Complete Tasks
+    @tool(
+        (
+            "Marca varias tareas como completadas [x] de una vez, por texto exacto "
+            "o por el número que muestra list_tasks"
+        ),
+        properties={
+            "tasks": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Textos exactos de las tareas a completar"
+            },
+            "indices": {
+                "type": "array",
+                "items": {"type": "integer"},
+                "description": "Números de las tareas según list_tasks (empezando en 1)"
+            }
+        },
+        scope=TASKS,
+        tasks_required=True
+    )
+    def complete_tasks(self, tasks=None, indices=None):
+        tasks_file = self._get_tasks_file()
+        tf = self.tasks_io.load(tasks_file)
+
+        found = []
+        missing = []
+        for i in indices or []:
+            if 1 <= i <= tf.total and not tf.task(i).done:
+                found.append(tf.task(i))
+            else:
+                missing.append(str(i))
+        for text in tasks or []:
+            # Si el mismo texto aparece dos veces se completan dos tareas distintas
+            match = next(
+                (t for t in tf.matches(text) if not t.done and t not in found),
+                None
+            )
+            if match:
+                found.append(match)
+            else:
+                missing.append(text)
+
+        if found:
+            self.tasks_io.set_done_many(tasks_file, found, True)
+            self._count(tasks_file)
+            self.undo_stack.append({
+                "action": "complete_tasks",
+                "payload": {
+                    "project": self.current_project,
+                    "tasks_file": self.current_tasks_file,
+                    "tasks": [{"task": t.text, "mark": t.mark} for t in found]
+                }
+            })
+
+        result = f"{len(found)} tareas completadas."
+        if missing:
+            result += f" No encontradas o ya completadas: {', '.join(missing)}"
+        return result
+    
+    #Search Tasks
+    @tool(
+        (
+            "Busca tareas por texto en todos los archivos .md de todos los proyectos "
+            "(o solo en uno) y devuelve las mejores coincidencias con proyecto, archivo y línea"
+        ),
+        properties={
+            "query": {
+                "type": "string",
+                "description": "Palabras a buscar"
+            },
+            "status": {
+                "type": "string",
+                "enum": ["pending", "completed"],
+                "description": "Filtrar por estado (opcional)"
+            },
+            "project": {
+                "type": "string",
+                "description": "Limitar la búsqueda a un proyecto (opcional)"
+            }
+        },
+        required=["query"],
+        scope=FREE
+    )
+    def search_tasks(self, query, status=None, project=None):
+        index = search.open_index(SEARCH_INDEX, PROJECTS_DIR)
+        fresh = None
+        if self.current_project and self.current_tasks_file:
+            fresh = {(self.current_project, self.current_tasks_file): self._get_tasks_file()}
+        hits = index.search(query, status=status, project=project, fresh=fresh)
+
+        if not hits:
+            return "No se encontraron tareas."
+
+        lines = []
+        for hit in hits:
+            mark = "[x]" if hit["status"] == "completed" else "[]"
+            lines.append(f"{hit['project']}/{hit['file']}:{hit['line']} {mark} {hit['task']}")
+        return "\n".join(lines)
+
+    #Delete Task File
+    @tool(
+        (
+            "Elimina un archivo de tareas específico dentro del proyecto seleccionado "
+            "(por ejemplo: frontend_tasks.md o tasks.md). "
+            "No afecta a otros archivos ni al proyecto completo."
+        ),
+        properties={
+            "filename": {
+                "type": "string",
+                "description": "Nombre exacto del archivo de tareas a eliminar"
+            }
+        },
+        required=["filename"],
+        project_required=True,
+        flush=FLUSH_FILE
+    )
+    def delete_task_file(self, filename):
+        
+        if not self.current_project:
+            return "No hay proyecto seleccionado."
+
+        project_path = os.path.join(PROJECTS_DIR, self.current_project)
+        src = os.path.join(project_path, filename)
+        
+        if not os.path.isfile(src):
+            return f"El archivo '{filename}' no existe."
+
+        timestamp = int(time.time())
+        dst_name = f"{filename}__{timestamp}"
+        dst = os.path.join(TRASH_TASKS, dst_name)
+
+        shutil.move(src, dst)
+        self.tasks_io.removed(src)
+        self.counters.moved(src, dst)
+
+        self._log_trash({
+            "type": "task_file",
+            "original_name": filename,
+            "project": self.current_project,
+            "trash_name": dst_name,
+            "timestamp": timestamp
+        })
+
+        if self.current_tasks_file == filename:
+            self.current_tasks_file = None
+
+        return f"Archivo '{filename}' movido a la papelera."
+
+    #Rename Task File
+    @tool(
+        (
+            "Renombra un archivo de tareas dentro del proyecto seleccionado "
+            "(por ejemplo: tasks.md → backend_tasks.md)"
+        ),
+        properties={
+            "old_name": {
+                "type": "string",
+                "description": "Nombre actual del archivo (ej: tasks.md)"
+            },
+            "new_name": {
+                "type": "string",
+                "description": "Nuevo nombre del archivo (ej: backend_tasks.md)"
+            }
+        },
+        required=["old_name", "new_name"],
+        project_required=True,
+        flush=FLUSH_FILE
+    )
+    def rename_task_file(self, old_name, new_name):
+        if not self.current_project:
+            return "No hay proyecto seleccionado."
+
+        if not old_name.endswith(".md") or not new_name.endswith(".md"):
+            return "Solo se pueden renombrar archivos .md"
+
+        project_path = os.path.join(PROJECTS_DIR, self.current_project)
+        old_path = os.path.join(project_path, old_name)
+        new_path = os.path.join(project_path, new_name)
+
+        if not os.path.isfile(old_path):
+            return f"El archivo '{old_name}' no existe."
+
+        if os.path.exists(new_path):
+            return f"Ya existe un archivo llamado '{new_name}'."
+
+        os.rename(old_path, new_path)
+        self._moved(old_path, new_path)
+        self.undo_stack.append(
+            {
+        "action": "rename_task_file",
+        "payload": {
+        "project": self.current_project,
+        "old_name": old_name,
+        "new_name": new_name
+                    }
+            })
+
+        if self.current_tasks_file == old_name:
+            self.current_tasks_file = new_name
+
+
+        return f"Archivo renombrado: {old_name} → {new_name}"
+
+    ##################### UNDO ##########################
+    
+    #Undo Delete
+    @tool(
+        (
+            "Deshace la última eliminación (proyecto o archivo) "
+            "restaurándolo desde la papelera"
+        ),
+        allowed_pending=True,
+        flush=None
+    )
+    def undo_delete(self):
+        entry = self._pop_last_trash()
+        if not entry:
+            return "No hay eliminaciones para deshacer."
+
+        if entry["type"] == "project":
+            src = os.path.join(TRASH_PROJECTS, entry["trash_name"])
+            dst = os.path.join(PROJECTS_DIR, entry["original_name"])
+        else:
+            src = os.path.join(TRASH_TASKS, entry["trash_name"])
+            dst = os.path.join(
+                PROJECTS_DIR,
+                entry["project"],
+                entry["original_name"]
+            )
+            
+        dst = self._resolve_restore_collision(dst)
+        shutil.move(src, dst)
+        self.counters.moved(src, dst)
+        
+        if entry["type"] == "project":
+            self.current_project = entry["original_name"]
+            self.current_tasks_file = None
+
+        if entry["type"] == "task_file":
+            self.current_project = entry["project"]
+            self.current_tasks_file = entry["original_name"]
+                    
+        return f"Restaurado: {entry['original_name']}"
+    
+    #Resolve Restore Collision
+    def _resolve_restore_collision(self, path):
+        if not os.path.exists(path):
+            return path
+
+        base, ext = os.path.splitext(path)
+        i = 1
+        while os.path.exists(f"{base}_restored({i}){ext}"):
+            i += 1
+        return f"{base}_restored({i}){ext}"
+   
+    #Restore From Trash
+    @tool(
+        (
+            "Restaura el último proyecto o archivo eliminado desde la papelera. "
+            "Si existe un conflicto de nombre, se restaurará con un sufijo automático."
+        ),
+        allowed_pending=True,
+        flush=None
+    )
+    def restore_from_trash(self):
+        return self.undo_delete()
+
+
+    #Undo Last Action
+    @tool(
+        (
+            "Deshace la última eliminación realizada durante esta sesión, "
+            "restaurando el proyecto o archivo eliminado más recientemente."
+        )
+    )
+    def undo_last_action(self):
+        if not self.undo_stack:
+            return "No hay acciones para deshacer."
+
+        action_entry = self.undo_stack.pop()
+        action = action_entry.get("action")
+        payload = action_entry.get("payload", {})
+
+        # Undo rename project
+        if action == "rename_project":
+            old_name = payload["old_name"]
+            new_name = payload["new_name"]
+
+            old_path = os.path.join(PROJECTS_DIR, old_name)
+            new_path = os.path.join(PROJECTS_DIR, new_name)
+
+            if not os.path.isdir(new_path):
+                return "No se puede deshacer: la carpeta ya no existe."
+
+            if os.path.exists(old_path):
+                return "No se puede deshacer: el nombre original ya existe."
+
+            os.rename(new_path, old_path)
+            self._moved(new_path, old_path)
+            if self.current_project == new_name:
+                self.current_project = old_name
+
+            return f"Proyecto restaurado: {new_name} → {old_name}"
+
+        # Undo create project
+        if action == "create_project":
+            project = payload["project"]
+            path = os.path.join(PROJECTS_DIR, project)
+
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            self._removed(path)
+
+            if self.current_project == project:
+                self.current_project = None
+                self.current_tasks_file = None
+
+            return f"Proyecto '{project}' eliminado (undo create)."
+
+        # Undo edit file
+        if action == "edit_file":
+            path = os.path.join(
+                PROJECTS_DIR,
+                payload["project"],
+                payload["filename"]
+            )
+
+            taskfile.invalidate(path)
+            textfile.invalidate(path)
+            self.counters.invalidate(path)
+            if payload["existed"]:
+                os.replace(payload["snapshot"], path)
+                return f"Cambios revertidos en '{payload['filename']}'."
+            else:
+                if os.path.exists(path):
+                    os.remove(path)
+                return f"Archivo '{payload['filename']}' eliminado (undo edit)."
+        
+        # Undo create tasks file
+        if action == "create_tasks_file":
+            project = payload["project"]
+            filename = payload["filename"]
+
+            path = os.path.join(PROJECTS_DIR, project, filename)
+
+            if os.path.exists(path):
+                os.remove(path)
+            self._removed(path)
+
+            if self.current_tasks_file == filename:
+                self.current_tasks_file = None
+
+            return f"Archivo de tareas '{filename}' eliminado (undo create)."
+
+        # Undo rename task file
+        if action == "rename_task_file":
+            project = payload["project"]
+            old_name = payload["old_name"]
+            new_name = payload["new_name"]
+
+            project_path = os.path.join(PROJECTS_DIR, project)
+            new_path = os.path.join(project_path, new_name)
+            old_path = os.path.join(project_path, old_name)
+
+            if os.path.exists(new_path):
+                os.rename(new_path, old_path)
+                self._moved(new_path, old_path)
+
+            if self.current_tasks_file == new_name:
+                self.current_tasks_file = old_name
+
+            return f"Archivo restaurado: {new_name} → {old_name}"
+
+        # Undo complete task
+        if action == "complete_task":
+            path = os.path.join(
+                PROJECTS_DIR,
+                payload["project"],
+                payload["tasks_file"]
+            )
+
+            task = self.tasks_io.find_at(path, payload["mark"], payload["task"], True)
+            if not task:
+                return f"No se encontró la tarea completada: {payload['task']}"
+
+            self.tasks_io.set_done(path, task, False)
+            self._count(path)
+
+            return f"Tarea desmarcada: {payload['task']}"
+
+        # Undo create task
+        if action == "create_task":
+            path = os.path.join(
+                PROJECTS_DIR,
+                payload["project"],
+                payload["tasks_file"]
+            )
+
+            # La tarea se añadió al final: se busca desde abajo
+            task = self.tasks_io.load(path).find(payload["task"], last=True)
+            if task:
+                self.tasks_io.remove_task(path, task)
+                self._count(path)
+
+            return f"Tarea eliminada: {payload['task']}"
+
+        # Undo create tasks
+        if action == "create_tasks":
+            path = os.path.join(
+                PROJECTS_DIR,
+                payload["project"],
+                payload["tasks_file"]
+            )
+
+            # Se añadieron juntas al final: se buscan desde abajo
+            tf = self.tasks_io.load(path)
+            found = []
+            for text in reversed(payload["tasks"]):
+                match = next(
+                    (t for t in reversed(tf.matches(text))
+                     if not t.done and t not in found),
+                    None
+                )
+                if match:
+                    found.append(match)
+            self.tasks_io.remove_tasks(path, found)
+            self._count(path)
+
+            return f"{len(found)} tareas eliminadas (undo create)."
+
+        # Undo complete tasks
+        if action == "complete_tasks":
+            path = os.path.join(
+                PROJECTS_DIR,
+                payload["project"],
+                payload["tasks_file"]
+            )
+
+            found = []
+            for entry in payload["tasks"]:
+                task = self.tasks_io.find_at(path, entry["mark"], entry["task"], True)
+                if task and task not in found:
+                    found.append(task)
+            if found:
+                self.tasks_io.set_done_many(path, found, False)
+                self._count(path)
+
+            return f"{len(found)} tareas desmarcadas."
+
+        return "Acción no reversible."
+
+
+####################### PROCESS RESPONSE #################################
+
+    #Check Tool Preconditions
+    def _check_tool(self, spec):
+        if self.pending_delete and not spec.allowed_pending:
+            return "Debes confirmar o cancelar la eliminación pendiente."
+
+        if spec.project_required and not self.current_project:
+            return "Debes seleccionar un proyecto primero."
+
+        if spec.tasks_required and not self.current_tasks_file:
+            return "Debes seleccionar o crear un archivo de tareas primero."
+
+        return None
+
+    #Run Tool
+    def _run_tool(self, spec, args):
+        # Lo que lee o mueve los .md por su cuenta (read_file, edit_file,
+        # búsqueda, borrados, undo...) tiene que ver en disco lo escrito hasta
+        # ahora (dentro del try: si falla el volcado, la llamada igual tiene salida)
+        try:
+            self._flush_for(spec, args)
+            return tools.call(spec, self, args)
+        except Exception as e:
+            return f"Error ejecutando {spec.name}: {e}"
+
+    def _flush_for(self, spec, args):
+        # Solo lo que la herramienta va a leer o mover (ver tools.FLUSH_*):
+        # con SQLite cada volcado es una exportación a .md
+        if spec.flush is None:
+            return
+        if spec.flush == FLUSH_FILE and self.current_project:
+            name = args.get("filename") or args.get("old_name")
+            if name:
+                self.tasks_io.flush(os.path.join(PROJECTS_DIR, self.current_project, name))
+            return
+        if spec.flush == FLUSH_PROJECT and self.current_project:
+            self.tasks_io.flush(os.path.join(PROJECTS_DIR, self.current_project))
+            return
+        self.tasks_io.flush()
+
+    #End Turn
+    def end_turn(self):
+        self.tasks_io.end_turn()
+        self.counters.save()
+
+    def flush_writes(self):
+        self.tasks_io.flush()
+
+    def close(self):
+        # Fin de la sesión: escribe lo pendiente y borra las snapshots del undo
+        self.tasks_io.flush()
+        self.undo_stack.close()
+
+    def _reply(self, reply):
+        self.replies.append(reply)
+        if self.echo:
+            print(f"Asistente: {reply}")
+
+    def _print_message(self, output):
+        self._reply("\n".join(part.text for part in output.content))
+
+    def process_response(self, response):
+        self.messages += response.output
+
+        scheduler = ToolScheduler(self)
+
+        for output in response.output:
+            if output.type == "function_call":
+                scheduler.submit(output.call_id, output.name, output.arguments)
+
+            elif output.type == "message":
+                self._print_message(output)
+
+        if not scheduler.calls:
+            return False
+
+        self.messages += scheduler.outputs()
+        return True
+
+    #Process Response (asyncio)
+    async def process_response_async(self, response):
+        # Igual que process_response, pero el acceso al filesystem se hace
+        # fuera del event loop para que un solo loop pueda atender muchas sesiones.
+        self.messages += response.output
+
+        scheduler = ToolScheduler(self)
+
+        for output in response.output:
+            if output.type == "function_call":
+                await asyncio.to_thread(
+                    scheduler.submit, output.call_id, output.name, output.arguments
+                )
+
+            elif output.type == "message":
+                self._print_message(output)
+
+        if not scheduler.calls:
+            return False
+
+        self.messages += await asyncio.to_thread(scheduler.outputs)
+        return True
+
+    #Stream Event
+    def _stream_event(self, event, stream_state):
+        # Pinta los deltas de texto según llegan y devuelve
+        # (call_id, name, arguments) en cuanto una function_call está completa.
+        if event.type == "response.output_item.done":
+            stream_state["items"].append(event.item)
+
+        if event.type == "response.output_text.delta":
+            if not self.echo:
+                return None
+            if not stream_state["printing"]:
+                print("Asistente: ", end="", flush=True)
+                stream_state["printing"] = True
+            print(event.delta, end="", flush=True)
+
+        elif event.type == "response.output_text.done":
+            self.replies.append(event.text)
+            if stream_state["printing"]:
+                print()
+                stream_state["printing"] = False
+
+        elif event.type == "response.output_item.added" and event.item.type == "function_call":
+            stream_state["calls"][event.item.id] = event.item
+
+        elif event.type == "response.function_call_arguments.done":
+            item = stream_state["calls"].pop(event.item_id, None)
+            if item is not None:
+                return (item.call_id, item.name, event.arguments)
+
+        elif event.type == "response.output_item.done" and event.item.type == "function_call":
+            # Por si el stream no trae function_call_arguments.done
+            if stream_state["calls"].pop(event.item.id, None) is not None:
+                return (event.item.call_id, event.item.name, event.item.arguments)
+
+        elif event.type in ("response.completed", "response.incomplete", "response.failed"):
+            stream_state["response"] = event.response
+
+        return None
+
+    def _new_stream_state(self):
+        return {"printing": False, "calls": {}, "items": [], "dispatched": [], "response": None}
+
+    def _streamed_items(self, stream_state):
+        # Lo que va al historial antes de las salidas de las herramientas. Si
+        # la respuesta terminó bien, su output tal cual. Si no (incomplete,
+        # failed o el stream se cortó), lo que llegó completo, sin las
+        # function_call que no se ejecutaron y con todas las que sí: la API
+        # rechaza una function_call_output sin su function_call.
+        response = stream_state["response"]
+        if response is not None and response.status == "completed":
+            return list(response.output)
+
+        dispatched = {call_id for call_id, _, _ in stream_state["dispatched"]}
+        items, seen = [], set()
+        for item in (response.output if response is not None else stream_state["items"]):
+            if item.type == "function_call":
+                if item.call_id not in dispatched:
+                    continue
+                seen.add(item.call_id)
+            items.append(item)
+        for call_id, name, arguments in stream_state["dispatched"]:
+            if call_id not in seen:
+                items.append({"type": "function_call", "call_id": call_id,
+                              "name": name, "arguments": arguments})
+        return items
+
+    #Process Stream
+    def process_stream(self, stream):
+        # Versión en streaming de process_response: cada herramienta se lanza
+        # en cuanto sus argumentos están completos, sin esperar al final.
+        scheduler = ToolScheduler(self)
+        stream_state = self._new_stream_state()
+        outputs = []
+
+        try:
+            for event in stream:
+                call = self._stream_event(event, stream_state)
+                if call:
+                    stream_state["dispatched"].append(call)
+                    scheduler.submit(*call)
+        finally:
+            # También si el stream falla a medias: lo ya ejecutado queda en el historial
+            if stream_state["printing"]:
+                print()
+            self.messages += self._streamed_items(stream_state)
+            if scheduler.calls:
+                outputs = scheduler.outputs()
+                self.messages += outputs
+
+        return bool(outputs)
+
+    #Process Stream (asyncio)
+    async def process_stream_async(self, stream):
+        scheduler = ToolScheduler(self)
+        stream_state = self._new_stream_state()
+        outputs = []
+
+        try:
+            async for event in stream:
+                call = self._stream_event(event, stream_state)
+                if call:
+                    stream_state["dispatched"].append(call)
+                    await asyncio.to_thread(scheduler.submit, *call)
+        finally:
+            if stream_state["printing"]:
+                print()
+            self.messages += self._streamed_items(stream_state)
+            if scheduler.calls:
+                outputs = await asyncio.to_thread(scheduler.outputs)
+                self.messages += outputs
+
+        return bool(outputs)
+
+
+####################### TOOL SCHEDULER #################################
+
+# Ejecuta las function_call de una respuesta: las independientes en paralelo
+# en TOOL_POOL, las que tocan el mismo archivo en orden, las que leen de todo
+# el workspace (FREE: búsqueda, resúmenes) después de las escrituras
+# anteriores y antes de las siguientes, y las que cambian el estado de la
+# sesión (proyecto/archivo activo, papelera, undo) esperan a todo lo anterior
+# y se ejecutan solas. El orden se respeta encadenando callbacks: una tarea
+# solo llega al pool cuando terminaron aquellas de las que depende, así que
+# ningún worker se queda bloqueado esperando a otro (el pool es de todas las
+# sesiones).
+class ToolScheduler:
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.calls = []
+        # Última escritura de cada archivo y lecturas FREE aún sin terminar
+        self.inflight = {}
+        self.readers = []
+        self.futures = []
+
+    def submit(self, call_id, fn_name, arguments):
+        try:
+            args = json.loads(arguments or "{}")
+        except json.JSONDecodeError:
+            self.calls.append((call_id, "Argumentos inválidos."))
+            return
+
+        spec = self.agent.TOOL_REGISTRY.get(fn_name)
+        if spec is None:
+            self.calls.append((call_id, "Herramienta no reconocida"))
+            return
+
+        error = self.agent._check_tool(spec)
+        if error:
+            self.calls.append((call_id, error))
+            return
+
+        key = spec.key(self.agent, args)
+        self.readers = [f for f in self.readers if not f.done()]
+        if key is SESSION:
+            self.wait()
+            result = self.agent._run_tool(spec, args)
+        elif key is None:
+            result = self._after(list(self.inflight.values()), spec, args)
+            self.readers.append(result)
+        else:
+            prev = self.inflight.get(key)
+            deps = self.readers + ([prev] if prev is not None else [])
+            result = self.inflight[key] = self._after(deps, spec, args)
+        if isinstance(result, Future):
+            self.futures.append(result)
+        self.calls.append((call_id, result))
+
+    def _after(self, deps, spec, args):
+        # Future con el resultado de la herramienta, que se manda al pool
+        # cuando termina la última de `deps`
+        result = Future()
+        pending = [f for f in deps if not f.done()]
+        if not pending:
+            self._start(result, spec, args)
+            return result
+
+        remaining = [len(pending)]
+        lock = threading.Lock()
+
+        def ready(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._start(result, spec, args)
+
+        for future in pending:
+            future.add_done_callback(ready)
+        return result
+
+    def _start(self, result, spec, args):
+        def settle(work):
+            error = work.exception()
+            if error is None:
+                result.set_result(work.result())
+            else:
+                result.set_exception(error)
+
+        try:
+            TOOL_POOL.submit(self.agent._run_tool, spec, args).add_done_callback(settle)
+        except RuntimeError as e:
+            # Pool cerrado (el proceso está terminando)
+            result.set_exception(e)
+
+    def wait(self):
+        futures_wait(self.futures)
+        self.inflight.clear()
+        self.readers.clear()
+        self.futures.clear()
+
+    def outputs(self):
+        self.wait()
+        items = []
+        for call_id, result in self.calls:
+            if isinstance(result, Future):
+                try:
+                    result = result.result()
+                except Exception as e:
+                    # Cada function_call necesita su salida o la API rechaza el historial
+                    result = f"Error ejecutando la herramienta: {e}"
+            items.append({
+                "type": "function_call_output",
+                "call_id": call_id,
+                "output": json.dumps({"result": result})
+            })
+        return items
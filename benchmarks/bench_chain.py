@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI
+
+from agent import ProjectAgent
+from main import run_turn
+from model_client import ModelClient
+from fake_responses import FakeResponses
+
+# Bytes enviados por petición con el historial completo (modo actual) y
+# encadenando con previous_response_id (AGENT_CHAIN=1), contra el endpoint
+# local. Cada turno es una tool call y su respuesta (dos peticiones).
+#
+#   python benchmarks/bench_chain.py --turns 40
+#
+# "chain (cadena perdida)" hace que el endpoint olvide sus respuestas cada
+# --forget-every turnos para comprobar la vuelta al historial completo.
+
+SETUP = [
+    '/create_project {"project": "%s"}',
+    '/create_tasks {"tasks": [%s]}',
+]
+
+TURNS = [
+    '/list_tasks {}',
+    '/complete_task {"task": "{n}"}',
+    '/summarize_project {}',
+    '/undo_last_action {}',
+]
+
+MODES = {
+    "completo": dict(chain=False),
+    "chain": dict(chain=True),
+    "chain (cadena perdida)": dict(chain=True, forget=True),
+}
+
+
+def run(turns, tasks, forget_every, chain, forget=False):
+    with FakeResponses() as fake:
+        client = ModelClient(OpenAI(base_url=fake.base_url, api_key="fake"), chain=chain)
+        agent = ProjectAgent()
+        agent.echo = False
+        names = ", ".join(f'"tarea {i} con una descripción de longitud realista"' for i in range(tasks))
+        run_turn(client, agent, SETUP[0] % f"chain_{int(chain)}_{int(forget)}", stream=False, router=None)
+        run_turn(client, agent, SETUP[1] % names, stream=False, router=None)
+
+        start = len(fake.request_bytes)
+        for i in range(turns):
+            if forget and i and i % forget_every == 0:
+                fake.forget()
+            text = TURNS[i % len(TURNS)].replace("{n}", str(i % tasks + 1))
+            run_turn(client, agent, text, stream=False, router=None)
+        sizes = fake.request_bytes[start:]
+        return {
+            "requests": len(sizes),
+            "avg_bytes": statistics.mean(sizes),
+            "last_bytes": sizes[-1],
+            "total_bytes": sum(sizes),
+            "replies": list(agent.replies),
+            "chain": client.chain_stats()
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--forget-every", type=int, default=10)
+    parser.add_argument("--output", help="guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_chain_"))
+    os.makedirs("projects", exist_ok=True)
+
+    report = {name: run(args.turns, args.tasks, args.forget_every, **options) for name, options in MODES.items()}
+    base = report["completo"]
+
+    print(f"{args.turns} turnos ({base['requests']} peticiones), {args.tasks} tareas")
+    print(f"  {'modo':<26}{'media':>12}{'última':>12}{'total':>14}{'ahorro':>9}  cadena")
+    for name, r in report.items():
+        saved = 1 - r["total_bytes"] / base["total_bytes"]
+        same = "" if r["replies"] == base["replies"] else "  (respuestas distintas)"
+        print(f"  {name:<26}{r['avg_bytes']:>10.0f} B{r['last_bytes']:>10} B{r['total_bytes']:>12} B"
+              f"{saved:>9.0%}  {r['chain']}{same}")
+
+    if args.output:
+        for r in report.values():
+            del r["replies"]
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI
+
+from model_client import ModelClient
+from resilience import CallPolicy
+from telemetry import percentile
+from fake_responses import FakeResponses
+
+# Latencia de cola de las llamadas al modelo con y sin CallPolicy, contra el
+# endpoint local con latencias lentas y errores 500 inyectados:
+#
+#   python benchmarks/bench_resilience.py --calls 300 --tail-rate 0.03 --error-rate 0.02
+#
+# - sdk: el cliente OpenAI tal cual (sus 2 reintentos, sin timeout propio)
+# - timeout+retry: timeout por intento y backoff con jitter
+# - hedge: además, segunda petición si la primera pasa del p95
+# - fallback: el modelo principal nunca responde a tiempo y se pasa al de respaldo
+
+PRIMARY = "modelo-principal"
+FALLBACK = "modelo-respaldo"
+
+
+def fake_agent():
+    return SimpleNamespace(messages=[{"role": "user", "content": "hola"}], tools=[])
+
+
+def run(fake, client, calls):
+    agent = fake_agent()
+    before = fake.requests + fake.errors
+    latencies, failures = [], 0
+    for _ in range(calls):
+        start = time.perf_counter()
+        try:
+            client.create(agent)
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "failures": failures,
+        "requests": fake.requests + fake.errors - before
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--tail-rate", type=float, default=0.03)
+    parser.add_argument("--tail-latency", type=float, default=2.0)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--timeout", type=float, default=0.5)
+    parser.add_argument("--output", help="guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    report = {}
+    with FakeResponses(latency=args.latency, tail_rate=args.tail_rate,
+                       tail_latency=args.tail_latency, error_rate=args.error_rate,
+                       model_latency={PRIMARY: args.tail_latency}, seed=1) as fake:
+        def openai_client():
+            return OpenAI(base_url=fake.base_url, api_key="fake")
+
+        modes = {
+            "sdk": lambda: ModelClient(openai_client()),
+            "timeout+retry": lambda: ModelClient(openai_client(), policy=CallPolicy(
+                timeout=args.timeout, backoff=0.05)),
+            "hedge": lambda: ModelClient(openai_client(), policy=CallPolicy(
+                timeout=args.timeout, backoff=0.05, hedge=True)),
+            "fallback": lambda: ModelClient(openai_client(), model=PRIMARY, policy=CallPolicy(
+                timeout=args.timeout, backoff=0.05, fallback_model=FALLBACK)),
+        }
+        for name, make in modes.items():
+            client = make()
+            report[name] = run(fake, client, args.calls)
+            if client.policy:
+                report[name]["policy"] = client.policy.stats()
+
+    print(f"{args.calls} llamadas · latencia {args.latency * 1000:.0f} ms · "
+          f"{args.tail_rate:.0%} a {args.tail_latency * 1000:.0f} ms · {args.error_rate:.0%} errores 500")
+    print(f"  {'modo':<16}{'p50':>10}{'p95':>10}{'p99':>10}{'máx':>10}{'fallos':>8}{'peticiones':>12}")
+    for name, r in report.items():
+        print(f"  {name:<16}{r['p50_ms']:>7.1f} ms{r['p95_ms']:>7.1f} ms{r['p99_ms']:>7.1f} ms"
+              f"{r['max_ms']:>7.1f} ms{r['failures']:>8}{r['requests']:>12}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI
+
+from agent import ProjectAgent
+from main import run_turn
+from model_client import ModelClient
+from router import IntentRouter
+from fake_responses import FakeResponses
+
+# Compara una sesión con y sin el router local. Cada turno tiene su versión
+# en lenguaje natural (la que ve el router) y la secuencia de tool calls que
+# haría el modelo (la que ejecuta el endpoint local): así el modo sin router
+# hace las mismas dos idas y vueltas que haría con la API real.
+#
+#   python benchmarks/bench_router.py --turns 20 --latency 0.2
+
+SETUP = [
+    '/create_project {"project": "%s"}',
+    '/create_tasks {"tasks": ["tarea 1", "tarea 2", "tarea 3", "tarea 4", "tarea 5"]}',
+]
+
+# (texto natural, equivalente para el endpoint local)
+TURNS = [
+    ("listar tareas", '/list_tasks {}'),
+    ("completar {n}", '/complete_task {"task": "{n}"}'),
+    ("resumen", '/summarize_project {}'),
+    ("deshacer", '/undo_last_action {}'),
+    ("añade la tarea revisar el deploy", '/create_task {"task": "revisar el deploy"}'),
+]
+
+
+def script(turns, natural):
+    for i in range(turns):
+        text, scripted = TURNS[i % len(TURNS)]
+        n = i % 5 + 1
+        # Las frases que el router no reconoce van siempre al modelo
+        if natural and not text.startswith("añade"):
+            yield text.replace("{n}", str(n))
+        else:
+            yield scripted.replace("{n}", str(n))
+
+
+def run(base_url, turns, router, project):
+    client = ModelClient(OpenAI(base_url=base_url, api_key="fake"))
+    agent = ProjectAgent()
+    agent.echo = False
+    for text in SETUP:
+        run_turn(client, agent, text.replace("%s", project), stream=False, router=None)
+
+    latencies = []
+    for text in script(turns, natural=router is not None):
+        start = time.perf_counter()
+        run_turn(client, agent, text, stream=False, router=router)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_router_"))
+    os.makedirs("projects", exist_ok=True)
+
+    with FakeResponses(latency=args.latency) as fake:
+        for mode in ("model", "router"):
+            router = IntentRouter() if mode == "router" else None
+            before = fake.requests
+            with contextlib.redirect_stdout(io.StringIO()):
+                latencies = run(fake.base_url, args.turns, router, f"bench_{mode}")
+            result = {
+                "mode": mode,
+                "turns": len(latencies),
+                "requests": fake.requests - before,
+                "total_seconds": round(sum(latencies), 3),
+                "p50_ms": round(statistics.median(latencies) * 1000, 2)
+            }
+            if router:
+                result["router"] = router.stats()
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import ProjectAgent
+
+# Mide las herramientas de filesystem de ProjectAgent según crecen los datos:
+# workspaces sintéticos con N proyectos, un archivo de tareas de M líneas y
+# una papelera con T entradas. Cada workspace vive en un directorio temporal
+# (PROJECTS_DIR y TRASH_DIR son relativos al directorio de trabajo).
+#
+#   python benchmarks/bench_scale.py --output scale.json
+#   python benchmarks/bench_scale.py --quick --compare scale.json
+#
+# También se puede lanzar con pytest-benchmark:
+#
+#   pytest benchmarks/bench_scale.py --benchmark-only
+
+BENCH_PROJECT = "bench"
+BENCH_FILE = "tasks.md"
+EXTRA_FILE = "extra.md"
+
+SCENARIOS = [
+    {"projects": 1, "lines": 10, "trash": 0},
+    {"projects": 1, "lines": 1_000, "trash": 0},
+    {"projects": 1, "lines": 100_000, "trash": 0},
+    {"projects": 1, "lines": 1_000_000, "trash": 0},
+    {"projects": 100, "lines": 1_000, "trash": 0},
+    {"projects": 10_000, "lines": 1_000, "trash": 0},
+    {"projects": 1, "lines": 1_000, "trash": 10_000},
+]
+
+QUICK_SCENARIOS = [
+    {"projects": 1, "lines": 10, "trash": 0},
+    {"projects": 100, "lines": 10_000, "trash": 1_000},
+]
+
+
+def task_text(i):
+    return f"tarea {i} del módulo {i % 97}"
+
+
+############### WORKSPACE ###############
+
+def build_workspace(root, projects, lines, trash):
+    # projects/bench/tasks.md con `lines` tareas (la mitad completadas),
+    # projects-1 proyectos pequeños más y un diario de papelera con `trash` entradas
+    os.makedirs(os.path.join(root, ".trash", "projects"))
+    os.makedirs(os.path.join(root, ".trash", "tasksfiles"))
+
+    bench = os.path.join(root, "projects", BENCH_PROJECT)
+    os.makedirs(bench)
+    with open(os.path.join(bench, BENCH_FILE), "w", encoding="utf-8") as f:
+        f.write("# Tareas del proyecto\n\n")
+        chunk = 100_000
+        for start in range(0, lines, chunk):
+            f.write("".join(
+                f"- [{'x' if i % 2 else ' '}] {task_text(i)}\n"
+                for i in range(start, min(lines, start + chunk))
+            ))
+    with open(os.path.join(bench, EXTRA_FILE), "w", encoding="utf-8") as f:
+        f.write("# Extra\n\n- [ ] tarea extra\n")
+
+    for p in range(projects - 1):
+        path = os.path.join(root, "projects", f"p{p}")
+        os.makedirs(path)
+        with open(os.path.join(path, "tasks.md"), "w", encoding="utf-8") as f:
+            f.write("# Tareas del proyecto\n\n" + "".join(f"- [ ] {task_text(i)}\n" for i in range(10)))
+
+    # Entradas antiguas de la papelera: solo metadatos, como tras muchas sesiones
+    with open(os.path.join(root, ".trash", "journal.jsonl"), "w", encoding="utf-8") as f:
+        for i in range(1, trash + 1):
+            entry = {
+                "type": "task_file",
+                "original_name": f"old_{i}.md",
+                "project": "p0",
+                "trash_name": f"old_{i}.md__0",
+                "timestamp": 0
+            }
+            f.write(json.dumps({"op": "push", "id": i, "entry": entry}) + "\n")
+
+
+class Workspace:
+    def __init__(self, projects, lines, trash):
+        self.scenario = {"projects": projects, "lines": lines, "trash": trash}
+        self.cwd = os.getcwd()
+        self.root = tempfile.mkdtemp(prefix="bench_scale_")
+
+        start = time.perf_counter()
+        build_workspace(self.root, projects, lines, trash)
+        self.build_seconds = time.perf_counter() - start
+
+        os.chdir(self.root)
+        self.agent = ProjectAgent()
+        self.agent.echo = False
+        # Última tarea pendiente del archivo: la más cara de encontrar
+        self.last_pending = max(i for i in range(max(lines - 2, 0), lines) if i % 2 == 0)
+        self.created = 0
+        self.edited = 0
+        # Acciones (sin medir) que devuelven el archivo a su estado inicial
+        self.cleanup = []
+
+    def select(self):
+        for fn in self.cleanup:
+            fn()
+        self.cleanup.clear()
+        self.agent.pending_delete = None
+        self.agent.current_project = BENCH_PROJECT
+        self.agent.current_tasks_file = BENCH_FILE
+
+    def close(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+############### OPERACIONES ###############
+
+# Cada operación prepara su estado (sin medir) y devuelve la función a medir
+
+def op_create_task(ws):
+    ws.created += 1
+    return lambda: ws.agent.create_task(f"nueva tarea {ws.created}")
+
+
+def op_list_tasks(ws):
+    return ws.agent.list_tasks
+
+
+def op_complete_task(ws):
+    text = task_text(ws.last_pending)
+    ws.cleanup.append(ws.agent.undo_last_action)
+    return lambda: ws.agent.complete_task(text)
+
+
+def op_summarize_project(ws):
+    return ws.agent.summarize_project
+
+
+def op_edit_file(ws):
+    ws.edited += 1
+    old = task_text(ws.last_pending)
+    new = f"{old} (editada {ws.edited})"
+    ws.cleanup.append(ws.agent.undo_last_action)
+    return lambda: ws.agent.edit_file(BENCH_FILE, old, new)
+
+
+def op_delete_task_file_undo(ws):
+    def run():
+        ws.agent.delete_task_file(EXTRA_FILE)
+        ws.agent.undo_delete()
+    return run
+
+
+def op_undo_last_action(ws):
+    ws.agent.complete_task(task_text(ws.last_pending))
+    return ws.agent.undo_last_action
+
+
+OPS = {
+    "create_task": op_create_task,
+    "list_tasks": op_list_tasks,
+    "complete_task": op_complete_task,
+    "summarize_project": op_summarize_project,
+    "edit_file": op_edit_file,
+    "delete_task_file+undo_delete": op_delete_task_file_undo,
+    "undo_last_action": op_undo_last_action,
+}
+
+
+def measure(ws, name, repeat):
+    times = []
+    for _ in range(repeat):
+        ws.select()
+        run = OPS[name](ws)
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    return {
+        "op": name,
+        "runs": len(times),
+        # La primera llamada suele pagar la carga del archivo (caché fría)
+        "first_ms": round(times[0] * 1000, 3) if times else None,
+        "median_ms": round(statistics.median(times) * 1000, 3) if times else None,
+        "max_ms": round(max(times) * 1000, 3) if times else None
+    }
+
+
+def run_scenario(scenario, repeat, ops):
+    ws = Workspace(**scenario)
+    try:
+        results = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name in ops:
+                results.append(dict(measure(ws, name, repeat), **ws.scenario))
+        return ws.build_seconds, results
+    finally:
+        ws.close()
+
+
+############### COMPARACIÓN ###############
+
+def scenario_key(r):
+    return (r["op"], r["projects"], r["lines"], r["trash"])
+
+
+def compare(baseline, results, threshold):
+    # Operaciones cuya mediana creció más de `threshold` veces respecto a la referencia
+    old = {scenario_key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        before = old.get(scenario_key(r))
+        if not before or not before["median_ms"] or r["median_ms"] is None:
+            continue
+        ratio = r["median_ms"] / before["median_ms"]
+        # Por debajo de 1 ms el ruido domina
+        if ratio > threshold and r["median_ms"] > 1:
+            regressions.append(dict(r, baseline_ms=before["median_ms"], ratio=round(ratio, 2)))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true", help="escenarios pequeños")
+    parser.add_argument("--lines", type=int, nargs="+", help="tamaños del archivo de tareas")
+    parser.add_argument("--projects", type=int, default=1)
+    parser.add_argument("--trash", type=int, default=0)
+    parser.add_argument("--ops", nargs="+", choices=list(OPS), default=list(OPS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench_scale.json")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior")
+    parser.add_argument("--threshold", type=float, default=1.5)
+    args = parser.parse_args()
+
+    if args.lines:
+        scenarios = [
+            {"projects": args.projects, "lines": n, "trash": args.trash} for n in args.lines
+        ]
+    else:
+        scenarios = QUICK_SCENARIOS if args.quick else SCENARIOS
+
+    results = []
+    for scenario in scenarios:
+        build_seconds, scenario_results = run_scenario(scenario, args.repeat, args.ops)
+        print(f"{scenario} (generado en {build_seconds:.2f}s)")
+        for r in scenario_results:
+            print(f"  {r['op']:<30} primera {r['first_ms']} ms, mediana {r['median_ms']} ms")
+        results += scenario_results
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": int(time.time()),
+        "repeat": args.repeat,
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados en {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        for r in regressions:
+            print(
+                f"REGRESIÓN {r['op']} {scenario_key(r)[1:]}: "
+                f"{r['baseline_ms']} ms -> {r['median_ms']} ms (x{r['ratio']})"
+            )
+        if regressions:
+            sys.exit(1)
+
+
+############### PYTEST-BENCHMARK ###############
+
+try:
+    import pytest
+except ImportError:
+    pytest = None
+
+if pytest is not None:
+    @pytest.fixture(scope="module", params=[1_000, 100_000], ids=lambda n: f"{n}_lines")
+    def workspace(request):
+        ws = Workspace(projects=100, lines=request.param, trash=1_000)
+        yield ws
+        ws.close()
+
+    @pytest.mark.parametrize("name", list(OPS))
+    def test_tool(benchmark, workspace, name):
+        def setup():
+            workspace.select()
+            return (OPS[name](workspace),), {}
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            benchmark.pedantic(lambda run: run(), setup=setup, rounds=5)
+
+
+if __name__ == "__main__":
+    main()
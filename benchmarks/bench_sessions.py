@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import AsyncOpenAI
+
+from agent import ProjectAgent
+from main_async import run_turn
+from model_client import ModelClient
+from fake_responses import FakeResponses
+
+# Mide cuántas sesiones puede mover un solo event loop: N sesiones concurrentes
+# contra un endpoint Responses local con latencia simulada.
+#
+#   python benchmarks/bench_sessions.py --sessions 1 10 100 --latency 0.05
+
+
+def session_script(i, turns):
+    yield '/create_project {"project": "bench_%d"}' % i
+    for t in range(turns):
+        yield '/create_task {"task": "tarea %d"}\n/list_tasks {}' % t
+
+
+async def run_session(client, i, turns):
+    agent = ProjectAgent()
+    for text in session_script(i, turns):
+        await run_turn(client, agent, text)
+
+
+async def run(base_url, sessions, turns):
+    openai_client = AsyncOpenAI(base_url=base_url, api_key="fake")
+    client = ModelClient(openai_client)
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(client, i, turns) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+    await openai_client.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_sessions_")
+    os.chdir(workdir)
+    os.makedirs("projects", exist_ok=True)
+
+    results = []
+    with FakeResponses(latency=args.latency) as fake:
+        for n in args.sessions:
+            before = fake.requests
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed = asyncio.run(run(fake.base_url, n, args.turns))
+            turns = n * (args.turns + 1)
+            results.append({
+                "sessions": n,
+                "turns": turns,
+                "requests": fake.requests - before,
+                "seconds": round(elapsed, 3),
+                "turns_per_second": round(turns / elapsed, 1)
+            })
+            print(json.dumps(results[-1]))
+
+    # Referencia: con el loop bloqueante cada turno tarda lo mismo que una
+    # sesión aislada, así que N sesiones en serie tardan N veces más.
+    if results and results[0]["sessions"] == 1:
+        base = results[0]["seconds"]
+        for r in results[1:]:
+            print(f"{r['sessions']} sesiones: {r['seconds']}s frente a ~{round(base * r['sessions'], 2)}s en serie")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import taskdb
+import taskfile
+from agent import ProjectAgent, TASKS_DB
+
+# Compara los backends de almacenamiento de tareas (AGENT_STORAGE=markdown y
+# AGENT_STORAGE=sqlite) sobre un archivo de tareas grande:
+#
+#   python benchmarks/bench_storage.py --lines 1000000
+#
+# "primer acceso" es lo que cuesta la primera operación (parsear el .md o
+# importarlo a la base); "arranque" es summarize_project en un proceso nuevo
+# con el .md ya importado (sin caché en memoria).
+
+BENCH_PROJECT = "bench"
+BENCH_FILE = "tasks.md"
+BACKENDS = ("markdown", "sqlite")
+
+
+def task_text(i):
+    return f"tarea {i} del módulo {i % 97}"
+
+
+def build_workspace(root, lines):
+    path = os.path.join(root, "projects", BENCH_PROJECT)
+    os.makedirs(path)
+    with open(os.path.join(path, BENCH_FILE), "w", encoding="utf-8") as f:
+        f.write("# Tareas del proyecto\n\n")
+        chunk = 100_000
+        for start in range(0, lines, chunk):
+            f.write("".join(
+                f"- [{'x' if i % 2 else ' '}] {task_text(i)}\n"
+                for i in range(start, min(lines, start + chunk))
+            ))
+
+
+def new_agent(backend):
+    os.environ["AGENT_STORAGE"] = backend
+    agent = ProjectAgent()
+    agent.echo = False
+    agent.current_project = BENCH_PROJECT
+    agent.current_tasks_file = BENCH_FILE
+    return agent
+
+
+def forget_caches():
+    # Lo que perdería un proceso nuevo
+    with taskfile._lock:
+        taskfile._cache.clear()
+    with taskdb._open_lock:
+        taskdb._open.clear()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def ops(agent, lines):
+    # (nombre, preparación sin medir, operación medida)
+    last_pending = max(i for i in range(max(lines - 2, 0), lines) if i % 2 == 0)
+    counter = iter(range(10**9))
+    return [
+        ("create_task", None, lambda: agent.create_task(f"nueva {next(counter)}")),
+        ("complete_task (texto)", agent.undo_last_action,
+         lambda: agent.complete_task(task_text(last_pending))),
+        ("complete_task (número)", agent.undo_last_action,
+         lambda: agent.complete_task(str(last_pending + 1))),
+        ("list_tasks", None, agent.list_tasks),
+        ("list_tasks (pendientes, al final)", None,
+         lambda: agent.list_tasks(status="pending", offset=lines - 100)),
+        ("summarize_project", None, agent.summarize_project),
+    ]
+
+
+def run_backend(backend, lines, repeat):
+    results = {}
+    agent = new_agent(backend)
+    results["primer acceso"] = timed(agent.summarize_project)
+
+    for name, cleanup, op in ops(agent, lines):
+        times = []
+        for _ in range(repeat):
+            times.append(timed(op))
+            if cleanup:
+                cleanup()
+        results[name] = statistics.median(times)
+
+    if backend == "sqlite":
+        agent.tasks_io.export(force=True)
+        results["export (.md completo)"] = timed(lambda: agent.tasks_io.export(force=True))
+
+    forget_caches()
+    results["arranque"] = timed(new_agent(backend).summarize_project)
+    return results
+
+
+def db_size(path):
+    # En modo WAL lo último escrito puede estar aún en el -wal, sin volcar a la base
+    size = os.path.getsize(path)
+    with contextlib.suppress(FileNotFoundError):
+        size += os.path.getsize(path + "-wal")
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    report = {"lines": args.lines, "backends": {}}
+    for backend in BACKENDS:
+        root = tempfile.mkdtemp(prefix="bench_storage_")
+        try:
+            build_workspace(root, args.lines)
+            os.chdir(root)
+            with contextlib.redirect_stdout(io.StringIO()):
+                report["backends"][backend] = run_backend(backend, args.lines, args.repeat)
+            if backend == "sqlite":
+                report["db_bytes"] = db_size(TASKS_DB)
+        finally:
+            os.chdir(cwd)
+            forget_caches()
+            shutil.rmtree(root, ignore_errors=True)
+
+    md, db = report["backends"]["markdown"], report["backends"]["sqlite"]
+    print(f"{args.lines} tareas (mediana de {args.repeat})")
+    print(f"  {'operación':<36}{'markdown':>12}{'sqlite':>12}{'sqlite ops/s':>14}")
+    for name in db:
+        before = f"{md[name] * 1000:.2f} ms" if name in md else "-"
+        print(f"  {name:<36}{before:>12}{db[name] * 1000:>9.2f} ms{1 / db[name]:>14.1f}")
+    print(f"  base de datos: {report['db_bytes'] / 1e6:.1f} MB")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
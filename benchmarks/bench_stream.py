@@ -0,0 +1,93 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI
+
+from agent import ProjectAgent, format_user_message
+from fake_responses import FakeResponses
+
+# Compara el modo normal y el streaming: tiempo hasta el primer token y
+# latencia total del turno, contra el endpoint local con retardo por evento.
+#
+#   python benchmarks/bench_stream.py --token-delay 0.01
+
+
+class FirstWrite(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.first = None
+
+    def write(self, s):
+        if self.first is None and s:
+            self.first = time.perf_counter()
+        return super().write(s)
+
+
+def run_turn(client, agent, text, stream):
+    agent.messages.append(format_user_message(text))
+    while True:
+        response = client.responses.create(
+            model="fake",
+            input=agent.messages,
+            tools=agent.tools,
+            tool_choice="auto",
+            stream=stream
+        )
+        if stream:
+            called_tool = agent.process_stream(response)
+        else:
+            called_tool = agent.process_response(response)
+        if not called_tool:
+            break
+
+
+def measure(client, text, stream, repeat):
+    ttft, total = [], []
+    for _ in range(repeat):
+        agent = ProjectAgent()
+        agent.create_project(f"p{time.perf_counter_ns()}")
+        out = FirstWrite()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(out):
+            run_turn(client, agent, text, stream)
+        end = time.perf_counter()
+        ttft.append((out.first or end) - start)
+        total.append(end - start)
+    return {
+        "stream": stream,
+        "ttft_ms": round(1000 * sum(ttft) / repeat, 1),
+        "turn_ms": round(1000 * sum(total) / repeat, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_stream_"))
+    os.makedirs("projects", exist_ok=True)
+
+    # Una respuesta de texto larga y una con dos herramientas
+    text = " ".join(["palabra"] * 50)
+    tools = '/create_task {"task": "a"}\n/list_tasks {}'
+
+    with FakeResponses(token_delay=args.token_delay) as fake:
+        client = OpenAI(base_url=fake.base_url, api_key="fake")
+        for name, prompt in (("texto", text), ("herramientas", tools)):
+            for stream in (False, True):
+                result = measure(client, prompt, stream, args.repeat)
+                print(json.dumps(dict(result, caso=name)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Servidor local que imita POST /v1/responses para poder medir el agente
+# sin red ni API key.
+#
+# Guion del modelo falso, según el último item de `input`:
+# - mensaje de usuario cuyas líneas empiezan por "/": una function_call por
+#   línea, con el formato "/<tool> <json de argumentos>"
+# - function_call_output: un mensaje de texto "ok"
+# - cualquier otro mensaje: se responde con el mismo texto
+#
+# Con "stream": true se emiten los eventos SSE de la Responses API, uno cada
+# `token_delay` segundos (un delta por palabra).
+#
+# Fallos inyectados (para probar resilience.py): una fracción `tail_rate` de
+# las peticiones tarda `tail_latency` en vez de `latency`, una fracción
+# `error_rate` responde 500 y `model_latency` fija la latencia por modelo
+# (p. ej. {"modelo-lento": 30} para forzar el modelo de respaldo).
+#
+# Los ids de las respuestas se guardan para aceptar previous_response_id;
+# tras forget() las peticiones que encadenan con una respuesta anterior
+# reciben el 400 previous_response_not_found de la API real.
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def handle_error(self, request, client_address):
+        # Clientes que cortan por timeout (o hedge) antes de la respuesta
+        pass
+
+
+def _message(text, n):
+    return {
+        "type": "message",
+        "id": f"msg_{n}",
+        "role": "assistant",
+        "status": "completed",
+        "content": [{"type": "output_text", "text": text, "annotations": []}]
+    }
+
+
+def _function_call(line, n, i):
+    name, _, args = line[1:].partition(" ")
+    return {
+        "type": "function_call",
+        "id": f"fc_{n}_{i}",
+        "call_id": f"call_{n}_{i}",
+        "name": name,
+        "arguments": args.strip() or "{}",
+        "status": "completed"
+    }
+
+
+def _user_text(item):
+    content = item.get("content", "")
+    if isinstance(content, str):
+        return content
+    return "\n".join(part.get("text", "") for part in content)
+
+
+class FakeResponses:
+    def __init__(self, latency=0.0, token_delay=0.0, host="127.0.0.1", port=0,
+                 tail_rate=0.0, tail_latency=0.0, error_rate=0.0, model_latency=None, seed=None):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.error_rate = error_rate
+        self.model_latency = model_latency or {}
+        self._random = random.Random(seed)
+        self.stored = set()
+        self.requests = 0
+        self.errors = 0
+        self.bytes_received = 0
+        # Bytes de cada petición, en orden de llegada
+        self.request_bytes = []
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def delay_for(self, body):
+        with self._lock:
+            roll = self._random.random()
+        if body.get("model") in self.model_latency:
+            return self.model_latency[body["model"]]
+        return self.tail_latency if roll < self.tail_rate else self.latency
+
+    def should_fail(self):
+        with self._lock:
+            fail = self._random.random() < self.error_rate
+            self.errors += fail
+            return fail
+
+    def forget(self):
+        # Como si las respuestas guardadas hubieran caducado
+        with self._lock:
+            self.stored.clear()
+
+    def knows(self, response_id):
+        with self._lock:
+            return response_id in self.stored
+
+    def respond(self, body):
+        with self._lock:
+            self.requests += 1
+            n = self.requests
+            self.stored.add(f"resp_{n}")
+
+        items = body.get("input") or []
+        if isinstance(items, str):
+            items = [{"role": "user", "content": items}]
+        last = items[-1] if items else {}
+
+        if last.get("type") == "function_call_output":
+            output = [_message("ok", n)]
+        else:
+            text = _user_text(last)
+            lines = [l for l in text.splitlines() if l.startswith("/")]
+            if lines:
+                output = [_function_call(l, n, i) for i, l in enumerate(lines)]
+            else:
+                output = [_message(text, n)]
+
+        return {
+            "id": f"resp_{n}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": body.get("model", "fake"),
+            "status": "completed",
+            "output": output,
+            "parallel_tool_calls": True,
+            "tool_choice": body.get("tool_choice", "auto"),
+            "tools": [],
+            "usage": {
+                "input_tokens": len(json.dumps(items)) // 4,
+                "output_tokens": len(json.dumps(output)) // 4,
+                "total_tokens": (len(json.dumps(items)) + len(json.dumps(output))) // 4,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens_details": {"reasoning_tokens": 0}
+            }
+        }
+
+    def stream_events(self, response):
+        seq = 0
+
+        def event(type_, **fields):
+            nonlocal seq
+            seq += 1
+            return dict(type=type_, sequence_number=seq, **fields)
+
+        in_progress = dict(response, status="in_progress", output=[])
+        yield event("response.created", response=in_progress)
+
+        for index, item in enumerate(response["output"]):
+            if item["type"] == "message":
+                text = item["content"][0]["text"]
+                yield event("response.output_item.added", output_index=index,
+                            item=dict(item, status="in_progress", content=[]))
+                for word in text.split(" "):
+                    yield event("response.output_text.delta", item_id=item["id"],
+                                output_index=index, content_index=0,
+                                delta=word + " ", logprobs=[])
+                yield event("response.output_text.done", item_id=item["id"],
+                            output_index=index, content_index=0, text=text, logprobs=[])
+            else:
+                yield event("response.output_item.added", output_index=index,
+                            item=dict(item, status="in_progress", arguments=""))
+                yield event("response.function_call_arguments.delta", item_id=item["id"],
+                            output_index=index, delta=item["arguments"])
+                yield event("response.function_call_arguments.done", item_id=item["id"],
+                            output_index=index, name=item["name"],
+                            arguments=item["arguments"])
+            yield event("response.output_item.done", output_index=index, item=item)
+
+        yield event("response.completed", response=response)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                raw = self.rfile.read(length)
+                with fake._lock:
+                    fake.bytes_received += len(raw)
+                    fake.request_bytes.append(len(raw))
+
+                body = json.loads(raw)
+                delay = fake.delay_for(body)
+                if delay:
+                    time.sleep(delay)
+
+                if fake.should_fail():
+                    return self.error(500, {"message": "fallo inyectado", "type": "server_error"})
+
+                previous = body.get("previous_response_id")
+                if previous and not fake.knows(previous):
+                    return self.error(400, {
+                        "message": f"Previous response with id '{previous}' not found.",
+                        "type": "invalid_request_error",
+                        "param": "previous_response_id",
+                        "code": "previous_response_not_found"
+                    })
+
+                response = fake.respond(body)
+
+                if body.get("stream"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.end_headers()
+                    for event in fake.stream_events(response):
+                        if fake.token_delay:
+                            time.sleep(fake.token_delay)
+                        chunk = f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                        self.wfile.write(chunk.encode())
+                        self.wfile.flush()
+                    return
+
+                # Sin streaming el cliente espera a que se "generen" todos los eventos
+                if fake.token_delay:
+                    time.sleep(fake.token_delay * sum(1 for _ in fake.stream_events(response)))
+
+                data = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def error(self, status, error):
+                data = json.dumps({"error": error}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
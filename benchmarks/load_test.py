@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI
+
+from model_client import ModelClient
+from server import make_server
+from fake_responses import FakeResponses
+
+# Prueba de carga del modo servidor: N sesiones concurrentes haciendo turnos
+# contra server.py, que a su vez habla con el endpoint Responses local.
+# Informa p50/p99 de la latencia por turno vista por el cliente HTTP.
+#
+#   python benchmarks/load_test.py --sessions 1 10 100 --turns 5 --latency 0.05
+
+
+def post(url, data):
+    request = urllib.request.Request(
+        url, data=json.dumps(data).encode(), method="POST",
+        headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=60) as r:
+        return json.loads(r.read())
+
+
+def session_turns(i, turns):
+    yield '/create_project {"project": "load_%d"}' % i
+    for t in range(turns):
+        yield '/create_task {"task": "tarea %d"}\n/list_tasks {}' % t
+
+
+def run_session(base_url, i, turns, latencies, lock):
+    for text in session_turns(i, turns):
+        start = time.perf_counter()
+        post(f"{base_url}/sessions/s{i}/turns", {"text": text})
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(p / 100 * len(values)) - 1))
+    return values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="load_test_"))
+    os.makedirs("projects", exist_ok=True)
+
+    with FakeResponses(latency=args.latency) as fake:
+        client = ModelClient(OpenAI(base_url=fake.base_url, api_key="fake"))
+        server = make_server(client, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+        base_url = f"http://{host}:{port}"
+
+        offset = 0
+        for n in args.sessions:
+            latencies, lock = [], threading.Lock()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=n) as pool:
+                futures = [
+                    pool.submit(run_session, base_url, offset + i, args.turns, latencies, lock)
+                    for i in range(n)
+                ]
+            errors = [str(f.exception()) for f in futures if f.exception()]
+            elapsed = time.perf_counter() - start
+            offset += n
+
+            print(json.dumps({
+                "sessions": n,
+                "turns": len(latencies),
+                "p50_ms": round(1000 * statistics.median(latencies), 1),
+                "p99_ms": round(1000 * percentile(latencies, 99), 1),
+                "turns_per_second": round(len(latencies) / elapsed, 1),
+                "errors": len(errors)
+            }))
+            for error in sorted(set(errors)):
+                print(f"  error: {error}")
+
+        server.manager.stop()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import json
+import os
+
+# Estimación local: ~4 caracteres por token, más un pequeño coste fijo por item
+CHARS_PER_TOKEN = 4
+ITEM_OVERHEAD = 4
+
+MAX_CONTEXT_TOKENS = int(os.getenv("AGENT_CONTEXT_TOKENS", "8000"))
+
+
+def as_dict(item):
+    # Los items que vienen de response.output son modelos del SDK
+    if hasattr(item, "model_dump"):
+        return item.model_dump(exclude_none=True)
+    return item
+
+
+def estimate_tokens(item):
+    text = json.dumps(as_dict(item), ensure_ascii=False)
+    return len(text) // CHARS_PER_TOKEN + ITEM_OVERHEAD
+
+
+def _item_type(item):
+    item = as_dict(item)
+    return item.get("type") or ("message" if "role" in item else None)
+
+
+def _is_user(item):
+    return as_dict(item).get("role") == "user"
+
+
+def _text(item):
+    content = as_dict(item).get("content", "")
+    if isinstance(content, str):
+        return content
+    return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+
+
+def _short(text, limit=120):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class ContextManager:
+    # Mantiene agent.messages por debajo de un presupuesto de tokens:
+    # 1. las salidas de herramientas grandes de turnos antiguos se sustituyen por un stub
+    # 2. si sigue sin caber, los turnos más antiguos se pliegan en un resumen
+    # Un turno va de un mensaje de usuario al siguiente, así que una
+    # function_call nunca se separa de su function_call_output.
+    def __init__(self, max_tokens=MAX_CONTEXT_TOKENS, stub_tokens=300,
+                 keep_turns=2, summary_chars=2000):
+        self.max_tokens = max_tokens
+        self.stub_tokens = stub_tokens
+        self.keep_turns = max(1, keep_turns)
+        self.summary_chars = summary_chars
+
+        self.summary_lines = []
+        self.summary_item = None
+        self._tokens = {}
+
+        self.sent = []
+        self.stubbed = 0
+        self.folded_turns = 0
+
+    def _count(self, item):
+        key = id(item)
+        if key not in self._tokens:
+            self._tokens[key] = (item, estimate_tokens(item))
+        return self._tokens[key][1]
+
+    def _split_turns(self, items):
+        turns = []
+        for item in items:
+            if _is_user(item) or not turns:
+                turns.append([])
+            turns[-1].append(item)
+        return turns
+
+    def _stub(self, turn):
+        for i, item in enumerate(turn):
+            if _item_type(item) != "function_call_output":
+                continue
+            tokens = self._count(item)
+            if tokens <= self.stub_tokens:
+                continue
+            data = as_dict(item)
+            turn[i] = {
+                "type": "function_call_output",
+                "call_id": data["call_id"],
+                "output": json.dumps({"result": f"[salida omitida: ~{tokens} tokens]"})
+            }
+            self.stubbed += 1
+
+    def _fold(self, turn):
+        parts = []
+        tools = []
+        for item in turn:
+            kind = _item_type(item)
+            if _is_user(item):
+                parts.append(f"usuario: {_short(_text(item))}")
+            elif kind == "function_call":
+                tools.append(as_dict(item).get("name", "?"))
+            elif kind == "message":
+                parts.append(f"asistente: {_short(_text(item))}")
+        if tools:
+            parts.append(f"herramientas: {', '.join(tools)}")
+        self.summary_lines.append(" | ".join(parts))
+
+        while len("\n".join(self.summary_lines)) > self.summary_chars and len(self.summary_lines) > 1:
+            self.summary_lines.pop(0)
+
+        self.summary_item = {
+            "role": "system",
+            "content": "Resumen de turnos anteriores:\n" + "\n".join(self.summary_lines)
+        }
+        self.folded_turns += 1
+
+    def _total(self, head, turns):
+        return sum(self._count(i) for i in head) + sum(
+            self._count(i) for turn in turns for i in turn
+        )
+
+    def fit(self, messages):
+        system = messages[:1]
+        rest = [m for m in messages[1:] if m is not self.summary_item]
+        turns = self._split_turns(rest)
+
+        # El turno en curso nunca se toca: el modelo necesita sus salidas completas
+        for turn in turns[:-self.keep_turns]:
+            self._stub(turn)
+
+        def head():
+            return system + ([self.summary_item] if self.summary_item else [])
+
+        while len(turns) > self.keep_turns and self._total(head(), turns) > self.max_tokens:
+            self._fold(turns.pop(0))
+
+        if self._total(head(), turns) > self.max_tokens:
+            for turn in turns[:-1]:
+                self._stub(turn)
+
+        fitted = head() + [item for turn in turns for item in turn]
+
+        # Olvidar las estimaciones de items que ya no se envían
+        live = {id(item) for item in fitted}
+        self._tokens = {k: v for k, v in self._tokens.items() if k in live}
+
+        self.sent.append(self._total(fitted, []))
+        return fitted
+
+    def stats(self):
+        sent = self.sent or [0]
+        return {
+            "requests": len(self.sent),
+            "last_tokens": sent[-1],
+            "avg_tokens": round(sum(sent) / len(sent)),
+            "max_tokens": max(sent),
+            "total_tokens": sum(self.sent),
+            "stubbed_outputs": self.stubbed,
+            "folded_turns": self.folded_turns
+        }
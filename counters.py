@@ -0,0 +1,195 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+# Contadores de tareas (total/completadas) por archivo y por proyecto,
+# mantenidos incrementalmente: las herramientas que escriben tareas, editan,
+# borran o renombran archivos los actualizan al momento, así que los
+# resúmenes de proyecto y de workspace no leen ningún archivo de tareas.
+#
+# Se guardan en un archivo aparte (STATS_PATH, JSON) con el mtime y el tamaño
+# de cada archivo: si un .md cambió fuera del agente, sus contadores se
+# recalculan (solo los de ese archivo) la próxima vez que se piden. Solo se
+# guardan archivos de dentro de `root` (la carpeta de proyectos): lo que sale
+# de ella (a la papelera) se olvida y, si vuelve, se cuenta de nuevo.
+
+SAVE_INTERVAL = 1.0
+
+# Contadores abiertos, para guardar lo pendiente si el proceso termina
+_open = {}
+_open_lock = threading.Lock()
+
+
+class Project:
+    __slots__ = ("files", "total", "completed")
+
+    def __init__(self):
+        self.files = set()
+        self.total = 0
+        self.completed = 0
+
+    @property
+    def pending(self):
+        return self.total - self.completed
+
+
+def _under(key, root):
+    return key == root or key.startswith(root + os.sep)
+
+
+class TaskCounters:
+    def __init__(self, path, root):
+        self.path = path
+        self.root = os.path.abspath(root)
+        # ruta absoluta del .md -> [mtime_ns, size, total, completadas]
+        self.files = {}
+        # carpeta del proyecto -> Project (sumas de sus archivos)
+        self.projects = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._saved_at = 0.0
+
+        try:
+            with open(path, encoding="utf-8") as f:
+                files = json.load(f)["files"]
+        except (FileNotFoundError, ValueError, KeyError):
+            files = {}
+        for key, entry in files.items():
+            if _under(key, self.root):
+                self._set(key, entry)
+        # Si se descartó algo (entradas de la papelera de versiones anteriores),
+        # el próximo guardado ya no lo incluye
+        self._dirty = len(self.files) != len(files)
+
+    def _set(self, key, entry):
+        self._drop(key)
+        self.files[key] = entry
+        project = self.projects.setdefault(os.path.dirname(key), Project())
+        project.files.add(key)
+        project.total += entry[2]
+        project.completed += entry[3]
+        self._dirty = True
+
+    def _drop(self, key):
+        entry = self.files.pop(key, None)
+        if entry is None:
+            return
+        directory = os.path.dirname(key)
+        project = self.projects[directory]
+        project.files.discard(key)
+        project.total -= entry[2]
+        project.completed -= entry[3]
+        if not project.files:
+            del self.projects[directory]
+        self._dirty = True
+
+    ############### ACTUALIZACIONES ###############
+
+    def update(self, path, tf):
+        # `tf`: el TaskFile (o DBTaskFile) de `path` tras escribirlo
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return self.removed(path)
+        with self._lock:
+            self._set(os.path.abspath(path), [st.st_mtime_ns, st.st_size, tf.total, tf.completed])
+        self.save(force=False)
+
+    def moved(self, old, new):
+        # `old` (archivo o carpeta de proyecto) ahora está en `new`
+        old, new = os.path.abspath(old), os.path.abspath(new)
+        with self._lock:
+            for key in [k for k in self.files if _under(k, old)]:
+                entry = self.files[key]
+                self._drop(key)
+                if _under(new, self.root):
+                    self._set(new + key[len(old):], entry)
+        self.save(force=False)
+
+    def removed(self, path):
+        root = os.path.abspath(path)
+        with self._lock:
+            for key in [k for k in self.files if _under(k, root)]:
+                self._drop(key)
+        self.save(force=False)
+
+    def invalidate(self, path):
+        # Se recalculará la próxima vez que se pida
+        with self._lock:
+            self._drop(os.path.abspath(path))
+
+    ############### CONSULTAS ###############
+
+    def project(self, directory, loader):
+        # Project de `directory` comprobado contra el disco: un stat por
+        # archivo; solo se cargan (con loader(ruta) -> TaskFile) los .md
+        # nuevos o cuyo mtime/tamaño no coincide
+        directory = os.path.abspath(directory)
+        with self._lock:
+            seen = set()
+            for entry in os.scandir(directory):
+                if not entry.name.endswith(".md") or not entry.is_file():
+                    continue
+                st = entry.stat()
+                seen.add(entry.path)
+                cached = self.files.get(entry.path)
+                if cached and (cached[0], cached[1]) == (st.st_mtime_ns, st.st_size):
+                    continue
+                try:
+                    tf = loader(entry.path)
+                except FileNotFoundError:
+                    seen.discard(entry.path)
+                    continue
+                self._set(entry.path, [st.st_mtime_ns, st.st_size, tf.total, tf.completed])
+
+            project = self.projects.get(directory)
+            if project:
+                for key in project.files - seen:
+                    self._drop(key)
+            project = self.projects.get(directory) or Project()
+        self.save(force=False)
+        return project
+
+    def workspace(self, projects_dir, loader):
+        # {nombre del proyecto: Project} de todas las carpetas de projects_dir
+        if not os.path.isdir(projects_dir):
+            return {}
+        return {
+            entry.name: self.project(entry.path, loader)
+            for entry in os.scandir(projects_dir) if entry.is_dir()
+        }
+
+    ############### PERSISTENCIA ###############
+
+    def save(self, force=True):
+        # Como mucho una escritura cada SAVE_INTERVAL, salvo con force
+        with self._lock:
+            if not self._dirty:
+                return
+            if not force and time.monotonic() - self._saved_at < SAVE_INTERVAL:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"files": self.files}, f)
+            os.replace(tmp, self.path)
+            self._dirty = False
+            self._saved_at = time.monotonic()
+
+
+@atexit.register
+def _save_all():
+    for counters in list(_open.values()):
+        counters.save()
+
+
+def open_counters(path, root):
+    # Unos contadores por ruta y proceso, compartidos por todas las sesiones
+    key = os.path.abspath(path)
+    with _open_lock:
+        counters = _open.get(key)
+        if counters is None:
+            counters = _open[key] = TaskCounters(key, root)
+        return counters
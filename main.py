@@ -1,47 +1,107 @@
-from openai import OpenAI
-from dotenv import load_dotenv
-from agent import ProjectAgent
-import sys
-
-load_dotenv()
-
-client = OpenAI()
-agent = ProjectAgent()
-
-print("Project Agent listo (escribe 'salir' para terminar)")
-
-def format_user_message(text):
-    return {
-        "role": "user",
-        "content": [
-            {"type": "input_text", "text": text}
-        ]
-    }
-
-while True:
-    try:
-        user_input = input("Tú: ").strip()
-
-        if user_input.lower() in ("salir", "exit"):
-            print(" Hasta luego")
-            break
-
-        agent.messages.append(format_user_message(user_input))
-
-        while True:
-            response = client.responses.create(
-                model="gpt-4o-mini",
-                input=agent.messages,
-                tools=agent.tools,
-                tool_choice="auto"
-            )
-
-            called_tool = agent.process_response(response)
-            if not called_tool:
-                break
-
-        if len(agent.messages) > 20:
-            agent.messages = agent.messages[:1] + agent.messages[-10:]
-
-    except Exception as e:
-        print(f" Error: {e}")
+from openai import OpenAI
+from dotenv import load_dotenv
+from agent import ProjectAgent, format_user_message
+from model_client import ModelClient, cache_from_env
+from resilience import policy_from_env
+from router import router_from_env
+from telemetry import format_stats, tracer_from_env
+import sys
+import os
+import time
+
+load_dotenv()
+
+STREAM = os.getenv("AGENT_STREAM") == "1"
+ROUTER = router_from_env()
+TRACER = tracer_from_env()
+
+#Run Turn
+def run_turn(client, agent, user_input, stream=STREAM, router=ROUTER, tracer=TRACER):
+    start = time.perf_counter()
+
+    # Órdenes triviales resueltas sin llamar al modelo (AGENT_ROUTER=1)
+    if router and router.handle(agent, user_input):
+        agent.end_turn()
+        if tracer:
+            tracer.turn(start, local=True)
+        return
+
+    agent.messages.append(format_user_message(user_input))
+
+    while True:
+        agent.messages = agent.context.fit(agent.messages)
+        response = client.create(agent, stream=stream)
+
+        if stream:
+            called_tool = agent.process_stream(response)
+        else:
+            called_tool = agent.process_response(response)
+        if not called_tool:
+            break
+
+    # Con AGENT_WRITE_BEHIND, aquí se escriben las tareas del turno
+    agent.end_turn()
+    if router:
+        router.record_model_turn(time.perf_counter() - start)
+    if tracer:
+        tracer.turn(start)
+
+
+#Console Commands
+def console_command(client, agent, command, router=ROUTER, tracer=TRACER):
+    # Órdenes de la consola que no van al modelo (las comparten main y
+    # main_async): devuelve el texto a mostrar, o None si no es una orden
+    command = command.lower()
+
+    if command == "contexto":
+        lines = [str(agent.context.stats())]
+        if client.chain:
+            lines.append(str(client.chain_stats()))
+        return "\n".join(lines)
+
+    if command == "historial":
+        return str(agent.undo_stack.stats())
+
+    if command == "cache":
+        return str(client.cache.stats()) if client.cache else "Caché de respuestas desactivada."
+
+    if command == "stats":
+        return format_stats(tracer.stats()) if tracer else "Trazas desactivadas (AGENT_TRACE=1)."
+
+    if command == "modelo":
+        return str(client.policy.stats()) if client.policy else "Política de llamadas desactivada."
+
+    if command == "router":
+        return str(router.stats()) if router else "Router local desactivado."
+
+    return None
+
+
+def main():
+    client = ModelClient(OpenAI(), cache=cache_from_env(), tracer=TRACER,
+                         policy=policy_from_env())
+    agent = ProjectAgent()
+
+    print("Project Agent listo (escribe 'salir' para terminar)")
+
+    while True:
+        try:
+            user_input = input("Tú: ").strip()
+
+            if user_input.lower() in ("salir", "exit"):
+                print(" Hasta luego")
+                break
+
+            output = console_command(client, agent, user_input)
+            if output is not None:
+                print(output)
+                continue
+
+            run_turn(client, agent, user_input)
+
+        except Exception as e:
+            print(f" Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+from agent import ProjectAgent, format_user_message
+from main import ROUTER, TRACER, console_command
+from model_client import ModelClient, cache_from_env
+from resilience import policy_from_env
+import asyncio
+import os
+import time
+
+STREAM = os.getenv("AGENT_STREAM") == "1"
+
+#Run Turn
+async def run_turn(client, agent, user_input, router=ROUTER, tracer=TRACER):
+    start = time.perf_counter()
+
+    if router and await asyncio.to_thread(router.handle, agent, user_input):
+        await asyncio.to_thread(agent.end_turn)
+        if tracer:
+            tracer.turn(start, local=True)
+        return
+
+    agent.messages.append(format_user_message(user_input))
+
+    while True:
+        agent.messages = agent.context.fit(agent.messages)
+        response = await client.create_async(agent, stream=STREAM)
+
+        if STREAM:
+            called_tool = await agent.process_stream_async(response)
+        else:
+            called_tool = await agent.process_response_async(response)
+        if not called_tool:
+            break
+
+    await asyncio.to_thread(agent.end_turn)
+    if router:
+        router.record_model_turn(time.perf_counter() - start)
+    if tracer:
+        tracer.turn(start)
+
+
+async def main():
+    load_dotenv()
+
+    client = ModelClient(AsyncOpenAI(), cache=cache_from_env(), tracer=TRACER,
+                         policy=policy_from_env())
+    agent = ProjectAgent()
+
+    print("Project Agent (async) listo (escribe 'salir' para terminar)")
+
+    while True:
+        try:
+            user_input = (await asyncio.to_thread(input, "Tú: ")).strip()
+
+            if user_input.lower() in ("salir", "exit"):
+                print(" Hasta luego")
+                break
+
+            output = console_command(client, agent, user_input)
+            if output is not None:
+                print(output)
+                continue
+
+            await run_turn(client, agent, user_input)
+
+        except Exception as e:
+            print(f" Error: {e}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
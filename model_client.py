@@ -0,0 +1,282 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import openai
+
+from context import as_dict
+
+MODEL = os.getenv("AGENT_MODEL", "gpt-4o-mini")
+
+# Con AGENT_CHAIN=1 cada petición encadena con la anterior (previous_response_id)
+# y solo envía los items nuevos: salidas de herramientas y mensajes de usuario
+CHAIN = os.getenv("AGENT_CHAIN") == "1"
+
+# Mismo valor en todas las peticiones para que el proveedor enrute al mismo
+# caché de prompt (tools + mensaje de sistema son el prefijo común)
+PROMPT_CACHE_KEY = "project-agent"
+
+
+#Build Request
+def build_request(agent, model=MODEL, stream=False, chain=False):
+    # El prefijo estático va primero y siempre igual: tools (mismo objeto y
+    # mismo orden en todas las llamadas) y el mensaje de sistema en input[0].
+    # Lo que cambia (resumen, historial, turno actual) va detrás.
+    request = {
+        "model": model,
+        "tool_choice": "auto",
+        "tools": agent.tools,
+        "input": agent.messages,
+        "prompt_cache_key": PROMPT_CACHE_KEY,
+        "stream": stream
+    }
+    chained = chained_input(agent) if chain else None
+    if chained:
+        # El historial lo tiene el proveedor: lo que no quepa en su ventana de
+        # contexto lo recorta él (el ContextManager solo ve la copia local)
+        request["previous_response_id"], request["input"] = chained
+        request["truncation"] = "auto"
+    return request
+
+
+def chained_input(agent):
+    # (id de la última respuesta, items de agent.messages posteriores a ella)
+    # o None si no hay cadena o su último item ya no está en el historial
+    # (plegado por el ContextManager): entonces se envía el historial completo
+    chain = getattr(agent, "chain", None)
+    if chain is None:
+        return None
+    response_id, anchor = chain
+    messages = agent.messages
+    for i in range(len(messages) - 1, 0, -1):
+        if messages[i] is anchor:
+            items = messages[i + 1:]
+            return (response_id, items) if items else None
+    return None
+
+
+def chain_lost(error):
+    # El proveedor ya no tiene la respuesta anterior (caducada, borrada, otra cuenta...)
+    return (getattr(error, "code", None) == "previous_response_not_found"
+            or "previous_response" in str(error))
+
+
+class ResponseCache:
+    # Caché local (opt-in) de respuestas completas, LRU + TTL, indexada por
+    # un hash de (model, tools, input). Solo para peticiones sin streaming.
+    def __init__(self, max_entries=256, ttl=600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._tools_json = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def _tools(self, tools):
+        # Las tools son la misma lista (ProjectAgent.tools) en cada llamada:
+        # es el único sitio donde se serializan, una vez por proceso
+        key = id(tools)
+        if key not in self._tools_json:
+            self._tools_json[key] = (tools, json.dumps(tools, sort_keys=True))
+        return self._tools_json[key][1]
+
+    def key(self, request):
+        items = json.dumps([as_dict(i) for i in request["input"]], sort_keys=True, default=str)
+        tools = self._tools(request["tools"])
+        previous = request.get("previous_response_id", "")
+        body = "\n".join((request["model"], previous, tools, items))
+        return hashlib.sha256(body.encode()).hexdigest(), len(body)
+
+    def get(self, request):
+        key, size = self.key(request)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return key, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.bytes_saved += size + entry[2]
+            return key, entry[1]
+
+    def put(self, key, response):
+        size = len(response.model_dump_json()) if hasattr(response, "model_dump_json") else 0
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, response, size)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "bytes_saved": self.bytes_saved
+        }
+
+
+class ModelClient:
+    # Envuelve client.responses.create (OpenAI o AsyncOpenAI) con el layout
+    # de build_request y, si se pasan, la caché local de respuestas, el
+    # Tracer (un span por llamada real a la API) y la CallPolicy de
+    # resilience.py (timeouts, reintentos, hedge y modelo de respaldo).
+    # Con chain=True cada agente encadena sus peticiones (agent.chain).
+    def __init__(self, client, model=MODEL, cache=None, tracer=None, policy=None, chain=CHAIN):
+        # Con política, los reintentos son suyos y no del SDK
+        self.client = client if policy is None else client.with_options(max_retries=0)
+        self.model = model
+        self.cache = cache
+        self.tracer = tracer
+        self.policy = policy
+        self.chain = chain
+
+        self.chained = 0
+        self.full = 0
+        self.chains_lost = 0
+
+    def _send(self, request, timeout=None):
+        kwargs = request if timeout is None else dict(request, timeout=timeout)
+        if self.tracer is None:
+            return self.client.responses.create(**kwargs)
+
+        start = time.perf_counter()
+        response = self.client.responses.create(**kwargs)
+        if request["stream"]:
+            return self.tracer.wrap_stream(response, request["model"], start)
+        self.tracer.llm(request["model"], start, response)
+        return response
+
+    async def _send_async(self, request, timeout=None):
+        kwargs = request if timeout is None else dict(request, timeout=timeout)
+        if self.tracer is None:
+            return await self.client.responses.create(**kwargs)
+
+        start = time.perf_counter()
+        response = await self.client.responses.create(**kwargs)
+        if request["stream"]:
+            return self.tracer.wrap_stream_async(response, request["model"], start)
+        self.tracer.llm(request["model"], start, response)
+        return response
+
+    def _call(self, request):
+        if self.policy is None:
+            return self._send(request)
+        return self.policy.call(self._send, request)
+
+    async def _call_async(self, request):
+        if self.policy is None:
+            return await self._send_async(request)
+        return await self.policy.call_async(self._send_async, request)
+
+    def _cached(self, request):
+        if self.cache is None or request["stream"]:
+            return self._call(request)
+
+        key, response = self.cache.get(request)
+        if response is None:
+            response = self._call(request)
+            self.cache.put(key, response)
+        return response
+
+    async def _cached_async(self, request):
+        if self.cache is None or request["stream"]:
+            return await self._call_async(request)
+
+        key, response = self.cache.get(request)
+        if response is None:
+            response = await self._call_async(request)
+            self.cache.put(key, response)
+        return response
+
+    def create(self, agent, stream=False):
+        if not self.chain:
+            return self._cached(build_request(agent, self.model, stream))
+
+        request = build_request(agent, self.model, stream, chain=True)
+        try:
+            response = self._cached(request)
+        except (openai.BadRequestError, openai.NotFoundError) as error:
+            if "previous_response_id" not in request or not chain_lost(error):
+                raise
+            request = self._lost(agent, stream)
+            response = self._cached(request)
+        if stream:
+            return self._follow_stream(agent, request, response)
+        self._link(agent, request, response)
+        return response
+
+    async def create_async(self, agent, stream=False):
+        if not self.chain:
+            return await self._cached_async(build_request(agent, self.model, stream))
+
+        request = build_request(agent, self.model, stream, chain=True)
+        try:
+            response = await self._cached_async(request)
+        except (openai.BadRequestError, openai.NotFoundError) as error:
+            if "previous_response_id" not in request or not chain_lost(error):
+                raise
+            request = self._lost(agent, stream)
+            response = await self._cached_async(request)
+        if stream:
+            return self._follow_async(agent, request, response)
+        self._link(agent, request, response)
+        return response
+
+    ############### CADENA (previous_response_id) ###############
+
+    def _lost(self, agent, stream):
+        # Se vuelve a enviar el historial completo y la cadena empieza de nuevo
+        self.chains_lost += 1
+        agent.chain = None
+        return build_request(agent, self.model, stream)
+
+    def _link(self, agent, request, response):
+        # Los items de response.output son los mismos objetos que el agente
+        # añade a su historial: el último marca hasta dónde llega la cadena
+        if "previous_response_id" in request:
+            self.chained += 1
+        else:
+            self.full += 1
+        anchor = response.output[-1] if response.output else request["input"][-1]
+        agent.chain = (response.id, anchor)
+
+    def _follow_stream(self, agent, request, stream):
+        for event in stream:
+            if event.type == "response.completed":
+                self._link(agent, request, event.response)
+            yield event
+
+    async def _follow_async(self, agent, request, stream):
+        async for event in stream:
+            if event.type == "response.completed":
+                self._link(agent, request, event.response)
+            yield event
+
+    def chain_stats(self):
+        return {
+            "chained": self.chained,
+            "full": self.full,
+            "chains_lost": self.chains_lost
+        }
+
+
+def cache_from_env():
+    if os.getenv("AGENT_RESPONSE_CACHE") != "1":
+        return None
+    return ResponseCache(
+        max_entries=int(os.getenv("AGENT_RESPONSE_CACHE_SIZE", "256")),
+        ttl=float(os.getenv("AGENT_RESPONSE_CACHE_TTL", "600"))
+    )
@@ -0,0 +1,286 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import openai
+
+from telemetry import percentile
+
+# Política de llamadas al modelo (opt-in, AGENT_MODEL_TIMEOUT/AGENT_MODEL_RETRIES/...):
+# - cada intento tiene un timeout (AGENT_MODEL_TIMEOUT) y la llamada entera un
+#   plazo total (AGENT_MODEL_DEADLINE) que ningún reintento supera
+# - los errores reintentables (timeouts, conexión, 408/409/429/5xx) se
+#   reintentan con backoff exponencial con jitter (AGENT_MODEL_RETRIES veces);
+#   si el servidor manda Retry-After, se respeta (hasta MAX_BACKOFF)
+# - con AGENT_MODEL_HEDGE=1, si una petición sin streaming no ha respondido en
+#   el p95 de las latencias recientes se lanza una segunda idéntica y se usa la
+#   primera que termine
+# - con AGENT_FALLBACK_MODEL, tras AGENT_FALLBACK_AFTER timeouts seguidos del
+#   modelo principal los intentos que quedan (y las llamadas de los siguientes
+#   FALLBACK_COOLDOWN segundos) van al modelo de respaldo
+#
+# Los errores no reintentables (400, 401, 404...) se propagan al momento. Con
+# streaming solo se reintenta hasta recibir la respuesta HTTP: una vez empiezan
+# los eventos, el agente ya puede estar ejecutando herramientas.
+
+RETRYABLE_STATUS = (408, 409, 429)
+BACKOFF = 0.5
+MAX_BACKOFF = 8.0
+FALLBACK_COOLDOWN = 60.0
+
+# Latencias (s) con las que se calcula el p95 del hedge
+SAMPLES = 200
+MIN_SAMPLES = 20
+HEDGE_PERCENTILE = 95
+
+
+def is_timeout(error):
+    return isinstance(error, openai.APITimeoutError)
+
+
+def is_retryable(error):
+    if isinstance(error, openai.APIConnectionError):
+        # Incluye APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class CallPolicy:
+    def __init__(self, timeout=60.0, deadline=180.0, retries=3, backoff=BACKOFF,
+                 max_backoff=MAX_BACKOFF, hedge=False, fallback_model=None,
+                 fallback_after=2, fallback_cooldown=FALLBACK_COOLDOWN):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.fallback_model = fallback_model
+        self.fallback_after = fallback_after
+        self.fallback_cooldown = fallback_cooldown
+
+        self.latencies = deque(maxlen=SAMPLES)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge") if hedge else None
+        self._fallback_until = 0.0
+
+        self.calls = 0
+        self.attempts = 0
+        self.retried = 0
+        self.timeouts = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+        self.failures = 0
+
+    ############### DECISIONES ###############
+
+    def hedge_delay(self):
+        # p95 de las latencias recientes; sin muestras suficientes no hay hedge
+        with self._lock:
+            if not self.hedge or len(self.latencies) < MIN_SAMPLES:
+                return None
+            return percentile(self.latencies, HEDGE_PERCENTILE)
+
+    def sleep_for(self, attempt, error):
+        # Full jitter: uniforme entre 0 y backoff * 2^intento (con tope)
+        wait_s = _retry_after(error)
+        if wait_s is None:
+            wait_s = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        return min(wait_s, self.max_backoff)
+
+    def _model(self, request, timeouts):
+        if not self.fallback_model or request["model"] == self.fallback_model:
+            return request["model"]
+        with self._lock:
+            if timeouts >= self.fallback_after:
+                if time.monotonic() >= self._fallback_until:
+                    self.fallbacks += 1
+                self._fallback_until = time.monotonic() + self.fallback_cooldown
+            if time.monotonic() < self._fallback_until:
+                return self.fallback_model
+        return request["model"]
+
+    def _record(self, seconds):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def _begin(self):
+        with self._lock:
+            self.calls += 1
+        return time.monotonic() + self.deadline
+
+    def _failed(self, error, attempt, deadline, timeouts):
+        # -> (timeouts, segundos de espera) o relanza si no quedan intentos
+        timeouts = timeouts + 1 if is_timeout(error) else timeouts
+        with self._lock:
+            if is_timeout(error):
+                self.timeouts += 1
+            give_up = not is_retryable(error) or attempt >= self.retries
+            if not give_up:
+                self.retried += 1
+        pause = 0.0 if give_up else self.sleep_for(attempt, error)
+        if give_up or time.monotonic() + pause >= deadline:
+            with self._lock:
+                self.failures += 1
+            raise error
+        return timeouts, pause
+
+    ############### LLAMADAS ###############
+
+    def call(self, send, request):
+        # send(request, timeout) -> respuesta: una petición real a la API
+        deadline = self._begin()
+        timeouts = 0
+        for attempt in range(self.retries + 1):
+            model = self._model(request, timeouts)
+            attempt_request = request if model == request["model"] else dict(request, model=model)
+            timeout = max(0.001, min(self.timeout, deadline - time.monotonic()))
+            try:
+                return self._attempt(send, attempt_request, timeout)
+            except Exception as error:
+                timeouts, pause = self._failed(error, attempt, deadline, timeouts)
+                time.sleep(pause)
+
+    def _attempt(self, send, request, timeout):
+        delay = None if request["stream"] else self.hedge_delay()
+        start = time.perf_counter()
+        if delay is None or delay >= timeout:
+            with self._lock:
+                self.attempts += 1
+            response = send(request, timeout)
+            if not request["stream"]:
+                self._record(time.perf_counter() - start)
+            return response
+
+        # Hedge: la segunda petición solo si la primera tarda más que el p95.
+        # La que pierde no se puede cancelar (cliente síncrono): termina en
+        # segundo plano y se descarta.
+        with self._lock:
+            self.attempts += 1
+        first = self._pool.submit(send, request, timeout)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            response = first.result()
+            self._record(time.perf_counter() - start)
+            return response
+
+        with self._lock:
+            self.attempts += 1
+            self.hedged += 1
+        second = self._pool.submit(send, request, max(0.001, timeout - delay))
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    self._record(time.perf_counter() - start)
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    async def call_async(self, send, request):
+        deadline = self._begin()
+        timeouts = 0
+        for attempt in range(self.retries + 1):
+            model = self._model(request, timeouts)
+            attempt_request = request if model == request["model"] else dict(request, model=model)
+            timeout = max(0.001, min(self.timeout, deadline - time.monotonic()))
+            try:
+                return await self._attempt_async(send, attempt_request, timeout)
+            except Exception as error:
+                timeouts, pause = self._failed(error, attempt, deadline, timeouts)
+                await asyncio.sleep(pause)
+
+    async def _attempt_async(self, send, request, timeout):
+        delay = None if request["stream"] else self.hedge_delay()
+        start = time.perf_counter()
+        with self._lock:
+            self.attempts += 1
+        if delay is None or delay >= timeout:
+            response = await send(request, timeout)
+            if not request["stream"]:
+                self._record(time.perf_counter() - start)
+            return response
+
+        # En async la petición que pierde sí se cancela
+        first = asyncio.ensure_future(send(request, timeout))
+        done, _ = await asyncio.wait([first], timeout=delay)
+        if done:
+            response = first.result()
+            self._record(time.perf_counter() - start)
+            return response
+
+        with self._lock:
+            self.attempts += 1
+            self.hedged += 1
+        second = asyncio.ensure_future(send(request, max(0.001, timeout - delay)))
+        pending = {first, second}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        self._record(time.perf_counter() - start)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        with self._lock:
+            p50 = percentile(self.latencies, 50)
+            p95 = percentile(self.latencies, 95)
+            return {
+                "calls": self.calls,
+                "attempts": self.attempts,
+                "retries": self.retried,
+                "timeouts": self.timeouts,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "fallbacks": self.fallbacks,
+                "failures": self.failures,
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+            }
+
+
+def policy_from_env():
+    # Activa la política si se configura cualquiera de sus variables
+    names = ("AGENT_MODEL_TIMEOUT", "AGENT_MODEL_RETRIES", "AGENT_MODEL_HEDGE", "AGENT_FALLBACK_MODEL")
+    if not any(os.getenv(name) for name in names):
+        return None
+    return CallPolicy(
+        timeout=float(os.getenv("AGENT_MODEL_TIMEOUT", "60")),
+        deadline=float(os.getenv("AGENT_MODEL_DEADLINE", "180")),
+        retries=int(os.getenv("AGENT_MODEL_RETRIES", "3")),
+        hedge=os.getenv("AGENT_MODEL_HEDGE") == "1",
+        fallback_model=os.getenv("AGENT_FALLBACK_MODEL") or None,
+        fallback_after=int(os.getenv("AGENT_FALLBACK_AFTER", "2"))
+    )
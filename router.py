@@ -0,0 +1,143 @@
+import json
+import os
+import re
+import threading
+import time
+
+from agent import format_user_message
+from taskfile import normalize
+
+# Router de intenciones local (opt-in, AGENT_ROUTER=1): las órdenes triviales
+# ("listar tareas", "completar 3", "resumen", "deshacer") se resuelven con una
+# gramática de regex y se ejecuta la herramienta directamente, sin llamar al
+# modelo. En agent.messages queda lo mismo que si lo hubiera hecho el modelo:
+# mensaje de usuario, function_call, function_call_output y la respuesta.
+
+FILLER_RE = re.compile(r"^(por favor|porfa)\s+|\s+(por favor|porfa)$")
+
+# (regex sobre el texto normalizado, herramienta, argumentos a partir del match)
+RULES = [
+    (
+        r"((me )?(listar|lista|listame|ver|mostrar|muestra|muestras|muestrame|ensename)"
+        r"( (las|mis))? )?tareas",
+        "list_tasks",
+        lambda m: {}
+    ),
+    (
+        r"(completar|completa|marcar|marca|terminar|termina|hecha|hecho)"
+        r"( (la|como))?( tarea)?( (numero|n|no))? #?(?P<number>\d+)( (como )?(hecha|completada))?",
+        "complete_task",
+        lambda m: {"task": m.group("number")}
+    ),
+    (
+        r"(resumen|resumir|resume|estado)( (del|de mi))?( proyecto)?",
+        "summarize_project",
+        lambda m: {}
+    ),
+    (
+        r"(deshacer|deshaz|undo)( (lo ultimo|la ultima accion|ultima accion))?",
+        "undo_last_action",
+        lambda m: {}
+    ),
+]
+
+
+def _clean(text):
+    text = normalize(text).strip().strip("¿?¡!.,; ")
+    text = " ".join(text.split())
+    return FILLER_RE.sub("", text)
+
+
+class IntentRouter:
+    def __init__(self, rules=RULES):
+        self.rules = [(re.compile(pattern), name, build) for pattern, name, build in rules]
+        self._lock = threading.Lock()
+        self._calls = 0
+
+        self.turns = 0
+        self.local_turns = 0
+        self.local_seconds = 0.0
+        self.model_turns = 0
+        self.model_seconds = 0.0
+
+    def match(self, text):
+        # (herramienta, argumentos) si el texto entero es una orden conocida
+        text = _clean(text)
+        for regex, name, build in self.rules:
+            m = regex.fullmatch(text)
+            if m:
+                return name, build(m)
+        return None
+
+    def handle(self, agent, user_input):
+        # Ejecuta el turno localmente si puede; si no, devuelve False y el
+        # turno sigue por el modelo
+        start = time.perf_counter()
+        with self._lock:
+            self.turns += 1
+
+        intent = self.match(user_input)
+        if intent is None:
+            return False
+        name, args = intent
+
+        # Si falta contexto (proyecto, archivo de tareas, borrado pendiente)
+        # es mejor que el modelo lo explique
+        spec = agent.TOOL_REGISTRY.get(name)
+        if spec is None or agent._check_tool(spec):
+            return False
+
+        result = agent._run_tool(spec, args)
+
+        with self._lock:
+            self._calls += 1
+            call_id = f"local_{self._calls}"
+        agent.messages += [
+            format_user_message(user_input),
+            {
+                "type": "function_call",
+                "call_id": call_id,
+                "name": name,
+                "arguments": json.dumps(args, ensure_ascii=False)
+            },
+            {
+                "type": "function_call_output",
+                "call_id": call_id,
+                "output": json.dumps({"result": result})
+            },
+            {"role": "assistant", "content": str(result)}
+        ]
+        agent._reply(str(result))
+
+        with self._lock:
+            self.local_turns += 1
+            self.local_seconds += time.perf_counter() - start
+        return True
+
+    def record_model_turn(self, seconds):
+        with self._lock:
+            self.model_turns += 1
+            self.model_seconds += seconds
+
+    def stats(self):
+        with self._lock:
+            model_avg = self.model_seconds / self.model_turns if self.model_turns else None
+            local_avg = self.local_seconds / self.local_turns if self.local_turns else 0.0
+            stats = {
+                "turns": self.turns,
+                "local_turns": self.local_turns,
+                "local_fraction": round(self.local_turns / self.turns, 3) if self.turns else 0.0,
+                "local_avg_ms": round(local_avg * 1000, 3),
+                "model_avg_ms": round(model_avg * 1000, 3) if model_avg is not None else None
+            }
+            # Ahorro estimado: lo que habría tardado cada turno local por el
+            # modelo (media de los turnos que sí fueron al modelo)
+            if model_avg is not None:
+                stats["saved_seconds"] = round(self.local_turns * (model_avg - local_avg), 3)
+            return stats
+
+
+def router_from_env():
+    if os.getenv("AGENT_ROUTER") != "1":
+        return None
+    return IntentRouter()
@@ -0,0 +1,222 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from taskfile import TASK_RE, tokenize
+
+# Índice invertido en disco (SQLite) de las tareas de todos los .md bajo
+# PROJECTS_DIR. Antes de buscar se recorre el workspace con stat() (como mucho
+# una vez cada REFRESH_SECONDS) y solo se vuelven a tokenizar los archivos
+# cuyo mtime o tamaño cambió.
+
+MAX_RESULTS = 20
+REFRESH_SECONDS = float(os.getenv("AGENT_SEARCH_REFRESH_SECONDS", "2"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    project TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    UNIQUE (project, name)
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    done INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    token TEXT NOT NULL,
+    task_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_file ON tasks (file_id);
+CREATE INDEX IF NOT EXISTS postings_token ON postings (token);
+CREATE INDEX IF NOT EXISTS postings_task ON postings (task_id);
+"""
+
+
+class TaskIndex:
+    def __init__(self, db_path, projects_dir):
+        self.db_path = db_path
+        self.projects_dir = projects_dir
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._scanned_at = None
+
+    def _scan(self):
+        # {(proyecto, archivo): (mtime_ns, size, ruta)} de todos los .md del workspace
+        found = {}
+        if not os.path.isdir(self.projects_dir):
+            return found
+        for project in os.scandir(self.projects_dir):
+            if not project.is_dir():
+                continue
+            for entry in os.scandir(project.path):
+                if entry.name.endswith(".md") and entry.is_file():
+                    st = entry.stat()
+                    found[(project.name, entry.name)] = (st.st_mtime_ns, st.st_size, entry.path)
+        return found
+
+    def _index_file(self, file_id, path):
+        with open(path, "rb") as f:
+            data = f.read()
+
+        line = 1
+        pos = 0
+        for m in TASK_RE.finditer(data):
+            line += data.count(b"\n", pos, m.start())
+            pos = m.start()
+            text = m.group(2).decode("utf-8", "replace").strip()
+            cur = self.db.execute(
+                "INSERT INTO tasks (file_id, line, done, text) VALUES (?, ?, ?, ?)",
+                (file_id, line, m.group(1) == b"x", text)
+            )
+            self.db.executemany(
+                "INSERT INTO postings (token, task_id) VALUES (?, ?)",
+                [(token, cur.lastrowid) for token in set(tokenize(text))]
+            )
+
+    def _drop_file(self, file_id):
+        self.db.execute(
+            "DELETE FROM postings WHERE task_id IN (SELECT id FROM tasks WHERE file_id = ?)",
+            (file_id,)
+        )
+        self.db.execute("DELETE FROM tasks WHERE file_id = ?", (file_id,))
+
+    def refresh(self, paths=None):
+        # Reindexa lo que cambió en disco; con `paths` ({(proyecto, archivo): ruta})
+        # solo mira esos archivos. Devuelve cuántos archivos se reindexaron.
+        if paths is None:
+            on_disk = self._scan()
+            self._scanned_at = time.monotonic()
+            indexed = self.db.execute("SELECT id, project, name, mtime_ns, size FROM files")
+        else:
+            on_disk = {}
+            for key, path in paths.items():
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                on_disk[key] = (st.st_mtime_ns, st.st_size, path)
+            indexed = [
+                row for key in paths for row in self.db.execute(
+                    "SELECT id, project, name, mtime_ns, size FROM files "
+                    "WHERE project = ? AND name = ?", key
+                )
+            ]
+        indexed = {
+            (project, name): (file_id, mtime, size)
+            for file_id, project, name, mtime, size in indexed
+        }
+
+        changed = 0
+        with self.db:
+            for key, (file_id, _, _) in indexed.items():
+                if key not in on_disk:
+                    self._drop_file(file_id)
+                    self.db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+                    changed += 1
+
+            for key, (mtime, size, path) in on_disk.items():
+                old = indexed.get(key)
+                if old and old[1] == mtime and old[2] == size:
+                    continue
+                if old:
+                    file_id = old[0]
+                    self._drop_file(file_id)
+                    self.db.execute(
+                        "UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                        (mtime, size, file_id)
+                    )
+                else:
+                    file_id = self.db.execute(
+                        "INSERT INTO files (project, name, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                        (key[0], key[1], mtime, size)
+                    ).lastrowid
+                try:
+                    self._index_file(file_id, path)
+                except FileNotFoundError:
+                    pass
+                changed += 1
+        return changed
+
+    def search(self, query, status=None, project=None, limit=MAX_RESULTS, fresh=None):
+        # `fresh`: archivos que deben estar al día aunque no toque recorrer todo
+        # (por ejemplo el archivo de tareas activo de la sesión)
+        tokens = sorted(set(tokenize(query)))
+        if not tokens:
+            return []
+
+        with self._lock:
+            if self._scanned_at is None or time.monotonic() - self._scanned_at > REFRESH_SECONDS:
+                self.refresh()
+            elif fresh:
+                self.refresh(fresh)
+
+            total = self.db.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] or 1
+            marks = ",".join("?" * len(tokens))
+            df = dict(self.db.execute(
+                f"SELECT token, COUNT(*) FROM postings WHERE token IN ({marks}) GROUP BY token",
+                tokens
+            ))
+
+            # Puntuación: suma del idf de los términos de la consulta que contiene cada tarea
+            weights = [
+                (token, math.log(1 + total / df[token])) for token in tokens if token in df
+            ]
+            if not weights:
+                return []
+
+            sql = (
+                f"WITH q(token, w) AS (VALUES {', '.join('(?, ?)' for _ in weights)}) "
+                "SELECT f.project, f.name, t.line, t.done, t.text, SUM(q.w) AS score "
+                "FROM q JOIN postings p ON p.token = q.token "
+                "JOIN tasks t ON t.id = p.task_id "
+                "JOIN files f ON f.id = t.file_id "
+                "WHERE 1 = 1"
+            )
+            params = [v for pair in weights for v in pair]
+            if status in ("pending", "completed"):
+                sql += " AND t.done = ?"
+                params.append(status == "completed")
+            if project:
+                sql += " AND f.project = ?"
+                params.append(project)
+            sql += " GROUP BY t.id ORDER BY score DESC, f.project, f.name, t.line LIMIT ?"
+            params.append(limit)
+
+            rows = self.db.execute(sql, params).fetchall()
+
+        return [
+            {
+                "project": r[0],
+                "file": r[1],
+                "line": r[2],
+                "status": "completed" if r[3] else "pending",
+                "task": r[4],
+                "score": round(r[5], 3)
+            }
+            for r in rows
+        ]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def open_index(db_path, projects_dir):
+    # Un índice por ruta y proceso, compartido por todas las sesiones
+    # (por ruta absoluta: la relativa depende del directorio de trabajo)
+    key = os.path.abspath(db_path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = TaskIndex(key, os.path.abspath(projects_dir))
+        return index
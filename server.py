@@ -0,0 +1,240 @@
+from openai import OpenAI
+from dotenv import load_dotenv
+from agent import ProjectAgent
+from main import ROUTER, TRACER, run_turn
+from model_client import ModelClient, cache_from_env
+from resilience import policy_from_env
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import os
+import re
+import threading
+import time
+
+# Modo servidor: muchas sesiones de ProjectAgent en un solo proceso.
+# Cada session id tiene su propio estado (proyecto activo, undo, mensajes...);
+# el cliente OpenAI (con su pool de conexiones), los schemas de las tools,
+# la caché de respuestas y las cachés de archivos se comparten.
+#
+#   POST   /sessions/<id>/turns   {"text": "..."}  -> {"replies": [...], "latency_ms": ...}
+#   DELETE /sessions/<id>
+#   GET    /stats
+
+SESSION_IDLE_SECONDS = float(os.getenv("AGENT_SESSION_IDLE_SECONDS", "900"))
+MAX_SESSIONS = int(os.getenv("AGENT_MAX_SESSIONS", "10000"))
+
+class AgentHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+SESSION_PATH = re.compile(r"^/sessions/([A-Za-z0-9_.-]{1,64})(/turns)?$")
+
+
+class SessionsFull(Exception):
+    pass
+
+
+class Session:
+    __slots__ = ("agent", "lock", "last_used", "active", "dropped")
+
+    def __init__(self):
+        self.agent = ProjectAgent()
+        self.agent.echo = False
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        # Turnos en curso o esperando el lock: la sesión no se puede descartar
+        self.active = 0
+        # Borrada (DELETE) con un turno en curso: se cierra en el último release
+        self.dropped = False
+
+
+class SessionManager:
+    def __init__(self, client, idle_seconds=SESSION_IDLE_SECONDS, max_sessions=MAX_SESSIONS):
+        self.client = client
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.evicted = 0
+        self.turns = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def get(self, session_id):
+        # La sesión se devuelve ya marcada como activa (ver release)
+        evicted = None
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                if len(self.sessions) >= self.max_sessions:
+                    evicted = self._evict_oldest()
+                session = self.sessions[session_id] = Session()
+            session.last_used = time.monotonic()
+            session.active += 1
+        if evicted is not None:
+            evicted.agent.close()
+        return session
+
+    def release(self, session):
+        with self._lock:
+            session.active -= 1
+            close = session.dropped and not session.active
+        if close:
+            session.agent.close()
+
+    def drop(self, session_id):
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+            if session is None:
+                return False
+            # Con un turno en curso, cerrarla ahora vaciaría el buffer y borraría
+            # snapshots del undo por debajo de una herramienta: lo hace release
+            session.dropped = True
+            busy = session.active > 0
+        if not busy:
+            # Tareas pendientes de escribir (AGENT_WRITE_BEHIND) y snapshots del undo
+            session.agent.close()
+        return True
+
+    def _evict_oldest(self):
+        # Solo sesiones sin turnos en curso: si todas están ocupadas, no se
+        # admiten sesiones nuevas (503)
+        idle = [k for k, s in self.sessions.items() if not s.active]
+        if not idle:
+            raise SessionsFull(f"Demasiadas sesiones activas ({self.max_sessions})")
+        oldest = min(idle, key=lambda k: self.sessions[k].last_used)
+        self.evicted += 1
+        return self.sessions.pop(oldest)
+
+    def evict_idle(self):
+        limit = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [k for k, s in self.sessions.items() if s.last_used < limit and not s.active]
+            dropped = [self.sessions.pop(k) for k in idle]
+            self.evicted += len(idle)
+        for session in dropped:
+            session.agent.close()
+        return len(idle)
+
+    def start_sweeper(self):
+        def sweep():
+            while not self._stop.wait(max(1.0, self.idle_seconds / 4)):
+                self.evict_idle()
+        threading.Thread(target=sweep, daemon=True, name="session-sweeper").start()
+
+    def stop(self):
+        self._stop.set()
+
+    def turn(self, session_id, text):
+        session = self.get(session_id)
+        # Una sesión procesa un turno cada vez; sesiones distintas, en paralelo
+        try:
+            with session.lock:
+                agent = session.agent
+                agent.replies.clear()
+                start = time.perf_counter()
+                run_turn(self.client, agent, text, stream=False)
+                elapsed = time.perf_counter() - start
+                session.last_used = time.monotonic()
+        finally:
+            self.release(session)
+        with self._lock:
+            self.turns += 1
+        return {"replies": list(agent.replies), "latency_ms": round(elapsed * 1000, 2)}
+
+    def stats(self):
+        stats = {"sessions": len(self.sessions), "evicted": self.evicted, "turns": self.turns}
+        if self.client.cache:
+            stats["cache"] = self.client.cache.stats()
+        if self.client.policy:
+            stats["model"] = self.client.policy.stats()
+        if self.client.chain:
+            stats["chain"] = self.client.chain_stats()
+        if ROUTER:
+            stats["router"] = ROUTER.stats()
+        if TRACER:
+            stats["trace"] = TRACER.stats()
+        return stats
+
+
+def make_handler(manager):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, data):
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                return self._send(200, manager.stats())
+            self._send(404, {"error": "Ruta no encontrada"})
+
+        def do_POST(self):
+            match = SESSION_PATH.match(self.path)
+            if not match or not match.group(2):
+                return self._send(404, {"error": "Ruta no encontrada"})
+
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                text = json.loads(self.rfile.read(length) or b"{}").get("text", "").strip()
+            except (json.JSONDecodeError, AttributeError):
+                return self._send(400, {"error": "JSON inválido"})
+            if not text:
+                return self._send(400, {"error": "Falta 'text'"})
+
+            try:
+                self._send(200, manager.turn(match.group(1), text))
+            except SessionsFull as e:
+                self._send(503, {"error": str(e)})
+            except Exception as e:
+                self._send(502, {"error": str(e)})
+
+        def do_DELETE(self):
+            match = SESSION_PATH.match(self.path)
+            if not match or match.group(2):
+                return self._send(404, {"error": "Ruta no encontrada"})
+            self._send(200, {"deleted": manager.drop(match.group(1))})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def make_server(client, host="127.0.0.1", port=8080, idle_seconds=SESSION_IDLE_SECONDS):
+    manager = SessionManager(client, idle_seconds=idle_seconds)
+    server = AgentHTTPServer((host, port), make_handler(manager))
+    server.manager = manager
+    manager.start_sweeper()
+    return server
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    client = ModelClient(OpenAI(), cache=cache_from_env(), tracer=TRACER,
+                         policy=policy_from_env())
+    server = make_server(client, args.host, args.port)
+    print(f"Project Agent sirviendo en http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.manager.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,551 @@
+import atexit
+import os
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+
+import taskfile
+import textfile
+from taskfile import Task, normalize, parse_tasks
+
+# Backend SQLite de ProjectAgent.tasks_io (opt-in, AGENT_STORAGE=sqlite).
+# Tiene la misma interfaz que el módulo taskfile, pero las tareas viven en
+# tablas indexadas (projects, task_files, tasks): buscar una tarea por texto o
+# por número, paginar list_tasks o contar completadas son consultas por índice
+# en vez de recorrer el .md, y no hace falta parsear nada al arrancar.
+#
+# Los .md siguen siendo el formato que ve el usuario: cada archivo se importa
+# la primera vez que se usa y se vuelve a exportar (export) cuando alguien va
+# a leer el disco por su cuenta (ver ProjectAgent._run_tool) o al salir. Si un
+# .md cambia fuera del agente (mtime o tamaño distintos), se reimporta: manda
+# lo que hay en disco.
+#
+# Una tarea de este backend es un taskfile.Task con offset = end = su número
+# (posición en el archivo, empezando en 1) y mark = su id en la tabla tasks.
+
+SCHEMA = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS task_files (
+    id INTEGER PRIMARY KEY,
+    project_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    exported INTEGER NOT NULL DEFAULT 0,
+    trailer BLOB,
+    UNIQUE (project_id, name)
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    done INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    line BLOB,
+    status_at INTEGER NOT NULL DEFAULT 3,
+    before BLOB
+);
+CREATE INDEX IF NOT EXISTS tasks_position ON tasks (file_id, position);
+CREATE INDEX IF NOT EXISTS tasks_text ON tasks (file_id, text, done, position);
+"""
+
+# tasks.line: la línea tal cual está en el .md si no es la canónica
+# "- [ ] texto\n" (sangría, espacios...), con el estado en status_at.
+# tasks.before / task_files.trailer: lo que no son tareas (títulos, notas)
+# antes de cada tarea y después de la última.
+
+TASK_COLUMNS = "id, position, done, text"
+# Sin estadísticas, SQLite prefiere tasks_text (que cubre todas las columnas)
+# también para buscar por posición: esas consultas fuerzan tasks_position
+ITER_BATCH = 256
+FUZZY_CACHE = 4
+
+# Bases abiertas, para exportar lo pendiente si el proceso termina
+_dbs = weakref.WeakSet()
+
+
+def _canonical(done, text):
+    return f"- [{'x' if done else ' '}] {text}\n".encode("utf-8")
+
+
+def _task(row):
+    id, position, done, text = row
+    return Task(position, position, id, bool(done), text)
+
+
+class DBTaskFile:
+    # Lo que devuelve TaskDB.load: la misma interfaz de consulta que
+    # taskfile.TaskFile, respondida con consultas a la base
+
+    def __init__(self, db, file_id):
+        self.db = db
+        self.file_id = file_id
+        # Una misma tarea es el mismo objeto durante toda la llamada a la herramienta
+        self._tasks = {}
+
+    def _rows(self, sql, params=()):
+        with self.db._lock:
+            rows = self.db.conn.execute(sql, params).fetchall()
+        tasks = []
+        for row in rows:
+            task = self._tasks.get(row[0])
+            if task is None:
+                task = self._tasks[row[0]] = _task(row)
+            tasks.append(task)
+        return tasks
+
+    def _counters(self):
+        with self.db._lock:
+            return self.db.conn.execute(
+                "SELECT total, completed FROM task_files WHERE id = ?", (self.file_id,)
+            ).fetchone()
+
+    @property
+    def total(self):
+        return self._counters()[0]
+
+    @property
+    def completed(self):
+        return self._counters()[1]
+
+    @property
+    def pending(self):
+        total, completed = self._counters()
+        return total - completed
+
+    def count(self, status=None):
+        if status == "pending":
+            return self.pending
+        if status == "completed":
+            return self.completed
+        return self.total
+
+    def matches(self, text):
+        return self._rows(
+            f"SELECT {TASK_COLUMNS} FROM tasks WHERE file_id = ? AND text = ? ORDER BY position",
+            (self.file_id, text)
+        )
+
+    def find(self, text, done=False, last=False):
+        found = self._rows(
+            f"SELECT {TASK_COLUMNS} FROM tasks WHERE file_id = ? AND text = ? AND done = ? "
+            f"ORDER BY position {'DESC' if last else 'ASC'} LIMIT 1",
+            (self.file_id, text, done)
+        )
+        return found[0] if found else None
+
+    def task(self, number):
+        found = self._rows(
+            f"SELECT {TASK_COLUMNS} FROM tasks INDEXED BY tasks_position "
+            "WHERE file_id = ? AND position = ?",
+            (self.file_id, number)
+        )
+        if not found:
+            raise IndexError(number)
+        return found[0]
+
+    def at(self, mark):
+        found = self._rows(
+            f"SELECT {TASK_COLUMNS} FROM tasks WHERE id = ? AND file_id = ?",
+            (mark, self.file_id)
+        )
+        return found[0] if found else None
+
+    def find_at(self, mark, text, done):
+        task = self.at(mark)
+        if task and task.text == text and task.done == done:
+            return task
+        return self.find(text, done)
+
+    def iter(self, status=None, contains=None, after=0):
+        # Igual que TaskFile.iter, pidiendo a la base bloques de ITER_BATCH
+        sql = (
+            f"SELECT {TASK_COLUMNS} FROM tasks INDEXED BY tasks_position "
+            "WHERE file_id = ? AND position > ?"
+        )
+        params = [self.file_id]
+        if status in ("pending", "completed"):
+            sql += " AND done = ?"
+            params.append(status == "completed")
+        if contains:
+            sql += " AND instr(normalize(text), ?) > 0"
+            params.append(normalize(contains))
+        sql += f" ORDER BY position LIMIT {ITER_BATCH}"
+
+        while True:
+            batch = self._rows(sql, [params[0], after] + params[1:])
+            for task in batch:
+                yield task.offset, task
+            if len(batch) < ITER_BATCH:
+                return
+            after = batch[-1].offset
+
+    def closest(self, text, done=False, limit=5, cutoff=taskfile.FUZZY_CUTOFF):
+        # La búsqueda aproximada necesita las palabras de todas las tareas: se
+        # construye un TaskFile en memoria, cacheado por versión del archivo
+        tf = self.db._fuzzy_file(self.file_id)
+        return tf.closest(text, done=done, limit=limit, cutoff=cutoff)
+
+
+class TaskDB:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.create_function("normalize", 1, normalize, deterministic=True)
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        # file_id -> (versión, TaskFile) para closest()
+        self._fuzzy = OrderedDict()
+
+        self.imports = 0
+        self.exports = 0
+        _dbs.add(self)
+
+    ############### ARCHIVOS ###############
+
+    def _project_id(self, directory):
+        row = self.conn.execute("SELECT id FROM projects WHERE path = ?", (directory,)).fetchone()
+        if row:
+            return row[0]
+        return self.conn.execute(
+            "INSERT INTO projects (path, name) VALUES (?, ?)",
+            (directory, os.path.basename(directory))
+        ).lastrowid
+
+    def _lookup(self, path):
+        directory, name = os.path.split(os.path.abspath(path))
+        return self.conn.execute(
+            "SELECT f.id, f.mtime_ns, f.size FROM task_files f "
+            "JOIN projects p ON p.id = f.project_id WHERE p.path = ? AND f.name = ?",
+            (directory, name)
+        ).fetchone()
+
+    def _file(self, path):
+        # id del archivo en la base, importándolo si es nuevo o cambió en disco
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.removed(path)
+            raise
+        with self._lock:
+            row = self._lookup(path)
+            if row and (row[1], row[2]) == (st.st_mtime_ns, st.st_size):
+                return row[0]
+            return self._import(path, row[0] if row else None)
+
+    def _import(self, path, file_id):
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+        tasks = parse_tasks(data)
+
+        rows = []
+        pos = 0
+        for number, task in enumerate(tasks, 1):
+            line = data[task.offset:task.end]
+            rows.append((
+                number, task.done, task.text,
+                None if line == _canonical(task.done, task.text) else line,
+                task.mark - task.offset,
+                data[pos:task.offset] or None
+            ))
+            pos = task.end
+
+        with self.conn:
+            if file_id is None:
+                directory, name = os.path.split(os.path.abspath(path))
+                file_id = self.conn.execute(
+                    "INSERT INTO task_files (project_id, name, mtime_ns, size) VALUES (?, ?, 0, 0)",
+                    (self._project_id(directory), name)
+                ).lastrowid
+            else:
+                self.conn.execute("DELETE FROM tasks WHERE file_id = ?", (file_id,))
+            self.conn.executemany(
+                "INSERT INTO tasks (file_id, position, done, text, line, status_at, before) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((file_id,) + row for row in rows)
+            )
+            self.conn.execute(
+                "UPDATE task_files SET mtime_ns = ?, size = ?, total = ?, completed = ?, "
+                "version = version + 1, exported = version + 1, trailer = ? WHERE id = ?",
+                (st.st_mtime_ns, st.st_size, len(tasks), sum(1 for t in tasks if t.done),
+                 data[pos:] or None, file_id)
+            )
+        self.imports += 1
+        return file_id
+
+    def _changed(self, file_id):
+        self.conn.execute("UPDATE task_files SET version = version + 1 WHERE id = ?", (file_id,))
+
+    def _fuzzy_file(self, file_id):
+        with self._lock:
+            version = self.conn.execute(
+                "SELECT version FROM task_files WHERE id = ?", (file_id,)
+            ).fetchone()[0]
+            cached = self._fuzzy.get(file_id)
+            if cached and cached[0] == version:
+                self._fuzzy.move_to_end(file_id)
+                return cached[1]
+            rows = self.conn.execute(
+                f"SELECT {TASK_COLUMNS} FROM tasks INDEXED BY tasks_position "
+                "WHERE file_id = ? ORDER BY position", (file_id,)
+            ).fetchall()
+            tf = taskfile.TaskFile(None, None, None, [_task(row) for row in rows])
+            self._fuzzy[file_id] = (version, tf)
+            while len(self._fuzzy) > FUZZY_CACHE:
+                self._fuzzy.popitem(last=False)
+            return tf
+
+    ############### INTERFAZ DE taskfile ###############
+
+    def load(self, path):
+        return DBTaskFile(self, self._file(path))
+
+    def append_tasks(self, path, texts):
+        file_id = self._file(path)
+        with self._lock, self.conn:
+            total, trailer = self.conn.execute(
+                "SELECT total, trailer FROM task_files WHERE id = ?", (file_id,)
+            ).fetchone()
+            # Si el archivo no termina en "\n", la primera tarea nueva empieza línea
+            # (line es NULL en las tareas canónicas, que sí terminan en "\n")
+            last = trailer
+            if last is None and total:
+                last = self.conn.execute(
+                    "SELECT line FROM tasks INDEXED BY tasks_position WHERE file_id = ? AND position = ?",
+                    (file_id, total)
+                ).fetchone()[0]
+            if last and not last.endswith(b"\n"):
+                trailer = (trailer or b"") + b"\n"
+            # Como en el .md, las tareas nuevas van después de todo lo que haya
+            rows = [
+                (file_id, total + i, text, trailer if i == 1 else None)
+                for i, text in enumerate(texts, 1)
+            ]
+            self.conn.executemany(
+                "INSERT INTO tasks (file_id, position, done, text, before) VALUES (?, ?, 0, ?, ?)",
+                rows
+            )
+            self.conn.execute(
+                "UPDATE task_files SET total = total + ?, trailer = NULL WHERE id = ?",
+                (len(rows), file_id)
+            )
+            self._changed(file_id)
+
+    def set_done(self, path, task, done):
+        self.set_done_many(path, [task], done)
+
+    def set_done_many(self, path, tasks, done):
+        file_id = self._file(path)
+        with self._lock, self.conn:
+            changed = 0
+            for task in tasks:
+                changed += self.conn.execute(
+                    "UPDATE tasks SET done = ? WHERE id = ? AND file_id = ? AND done != ?",
+                    (done, task.mark, file_id, done)
+                ).rowcount
+                task.done = done
+            self.conn.execute(
+                "UPDATE task_files SET completed = completed + ? WHERE id = ?",
+                (changed if done else -changed, file_id)
+            )
+            self._changed(file_id)
+
+    def find_at(self, path, mark, text, done):
+        return self.load(path).find_at(mark, text, done)
+
+    def remove_task(self, path, task):
+        self.remove_tasks(path, [task])
+
+    def remove_tasks(self, path, tasks):
+        if not tasks:
+            return
+        file_id = self._file(path)
+        with self._lock, self.conn:
+            for task in sorted(tasks, key=lambda t: t.offset, reverse=True):
+                row = self.conn.execute(
+                    "SELECT position, done, before FROM tasks WHERE id = ? AND file_id = ?",
+                    (task.mark, file_id)
+                ).fetchone()
+                if row is None:
+                    continue
+                position, done, before = row
+                # Lo que había antes de la línea borrada pasa a la siguiente
+                if before:
+                    following = self.conn.execute(
+                        "SELECT id, before FROM tasks INDEXED BY tasks_position "
+                        "WHERE file_id = ? AND position = ?",
+                        (file_id, position + 1)
+                    ).fetchone()
+                    if following:
+                        self.conn.execute(
+                            "UPDATE tasks SET before = ? WHERE id = ?",
+                            (before + (following[1] or b""), following[0])
+                        )
+                    else:
+                        trailer = self.conn.execute(
+                            "SELECT trailer FROM task_files WHERE id = ?", (file_id,)
+                        ).fetchone()[0]
+                        self.conn.execute(
+                            "UPDATE task_files SET trailer = ? WHERE id = ?",
+                            (before + (trailer or b""), file_id)
+                        )
+                self.conn.execute("DELETE FROM tasks WHERE id = ?", (task.mark,))
+                self.conn.execute(
+                    "UPDATE tasks SET position = position - 1 WHERE file_id = ? AND position > ?",
+                    (file_id, position)
+                )
+                self.conn.execute(
+                    "UPDATE task_files SET total = total - 1, completed = completed - ? WHERE id = ?",
+                    (done, file_id)
+                )
+            self._changed(file_id)
+
+    def moved(self, old, new):
+        # `old` (archivo o carpeta de proyecto) ahora está en `new`
+        old, new = os.path.abspath(old), os.path.abspath(new)
+        with self._lock, self.conn:
+            if os.path.isdir(new):
+                self.removed(new)
+                self.conn.execute(
+                    "UPDATE projects SET path = ?, name = ? WHERE path = ?",
+                    (new, os.path.basename(new), old)
+                )
+                return
+            row = self._lookup(old)
+            if row:
+                self.removed(new)
+                directory, name = os.path.split(new)
+                self.conn.execute(
+                    "UPDATE task_files SET project_id = ?, name = ? WHERE id = ?",
+                    (self._project_id(directory), name, row[0])
+                )
+
+    def removed(self, path):
+        # `path` (archivo o carpeta de proyecto) ya no existe
+        path = os.path.abspath(path)
+        with self._lock, self.conn:
+            row = self._lookup(path)
+            file_ids = [row[0]] if row else [
+                r[0] for r in self.conn.execute(
+                    "SELECT f.id FROM task_files f JOIN projects p ON p.id = f.project_id "
+                    "WHERE p.path = ?", (path,)
+                )
+            ]
+            for file_id in file_ids:
+                self.conn.execute("DELETE FROM tasks WHERE file_id = ?", (file_id,))
+                self.conn.execute("DELETE FROM task_files WHERE id = ?", (file_id,))
+                self._fuzzy.pop(file_id, None)
+            if not row:
+                self.conn.execute("DELETE FROM projects WHERE path = ?", (path,))
+
+    ############### EXPORTACIÓN ###############
+
+    def export(self, path=None, force=False):
+        # Regenera los .md con cambios sin exportar (o todos, con force).
+        # Devuelve cuántos archivos se escribieron.
+        with self._lock:
+            sql = (
+                "SELECT f.id, p.path, f.name, f.version, f.trailer FROM task_files f "
+                "JOIN projects p ON p.id = f.project_id"
+            )
+            params = []
+            if not force:
+                sql += " WHERE f.exported != f.version"
+            files = self.conn.execute(sql, params).fetchall()
+            if path is not None:
+                # Un archivo o la carpeta de un proyecto
+                root = os.path.abspath(path)
+                files = [
+                    f for f in files
+                    if f[1] == root or os.path.join(f[1], f[2]) == root
+                ]
+
+            written = 0
+            for file_id, directory, name, version, trailer in files:
+                target = os.path.join(directory, name)
+                if not os.path.isdir(directory):
+                    continue
+                parts = []
+                for done, text, line, status_at, before in self.conn.execute(
+                    "SELECT done, text, line, status_at, before FROM tasks INDEXED BY tasks_position "
+                    "WHERE file_id = ? ORDER BY position", (file_id,)
+                ):
+                    if before:
+                        parts.append(before)
+                    if line is None:
+                        parts.append(_canonical(done, text))
+                    else:
+                        parts.append(line[:status_at] + (b"x" if done else b" ") + line[status_at + 1:])
+                if trailer:
+                    parts.append(trailer)
+
+                textfile.write_atomic(target, b"".join(parts))
+                taskfile.invalidate(target)
+                st = os.stat(target)
+                with self.conn:
+                    self.conn.execute(
+                        "UPDATE task_files SET mtime_ns = ?, size = ?, exported = ? WHERE id = ?",
+                        (st.st_mtime_ns, st.st_size, version, file_id)
+                    )
+                written += 1
+            self.exports += written
+            return written
+
+    def flush(self, path=None):
+        self.export(path)
+
+    def end_turn(self):
+        # La base ya es durable: los .md se exportan bajo demanda
+        pass
+
+    def stats(self):
+        with self._lock:
+            files, tasks, pending = self.conn.execute(
+                "SELECT COUNT(*), coalesce(SUM(total), 0), "
+                "coalesce(SUM(exported != version), 0) FROM task_files"
+            ).fetchone()
+        return {
+            "files": files,
+            "tasks": tasks,
+            "unexported_files": pending,
+            "imports": self.imports,
+            "exports": self.exports
+        }
+
+
+@atexit.register
+def _export_all():
+    for db in list(_dbs):
+        db.export()
+
+
+_open = {}
+_open_lock = threading.Lock()
+
+
+def open_db(db_path):
+    # Una base por ruta y proceso, compartida por todas las sesiones
+    key = os.path.abspath(db_path)
+    with _open_lock:
+        db = _open.get(key)
+        if db is None:
+            db = _open[key] = TaskDB(key)
+        return db
+
+
+def storage_from_env(db_path):
+    if os.getenv("AGENT_STORAGE", "markdown") != "sqlite":
+        return None
+    return open_db(db_path)
@@ -0,0 +1,446 @@
+import heapq
+import math
+import os
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from operator import attrgetter
+
+# Una tarea es una línea "- [ ] texto" o "- [x] texto" (con o sin sangría)
+TASK_RE = re.compile(rb"^[ \t]*- \[([ x])\](.*)$", re.M)
+WORD_RE = re.compile(r"\w+")
+COMBINING_RE = re.compile("[\u0300-\u036f]")
+
+MAX_CACHED_FILES = 128
+
+# Búsqueda aproximada (closest): puntuación mínima y ventaja sobre la segunda
+# candidata para darla por única
+FUZZY_CUTOFF = 0.5
+FUZZY_MARGIN = 0.15
+FUZZY_SHORTLIST = 50
+# Umbral de closest() cuando no hay ninguna palabra en común (solo similitud de texto)
+FUZZY_TYPO_CUTOFF = 0.7
+
+
+def normalize(text):
+    # Minúsculas y sin tildes: "Migración" y "migracion" son lo mismo
+    text = text.lower()
+    if text.isascii():
+        return text
+    return COMBINING_RE.sub("", unicodedata.normalize("NFKD", text))
+
+
+def tokenize(text):
+    return WORD_RE.findall(normalize(text))
+
+
+class Task:
+    __slots__ = ("offset", "end", "mark", "done", "text")
+
+    # offset/end: bytes de inicio y fin de la línea (end incluye el \n)
+    # mark: byte del carácter de estado (" " o "x") dentro del archivo
+    def __init__(self, offset, end, mark, done, text):
+        self.offset = offset
+        self.end = end
+        self.mark = mark
+        self.done = done
+        self.text = text
+
+
+class TaskFile:
+    __slots__ = ("path", "mtime", "size", "tasks", "completed", "by_text", "words", "postings")
+
+    def __init__(self, path, mtime, size, tasks):
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.tasks = tasks
+        self.completed = sum(1 for t in tasks if t.done)
+        self.by_text = None
+        self.words = None
+        self.postings = None
+
+    @property
+    def total(self):
+        return len(self.tasks)
+
+    @property
+    def pending(self):
+        return len(self.tasks) - self.completed
+
+    @classmethod
+    def parse(cls, path):
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+        return cls(path, st.st_mtime_ns, st.st_size, parse_tasks(data))
+
+    def _by_text(self):
+        # Índice texto -> tareas, construido la primera vez que se busca
+        if self.by_text is None:
+            self.by_text = {}
+            for task in self.tasks:
+                self.by_text.setdefault(task.text, []).append(task)
+        return self.by_text
+
+    def _words(self):
+        # (texto normalizado, tokens) de cada tarea, en el mismo orden que tasks,
+        # y token -> números (base 0) de las tareas que lo contienen
+        if self.words is None:
+            self.words = []
+            self.postings = {}
+            self._add_words(self.tasks)
+        return self.words
+
+    def _add_words(self, tasks):
+        # Se normaliza todo el bloque de una vez: mucho más rápido que tarea a tarea
+        lines = normalize("\n".join(task.text for task in tasks)).split("\n")
+        words = self.words
+        postings = self.postings
+        findall = WORD_RE.findall
+        for i, line in enumerate(lines, len(words)):
+            tokens = findall(line)
+            unique = frozenset(tokens)
+            words.append((" ".join(tokens), unique))
+            for token in unique:
+                if token in postings:
+                    postings[token].append(i)
+                else:
+                    postings[token] = [i]
+
+    def extend(self, tasks):
+        self.tasks.extend(tasks)
+        if self.by_text is not None:
+            for task in tasks:
+                self.by_text.setdefault(task.text, []).append(task)
+        if self.words is not None:
+            self._add_words(tasks)
+
+    def matches(self, text):
+        return self._by_text().get(text, [])
+
+    def find(self, text, done=False, last=False):
+        matches = self.matches(text)
+        for task in (reversed(matches) if last else matches):
+            if task.done == done:
+                return task
+        return None
+
+    def task(self, number):
+        # Tarea por su número en list_tasks (empezando en 1)
+        return self.tasks[number - 1]
+
+    def iter(self, status=None, contains=None, after=0):
+        # (número, tarea) a partir del número `after`, filtrando por estado
+        # ("pending"/"completed") y por texto sin tildes ni mayúsculas.
+        # Es un generador: quien lo consume decide cuándo parar.
+        needle = normalize(contains) if contains else None
+        for number in range(after + 1, len(self.tasks) + 1):
+            task = self.tasks[number - 1]
+            if status == "pending" and task.done or status == "completed" and not task.done:
+                continue
+            if needle and needle not in normalize(task.text):
+                continue
+            yield number, task
+
+    def count(self, status=None):
+        if status == "pending":
+            return self.pending
+        if status == "completed":
+            return self.completed
+        return self.total
+
+    def closest(self, text, done=False, limit=5, cutoff=FUZZY_CUTOFF):
+        # Tareas con estado `done` más parecidas a `text`, como [(score, número, tarea)]
+        # ordenadas de mejor a peor. Puntuación: media entre el solapamiento de
+        # palabras (ponderado por idf, así "5123" pesa más que "tarea") y la
+        # similitud carácter a carácter, que solo se calcula para las
+        # FUZZY_SHORTLIST con más solapamiento.
+        norm, tokens = _words(text)
+        words = self._words()
+        postings = self.postings
+        n = len(words)
+
+        def idf(token):
+            return math.log(1 + n / (len(postings.get(token, ())) + 1))
+
+        # Candidatas: las que comparten alguna palabra poco frecuente; las
+        # palabras que aparecen en más de la mitad de las tareas solo puntúan.
+        # Si las poco frecuentes no están en ninguna tarea (erratas), todas.
+        rare = [t for t in tokens if len(postings.get(t, ())) * 2 <= n]
+        candidates = set()
+        for token in rare:
+            candidates.update(postings.get(token, ()))
+        if not candidates:
+            for token in tokens:
+                candidates.update(postings.get(token, ()))
+
+        shortlist = []
+        for i in candidates:
+            if self.tasks[i].done != done:
+                continue
+            task_tokens = words[i][1]
+            shared = tokens & task_tokens
+            inter = sum(idf(t) for t in shared)
+            union = sum(idf(t) for t in tokens | task_tokens)
+            shortlist.append((inter / union, i))
+
+        typos = not shortlist
+        if typos:
+            # Ninguna palabra en común (erratas en todas): la puntuación es solo
+            # la similitud de texto, con su propio umbral (la media con un
+            # solapamiento 0 nunca pasaría de 0.5)
+            shortlist = [(0.0, i) for i, t in enumerate(self.tasks) if t.done == done]
+            cutoff = max(cutoff, FUZZY_TYPO_CUTOFF)
+        else:
+            shortlist = heapq.nlargest(FUZZY_SHORTLIST, shortlist)
+
+        def score(ratio, overlap):
+            return ratio if typos else (ratio + overlap) / 2
+
+        ranked = []
+        matcher = SequenceMatcher(autojunk=False)
+        matcher.set_seq2(norm)
+        for overlap, i in shortlist:
+            # real_quick_ratio/quick_ratio son cotas superiores baratas de ratio()
+            matcher.set_seq1(words[i][0])
+            if score(matcher.real_quick_ratio(), overlap) < cutoff:
+                continue
+            if score(matcher.quick_ratio(), overlap) < cutoff:
+                continue
+            value = score(matcher.ratio(), overlap)
+            if value >= cutoff:
+                ranked.append((round(value, 3), i + 1, self.tasks[i]))
+
+        ranked.sort(key=lambda r: (-r[0], r[1]))
+        return ranked[:limit]
+
+    def find_at(self, mark, text, done):
+        # Busca la tarea por su offset guardado; si el archivo cambió, por su texto
+        task = self.at(mark)
+        if task and task.text == text and task.done == done:
+            return task
+        return self.find(text, done)
+
+    def at(self, mark):
+        i = bisect_left(self.tasks, mark, key=attrgetter("mark"))
+        if i < len(self.tasks) and self.tasks[i].mark == mark:
+            return self.tasks[i]
+        return None
+
+
+def _words(text):
+    tokens = tokenize(text)
+    return " ".join(tokens), frozenset(tokens)
+
+
+def only_numbers_differ(a, b):
+    # "Deploy versión 1" frente a "Deploy versión 2": mismas palabras salvo los
+    # números, que casi siempre distinguen tareas distintas
+    ta, tb = tokenize(a), tokenize(b)
+    if ta == tb:
+        return False
+    return [t for t in ta if not t.isdigit()] == [t for t in tb if not t.isdigit()]
+
+
+def parse_tasks(data, base=0):
+    tasks = []
+    for m in TASK_RE.finditer(data):
+        end = m.end() + 1 if m.end() < len(data) else m.end()
+        tasks.append(Task(
+            base + m.start(),
+            base + end,
+            base + m.start(1),
+            m.group(1) == b"x",
+            m.group(2).decode("utf-8", "replace").strip()
+        ))
+    return tasks
+
+
+############### CACHE ###############
+
+# TaskFile por ruta (projects/<proyecto>/<archivo>), invalidado por mtime y tamaño
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _key(path):
+    return os.path.abspath(path)
+
+
+def _store(tf):
+    with _lock:
+        _cache[_key(tf.path)] = tf
+        _cache.move_to_end(_key(tf.path))
+        while len(_cache) > MAX_CACHED_FILES:
+            _cache.popitem(last=False)
+
+
+def _fresh(path):
+    # Devuelve el TaskFile cacheado solo si el archivo no ha cambiado en disco
+    with _lock:
+        tf = _cache.get(_key(path))
+    if tf is None:
+        return None
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        invalidate(path)
+        return None
+    if st.st_mtime_ns != tf.mtime or st.st_size != tf.size:
+        return None
+    return tf
+
+
+def load(path):
+    tf = _fresh(path)
+    if tf is None:
+        tf = TaskFile.parse(path)
+        _store(tf)
+    return tf
+
+
+def invalidate(path):
+    with _lock:
+        _cache.pop(_key(path), None)
+
+
+def _under(key, root):
+    return key == root or key.startswith(root + os.sep)
+
+
+def moved(old, new):
+    # `old` (archivo o carpeta de proyecto) ahora está en `new`: lo cacheado se
+    # conserva con la ruta nueva (os.rename no cambia mtime ni tamaño)
+    old, new = _key(old), _key(new)
+    with _lock:
+        for key in [k for k in _cache if _under(k, old)]:
+            tf = _cache.pop(key)
+            tf.path = new + key[len(old):]
+            _cache[tf.path] = tf
+
+
+def removed(path):
+    # `path` (archivo o carpeta de proyecto) ya no existe
+    root = _key(path)
+    with _lock:
+        for key in [k for k in _cache if _under(k, root)]:
+            del _cache[key]
+
+
+def _restat(tf):
+    st = os.stat(tf.path)
+    tf.mtime = st.st_mtime_ns
+    tf.size = st.st_size
+
+
+def adopt(tf):
+    # Cachea un TaskFile construido fuera de este módulo (writebuffer) justo
+    # después de escribir su archivo, para no tener que volver a parsearlo
+    _restat(tf)
+    _store(tf)
+
+
+############### ESCRITURAS ###############
+
+# Este módulo es el backend markdown de ProjectAgent.tasks_io: escribe
+# directamente en disco, así que no hay nada pendiente que vaciar
+# (ver writebuffer.WriteBuffer y taskdb.TaskDB).
+
+def flush(path=None):
+    pass
+
+
+def end_turn():
+    pass
+
+
+def append_tasks(path, texts):
+    # Añade tareas pendientes al final y actualiza el índice sin releer el archivo
+    tf = _fresh(path)
+    data = "".join(f"- [ ] {text}\n" for text in texts).encode("utf-8")
+
+    with open(path, "a+b") as f:
+        base = f.seek(0, os.SEEK_END)
+        if base:
+            # Si la última línea no termina en "\n", la primera tarea nueva
+            # quedaría pegada a ella (en modo "a" se escribe siempre al final)
+            f.seek(base - 1)
+            if f.read(1) != b"\n":
+                data = b"\n" + data
+        f.write(data)
+
+    if tf is None or tf.size != base:
+        invalidate(path)
+        return
+    tf.extend(parse_tasks(data, base))
+    _restat(tf)
+
+
+def set_done(path, task, done):
+    set_done_many(path, [task], done)
+
+
+def set_done_many(path, tasks, done):
+    # "- [ ]" y "- [x]" miden lo mismo: basta con sobrescribir el byte de estado
+    tf = _fresh(path)
+    status = b"x" if done else b" "
+    with open(path, "r+b") as f:
+        # Solo se escribe si en `mark` sigue habiendo una casilla "[ ]" o "[x]":
+        # con un índice desfasado se corrompería una línea
+        for task in tasks:
+            f.seek(task.mark - 1)
+            if f.read(3) not in (b"[ ]", b"[x]"):
+                invalidate(path)
+                raise ValueError("el archivo de tareas cambió, vuelve a intentarlo")
+        for task in tasks:
+            f.seek(task.mark)
+            f.write(status)
+
+    stale = tf is None
+    for task in tasks:
+        if not stale and tf.at(task.mark) is not task:
+            stale = True
+        elif not stale and task.done != done:
+            tf.completed += 1 if done else -1
+        task.done = done
+
+    if stale:
+        invalidate(path)
+    else:
+        _restat(tf)
+
+
+def find_at(path, mark, text, done):
+    return load(path).find_at(mark, text, done)
+
+
+def remove_task(path, task):
+    remove_tasks(path, [task])
+
+
+def remove_tasks(path, tasks):
+    # Quita las líneas de `tasks` en una sola escritura, reescribiendo solo
+    # lo que va desde la primera de ellas hasta el final
+    if not tasks:
+        return
+    tasks = sorted(tasks, key=attrgetter("offset"))
+    start = tasks[0].offset
+
+    with open(path, "r+b") as f:
+        f.seek(start)
+        tail = f.read()
+        kept = []
+        pos = 0
+        for task in tasks:
+            kept.append(tail[pos:task.offset - start])
+            pos = task.end - start
+        kept.append(tail[pos:])
+
+        f.seek(start)
+        f.write(b"".join(kept))
+        f.truncate()
+    invalidate(path)
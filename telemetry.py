@@ -0,0 +1,287 @@
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+import tools
+
+# Trazas y métricas (opt-in, AGENT_TRACE=1). Se registra un span por cada
+# llamada a responses.create (latencia y tokens de response.usage), por cada
+# herramienta (duración y bytes leídos/escritos) y por cada turno. Los spans
+# van a un JSONL rotado (TRACE_DIR/spans.jsonl) y los agregados a un archivo
+# de texto en formato Prometheus (TRACE_DIR/metrics.prom).
+
+TRACE_DIR = os.getenv("AGENT_TRACE_DIR", ".trace")
+MAX_SPAN_BYTES = int(os.getenv("AGENT_TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+SPAN_BACKUPS = 3
+
+# Duraciones que se guardan por serie para calcular percentiles
+SAMPLES = 1000
+# Como mucho una escritura de metrics.prom por segundo
+METRICS_INTERVAL = 1.0
+
+THREAD_IO = "/proc/thread-self/io"
+
+
+def _thread_io():
+    # (bytes leídos, bytes escritos) por el hilo actual, o None si el sistema
+    # no lo expone. Cuenta todo read()/write(), también lo que sale de caché.
+    try:
+        with open(THREAD_IO, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    counters = dict(line.split(b": ") for line in data.splitlines())
+    return int(counters[b"rchar"]), int(counters[b"wchar"])
+
+
+def _io_overhead():
+    # Lo que suma a rchar leer el propio /proc/thread-self/io
+    first = _thread_io()
+    if first is None:
+        return 0
+    return _thread_io()[0] - first[0]
+
+
+IO_OVERHEAD = _io_overhead()
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def _usage(response):
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    details = getattr(usage, "input_tokens_details", None)
+    return {
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "cached_tokens": getattr(details, "cached_tokens", 0) or 0
+    }
+
+
+class Tracer:
+    def __init__(self, directory=TRACE_DIR, max_bytes=MAX_SPAN_BYTES, backups=SPAN_BACKUPS):
+        os.makedirs(directory, exist_ok=True)
+        self.spans_path = os.path.join(directory, "spans.jsonl")
+        self.metrics_path = os.path.join(directory, "metrics.prom")
+
+        self.logger = logging.getLogger(f"agent.trace.{os.path.abspath(directory)}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        if not self.logger.handlers:
+            handler = RotatingFileHandler(
+                self.spans_path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+
+        self._lock = threading.Lock()
+        # (tipo, nombre) -> últimas duraciones / [count, seconds]
+        self._samples = {}
+        self._totals = {}
+        self.tokens = {"input_tokens": 0, "output_tokens": 0, "cached_tokens": 0}
+        self.tool_bytes = {}
+        self.errors = {}
+        self._metrics_at = 0.0
+        # Una sola escritura de metrics.prom a la vez (turnos de varias sesiones)
+        self._metrics_lock = threading.Lock()
+
+    def install(self):
+        tools.TOOL_HOOKS.append(self.tool_hook)
+        return self
+
+    def uninstall(self):
+        if self.tool_hook in tools.TOOL_HOOKS:
+            tools.TOOL_HOOKS.remove(self.tool_hook)
+
+    ############### SPANS ###############
+
+    def record(self, kind, name, seconds, **fields):
+        span = {"type": kind, "name": name, "ts": round(time.time(), 3),
+                "duration_ms": round(seconds * 1000, 3)}
+        span.update(fields)
+        self.logger.info(json.dumps(span, ensure_ascii=False))
+
+        key = (kind, name)
+        with self._lock:
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen=SAMPLES)
+                self._totals[key] = [0, 0.0]
+            self._samples[key].append(seconds)
+            self._totals[key][0] += 1
+            self._totals[key][1] += seconds
+
+            if kind == "llm":
+                for field in self.tokens:
+                    self.tokens[field] += fields.get(field, 0)
+            elif kind == "tool":
+                counts = self.tool_bytes.setdefault(name, [0, 0])
+                counts[0] += fields.get("bytes_read", 0)
+                counts[1] += fields.get("bytes_written", 0)
+                if fields.get("error"):
+                    self.errors[name] = self.errors.get(name, 0) + 1
+
+    def tool_hook(self, name, args):
+        start = time.perf_counter()
+        io_start = _thread_io()
+
+        def finish(result):
+            seconds = time.perf_counter() - start
+            fields = {"error": isinstance(result, Exception)}
+            io_end = _thread_io() if io_start else None
+            if io_end:
+                fields["bytes_read"] = max(0, io_end[0] - io_start[0] - IO_OVERHEAD)
+                fields["bytes_written"] = io_end[1] - io_start[1]
+            self.record("tool", name, seconds, **fields)
+        return finish
+
+    def llm(self, model, start, response, stream=False, first_event=None):
+        fields = {"stream": stream, **_usage(response)}
+        if first_event is not None:
+            fields["ttfb_ms"] = round((first_event - start) * 1000, 3)
+        self.record("llm", model, time.perf_counter() - start, **fields)
+
+    def wrap_stream(self, stream, model, start):
+        # Deja pasar los eventos y registra el span al llegar response.completed
+        first_event = None
+        response = None
+        try:
+            for event in stream:
+                if first_event is None:
+                    first_event = time.perf_counter()
+                if event.type == "response.completed":
+                    response = event.response
+                yield event
+        finally:
+            self.llm(model, start, response, stream=True, first_event=first_event)
+
+    async def wrap_stream_async(self, stream, model, start):
+        first_event = None
+        response = None
+        try:
+            async for event in stream:
+                if first_event is None:
+                    first_event = time.perf_counter()
+                if event.type == "response.completed":
+                    response = event.response
+                yield event
+        finally:
+            self.llm(model, start, response, stream=True, first_event=first_event)
+
+    def turn(self, start, local=False):
+        self.record("turn", "local" if local else "model", time.perf_counter() - start)
+        if time.monotonic() - self._metrics_at < METRICS_INTERVAL:
+            return
+        # Si otro turno ya la está escribiendo no se espera; y un fallo al
+        # escribir las métricas nunca hace fallar el turno
+        if not self._metrics_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self._metrics_at >= METRICS_INTERVAL:
+                self._write_metrics()
+        except OSError:
+            pass
+        finally:
+            self._metrics_lock.release()
+
+    ############### MÉTRICAS ###############
+
+    def _snapshot(self):
+        with self._lock:
+            samples = {key: list(values) for key, values in self._samples.items()}
+            totals = {key: tuple(value) for key, value in self._totals.items()}
+            return samples, totals, dict(self.tokens), dict(self.tool_bytes), dict(self.errors)
+
+    def write_metrics(self):
+        with self._metrics_lock:
+            self._write_metrics()
+
+    def _write_metrics(self):
+        samples, totals, tokens, tool_bytes, errors = self._snapshot()
+        label = {"turn": "kind", "llm": "model", "tool": "tool"}
+
+        lines = []
+        for kind in ("turn", "llm", "tool"):
+            metric = f"agent_{kind}_duration_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for (k, name), values in sorted(samples.items()):
+                if k != kind:
+                    continue
+                labels = f'{label[kind]}="{name}"'
+                for q in (0.5, 0.95):
+                    lines.append(f'{metric}{{{labels},quantile="{q}"}} {percentile(values, q * 100):.6f}')
+                count, seconds = totals[(k, name)]
+                lines.append(f"{metric}_sum{{{labels}}} {seconds:.6f}")
+                lines.append(f"{metric}_count{{{labels}}} {count}")
+
+        lines.append("# TYPE agent_llm_tokens_total counter")
+        for field, value in tokens.items():
+            lines.append(f'agent_llm_tokens_total{{kind="{field[:-len("_tokens")]}"}} {value}')
+
+        lines.append("# TYPE agent_tool_bytes_total counter")
+        for name, (read, written) in sorted(tool_bytes.items()):
+            lines.append(f'agent_tool_bytes_total{{tool="{name}",direction="read"}} {read}')
+            lines.append(f'agent_tool_bytes_total{{tool="{name}",direction="written"}} {written}')
+
+        lines.append("# TYPE agent_tool_errors_total counter")
+        for name, value in sorted(errors.items()):
+            lines.append(f'agent_tool_errors_total{{tool="{name}"}} {value}')
+
+        # Temporal propio en el mismo directorio: os.replace nunca ve uno ajeno
+        self._metrics_at = time.monotonic()
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.metrics_path), prefix=".metrics.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(tmp, self.metrics_path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def stats(self):
+        # p50/p95 en ms por turno, por modelo y por herramienta
+        samples, totals, tokens, tool_bytes, _ = self._snapshot()
+        stats = {"turn": {}, "llm": {}, "tool": {}, "tokens": tokens}
+        for (kind, name), values in sorted(samples.items()):
+            stats[kind][name] = {
+                "count": totals[(kind, name)][0],
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p95_ms": round(percentile(values, 95) * 1000, 3)
+            }
+            if kind == "tool" and name in tool_bytes:
+                stats[kind][name]["bytes_read"], stats[kind][name]["bytes_written"] = tool_bytes[name]
+        return stats
+
+
+def format_stats(stats):
+    lines = []
+    for kind, title in (("turn", "Turnos"), ("llm", "Modelo"), ("tool", "Herramientas")):
+        if not stats[kind]:
+            continue
+        lines.append(f"{title}:")
+        for name, s in stats[kind].items():
+            lines.append(f"  {name:<22} n={s['count']:<5} p50={s['p50_ms']} ms  p95={s['p95_ms']} ms")
+    tokens = stats["tokens"]
+    lines.append(
+        f"Tokens: entrada {tokens['input_tokens']} (en caché {tokens['cached_tokens']}), "
+        f"salida {tokens['output_tokens']}"
+    )
+    return "\n".join(lines)
+
+
+def tracer_from_env():
+    if os.getenv("AGENT_TRACE") != "1":
+        return None
+    return Tracer().install()
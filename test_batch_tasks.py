@@ -0,0 +1,56 @@
+import pytest
+
+import taskdb
+import taskfile
+import writebuffer
+from agent import ProjectAgent
+
+# create_tasks / complete_tasks (y sus undos) con los tres backends de tareas
+
+BACKENDS = ("markdown", "write-behind", "sqlite")
+
+
+@pytest.fixture(params=BACKENDS)
+def agent(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    agent = ProjectAgent()
+    agent.echo = False
+    if request.param == "write-behind":
+        agent.tasks_io = writebuffer.WriteBuffer()
+    elif request.param == "sqlite":
+        agent.tasks_io = taskdb.TaskDB(str(tmp_path / "tasks.sqlite"))
+    run(agent, "create_project", project="p")
+    yield agent
+    agent.close()
+    if request.param == "sqlite":
+        agent.tasks_io.conn.close()
+        taskdb._dbs.discard(agent.tasks_io)
+
+
+def run(agent, name, **args):
+    return agent._run_tool(agent.TOOL_REGISTRY[name], args)
+
+
+def on_disk(agent):
+    agent.tasks_io.flush()
+    path = agent._get_tasks_file()
+    taskfile.invalidate(path)
+    return [(t.text, t.done) for t in taskfile.load(path).tasks]
+
+
+def test_create_and_complete_in_one_call(agent):
+    assert run(agent, "create_tasks", tasks=["a", "b", " ", "b", "c"]) == "4 tareas creadas."
+    result = run(agent, "complete_tasks", tasks=["b", "b", "x"], indices=[1, 9])
+
+    assert result == "3 tareas completadas. No encontradas o ya completadas: 9, x"
+    assert on_disk(agent) == [("a", True), ("b", True), ("b", True), ("c", False)]
+
+
+def test_batch_undo(agent):
+    run(agent, "create_tasks", tasks=["a", "b", "c"])
+    run(agent, "complete_tasks", indices=[1, 3])
+
+    run(agent, "undo_last_action")
+    assert on_disk(agent) == [("a", False), ("b", False), ("c", False)]
+    run(agent, "undo_last_action")
+    assert on_disk(agent) == []
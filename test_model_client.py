@@ -0,0 +1,22 @@
+from model_client import ResponseCache, build_request
+
+
+class Agent:
+    tools = [{"type": "function", "name": "a", "parameters": {"type": "object", "properties": {}}}]
+    messages = [{"role": "system", "content": "hola"}]
+
+
+def test_tools_go_through_the_sdk_parameter():
+    request = build_request(Agent())
+
+    assert request["tools"] is Agent.tools
+    assert "extra_body" not in request
+
+
+def test_cache_key_depends_on_the_tools():
+    cache = ResponseCache()
+    request = build_request(Agent())
+    other = dict(request, tools=[])
+
+    assert cache.key(request) == cache.key(build_request(Agent()))
+    assert cache.key(request)[0] != cache.key(other)[0]
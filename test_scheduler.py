@@ -0,0 +1,79 @@
+import json
+import threading
+import time
+
+import pytest
+
+import agent as agent_module
+from agent import ProjectAgent, ToolScheduler
+
+# Orden y paralelismo de las function_call de una respuesta
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    agent = ProjectAgent()
+    agent.echo = False
+    agent._run_tool(agent.TOOL_REGISTRY["create_project"], {"project": "p"})
+    return agent
+
+
+def traced(agent, delay):
+    # _run_tool con una pausa que registra el orden y la concurrencia
+    events = []
+    running = [0, 0]
+    lock = threading.Lock()
+    run = agent._run_tool
+
+    def slow(spec, args):
+        with lock:
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+            events.append(("start", spec.name))
+        time.sleep(delay)
+        try:
+            return run(spec, args)
+        finally:
+            with lock:
+                running[0] -= 1
+                events.append(("end", spec.name))
+
+    agent._run_tool = slow
+    return events, running
+
+
+def test_reads_wait_for_earlier_writes(agent):
+    events, _ = traced(agent, 0.05)
+    scheduler = ToolScheduler(agent)
+    scheduler.submit("c1", "create_task", json.dumps({"task": "desplegar backend"}))
+    scheduler.submit("c2", "search_tasks", json.dumps({"query": "desplegar"}))
+    scheduler.submit("c3", "summarize_workspace", "{}")
+    scheduler.submit("c4", "create_task", json.dumps({"task": "otra"}))
+    outputs = scheduler.outputs()
+
+    assert "desplegar backend" in outputs[1]["output"]
+    assert "1 tareas" in outputs[2]["output"]
+    order = [name for kind, name in events if kind == "start"]
+    assert order[0] == "create_task" and order[-1] == "create_task"
+    # Las dos lecturas sí van juntas
+    assert set(order[1:3]) == {"search_tasks", "summarize_workspace"}
+    assert events.index(("start", "search_tasks")) > events.index(("end", "create_task"))
+
+
+def test_same_file_chain_does_not_hold_pool_workers(agent):
+    _, running = traced(agent, 0.1)
+    scheduler = ToolScheduler(agent)
+    for i in range(3 * agent_module.TOOL_WORKERS):
+        scheduler.submit(f"c{i}", "create_task", json.dumps({"task": f"t{i}"}))
+
+    # Con la cadena en marcha el pool sigue libre para otras sesiones
+    start = time.monotonic()
+    agent_module.TOOL_POOL.submit(lambda: None).result()
+    assert time.monotonic() - start < 0.3
+
+    outputs = scheduler.outputs()
+    assert len(outputs) == 3 * agent_module.TOOL_WORKERS
+    assert running[1] == 1
+    tasks = agent.tasks_io.load(agent._get_tasks_file()).tasks
+    assert [t.text for t in tasks] == [f"t{i}" for i in range(3 * agent_module.TOOL_WORKERS)]
@@ -0,0 +1,52 @@
+import pytest
+
+import server
+
+# Ciclo de vida de las sesiones: nunca se cierra una con un turno en curso
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return server.SessionManager(client=None, max_sessions=2)
+
+
+def closes(session):
+    calls = []
+    close = session.agent.close
+    session.agent.close = lambda: (calls.append(1), close())
+    return calls
+
+
+def test_drop_waits_for_the_running_turn(manager):
+    session = manager.get("a")
+    closed = closes(session)
+
+    assert manager.drop("a")
+    assert closed == []
+    assert "a" not in manager.sessions
+
+    manager.release(session)
+    assert closed == [1]
+
+
+def test_drop_idle_session_closes_it(manager):
+    session = manager.get("a")
+    manager.release(session)
+    closed = closes(session)
+
+    assert manager.drop("a")
+    assert closed == [1]
+    assert not manager.drop("a")
+
+
+def test_eviction_skips_busy_sessions(manager):
+    a = manager.get("a")
+    b = manager.get("b")
+    with pytest.raises(server.SessionsFull):
+        manager.get("c")
+
+    manager.release(a)
+    manager.get("c")
+    assert sorted(manager.sessions) == ["b", "c"]
+    manager.release(b)
@@ -0,0 +1,108 @@
+import pytest
+
+import taskdb
+import taskfile
+
+# Importación .md -> SQLite y exportación de vuelta
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = taskdb.TaskDB(str(tmp_path / "tasks.sqlite"))
+    yield db
+    db.conn.close()
+    taskdb._dbs.discard(db)
+
+
+def write(path, data):
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(data)
+    taskfile.invalidate(str(path))
+    return str(path)
+
+
+ORIGINAL = (
+    b"# Proyecto\r\n\r\nNotas sueltas\n"
+    b"  - [ ] sangrada\n"
+    b"- [x]   con espacios  \r\n"
+    b"\n## Otra parte\n"
+    b"- [ ] \xc3\xa1cento\n"
+    b"pie sin salto"
+)
+
+
+def test_export_without_changes_is_byte_identical(db, tmp_path):
+    path = write(tmp_path / "p" / "t.md", ORIGINAL)
+
+    tf = db.load(path)
+    assert tf.total == 3 and tf.completed == 1
+    assert db.export(force=True) == 1
+    assert (tmp_path / "p" / "t.md").read_bytes() == ORIGINAL
+
+
+def test_changes_round_trip_through_markdown(db, tmp_path):
+    path = write(tmp_path / "p" / "t.md", ORIGINAL)
+
+    tf = db.load(path)
+    db.set_done(path, tf.task(1), True)
+    db.set_done(path, tf.task(2), False)
+    db.append_tasks(path, ["nueva"])
+    db.remove_task(path, db.load(path).task(3))
+    assert db.export() == 1
+
+    data = (tmp_path / "p" / "t.md").read_bytes()
+    assert data == (
+        b"# Proyecto\r\n\r\nNotas sueltas\n"
+        b"  - [x] sangrada\n"
+        b"- [ ]   con espacios  \r\n"
+        b"\n## Otra parte\n"
+        b"pie sin salto\n"
+        b"- [ ] nueva\n"
+    )
+    parsed = taskfile.TaskFile.parse(path)
+    exported = db.load(path)
+    assert [(t.text, t.done) for t in parsed.tasks] == [
+        (t.text, t.done) for _, t in exported.iter()
+    ]
+
+
+def test_external_edit_is_reimported(db, tmp_path):
+    path = write(tmp_path / "p" / "t.md", b"- [ ] a\n")
+    assert db.load(path).total == 1
+
+    write(tmp_path / "p" / "t.md", b"- [x] a\n- [ ] b\n- [ ] c\n")
+    tf = db.load(path)
+    assert (tf.total, tf.completed) == (3, 1)
+    assert db.export() == 0
+
+
+def test_only_tools_that_read_markdown_export(tmp_path, monkeypatch):
+    from agent import ProjectAgent
+
+    monkeypatch.chdir(tmp_path)
+    agent = ProjectAgent()
+    agent.echo = False
+    agent.tasks_io = db = taskdb.TaskDB(str(tmp_path / "tasks.sqlite"))
+
+    def run(name, **args):
+        return agent._run_tool(agent.TOOL_REGISTRY[name], args)
+
+    try:
+        run("create_project", project="p")
+        run("create_task", task="a")
+        for name, args in (("select_project", {"project": "p"}), ("list_files", {}),
+                           ("cancel_delete", {}), ("list_tasks", {}),
+                           ("select_tasks_file", {"filename": "tasks.md"})):
+            run(name, **args)
+        assert db.exports == 0
+
+        assert "- [ ] a" in run("read_file", filename="tasks.md")
+        assert db.exports == 1
+
+        run("create_task", task="b")
+        run("rename_task_file", old_name="tasks.md", new_name="otras.md")
+        run("select_tasks_file", filename="otras.md")
+        assert "- [ ] b" in run("read_file", filename="otras.md")
+    finally:
+        db.conn.close()
+        taskdb._dbs.discard(db)
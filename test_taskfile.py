@@ -0,0 +1,87 @@
+import pytest
+
+import taskfile
+
+# Escrituras en su sitio del backend markdown: el byte de estado y los appends
+
+
+def write(path, data):
+    path.write_bytes(data)
+    taskfile.invalidate(str(path))
+    return str(path)
+
+
+def test_set_done_patches_only_the_status_byte(tmp_path):
+    original = b"# T\r\n\r\n  - [ ] uno\r\n- [x]   dos  \n- [ ] tres"
+    path = write(tmp_path / "t.md", original)
+
+    tf = taskfile.load(path)
+    taskfile.set_done(path, tf.tasks[0], True)
+    taskfile.set_done(path, tf.tasks[1], False)
+
+    data = (tmp_path / "t.md").read_bytes()
+    assert len(data) == len(original)
+    diff = [i for i, (a, b) in enumerate(zip(original, data)) if a != b]
+    assert diff == [tf.tasks[0].mark, tf.tasks[1].mark]
+    assert data == b"# T\r\n\r\n  - [x] uno\r\n- [ ]   dos  \n- [ ] tres"
+
+
+def test_set_done_many_keeps_the_cache_in_step(tmp_path):
+    path = write(tmp_path / "t.md", b"- [ ] a\n- [ ] b\n- [x] c\n")
+
+    tf = taskfile.load(path)
+    taskfile.set_done_many(path, tf.tasks[:2], True)
+
+    assert taskfile.load(path) is tf
+    assert tf.completed == 3
+    fresh = taskfile.TaskFile.parse(path)
+    assert [t.done for t in fresh.tasks] == [True, True, True]
+
+
+def test_set_done_refuses_a_stale_offset(tmp_path):
+    path = write(tmp_path / "t.md", b"- [ ] a\n- [ ] b\n")
+    tf = taskfile.load(path)
+
+    # Cambio externo sin pasar por taskfile: en el offset de "a" ya no hay casilla
+    (tmp_path / "t.md").write_bytes(b"abcdefg\n- [ ] b\n")
+    with pytest.raises(ValueError):
+        taskfile.set_done_many(path, tf.tasks, True)
+
+    # No se escribe nada, tampoco la tarea que sí seguía en su sitio
+    assert (tmp_path / "t.md").read_bytes() == b"abcdefg\n- [ ] b\n"
+
+
+def test_append_starts_on_a_new_line(tmp_path):
+    path = write(tmp_path / "t.md", b"# T\n- [ ] a")
+
+    taskfile.load(path)
+    taskfile.append_tasks(path, ["b", "c"])
+
+    assert (tmp_path / "t.md").read_bytes() == b"# T\n- [ ] a\n- [ ] b\n- [ ] c\n"
+    assert [t.text for t in taskfile.load(path).tasks] == ["a", "b", "c"]
+    assert [t.text for t in taskfile.TaskFile.parse(path).tasks] == ["a", "b", "c"]
+
+
+def parsed(data):
+    return taskfile.TaskFile(None, None, None, taskfile.parse_tasks(data))
+
+
+def test_closest_with_typos_in_every_word():
+    tf = parsed(
+        "- [ ] Escribir documentación\n- [ ] Revisar el login\n- [ ] Preparar la demo\n".encode()
+    )
+
+    ranked = tf.closest("Escrbir documentacoin")
+    assert [number for _, number, _ in ranked] == [1]
+    assert tf.closest("Comprar pan") == []
+
+
+def test_closest_falls_back_to_common_words():
+    # Las palabras poco frecuentes de la consulta tienen erratas: no están en
+    # ninguna tarea, pero "tarea" y "de" sí (en casi todas)
+    lines = [f"- [ ] tarea de prueba {i}\n" for i in range(10)]
+    lines.append("- [ ] tarea de despliegue backend\n")
+    tf = parsed("".join(lines).encode())
+
+    ranked = tf.closest("tarea de despliege bakend")
+    assert ranked and ranked[0][1] == 11
@@ -0,0 +1,39 @@
+import os
+import threading
+import time
+
+import telemetry
+
+# metrics.prom con turnos concurrentes (modo servidor)
+
+
+def test_concurrent_turns_never_fail_on_metrics(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry, "METRICS_INTERVAL", 0)
+    tracer = telemetry.Tracer(str(tmp_path))
+    errors = []
+
+    def work():
+        for _ in range(200):
+            try:
+                tracer.turn(time.perf_counter())
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(os.listdir(tmp_path)) == ["metrics.prom", "spans.jsonl"]
+    assert "agent_turn_duration_seconds_count" in (tmp_path / "metrics.prom").read_text()
+
+
+def test_metrics_io_errors_stay_out_of_the_turn(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry, "METRICS_INTERVAL", 0)
+    tracer = telemetry.Tracer(str(tmp_path))
+    tracer.metrics_path = str(tmp_path / "no-existe" / "metrics.prom")
+
+    tracer.turn(time.perf_counter())
+    assert tracer.stats()["turn"]["model"]["count"] == 1
@@ -0,0 +1,57 @@
+import json
+
+import trash
+
+# Recuperación del diario de la papelera tras una escritura interrumpida
+
+
+def test_torn_last_line_is_dropped(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = trash.TrashJournal(path)
+    journal.push({"name": "a"})
+    journal.push({"name": "b"})
+    intact = (tmp_path / "journal.jsonl").read_bytes()
+
+    # Un push cortado a medias (sin "\n" final)
+    with open(path, "ab") as f:
+        f.write(b'{"op": "push", "id": 3, "entr')
+
+    journal = trash.TrashJournal(path)
+    assert list(journal.entries.values()) == [{"name": "a"}, {"name": "b"}]
+    assert (tmp_path / "journal.jsonl").read_bytes() == intact
+
+    # El siguiente append no queda pegado a la línea cortada
+    journal.push({"name": "c"})
+    journal = trash.TrashJournal(path)
+    assert journal.pop() == {"name": "c"}
+    assert journal.pop() == {"name": "b"}
+    assert len(journal) == 1
+
+
+def test_corrupt_complete_line_is_skipped(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = trash.TrashJournal(path)
+    journal.push({"name": "a"})
+    with open(path, "ab") as f:
+        f.write(b"{basura\n")
+    journal.push({"name": "b"})
+
+    journal = trash.TrashJournal(path)
+    assert list(journal.entries.values()) == [{"name": "a"}, {"name": "b"}]
+    assert journal.next_id == 3
+
+
+def test_pops_survive_reopen_and_compaction(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = trash.TrashJournal(path, compact_after=2)
+    for name in "abcd":
+        journal.push({"name": name})
+    journal.pop()
+    journal.pop()
+
+    lines = (tmp_path / "journal.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["op"] for line in lines] == ["push", "push"]
+
+    journal = trash.TrashJournal(path)
+    assert [e["name"] for e in journal.entries.values()] == ["a", "b"]
+    assert journal.pop() == {"name": "b"}
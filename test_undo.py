@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+import undo
+from agent import ProjectAgent
+
+# Snapshots de edit_file: comprimidas en memoria o enlace duro en disco
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    agent = ProjectAgent()
+    agent.echo = False
+    agent._run_tool(agent.TOOL_REGISTRY["create_project"], {"project": "p"})
+    yield agent
+    agent.close()
+
+
+def run(agent, name, **args):
+    return agent._run_tool(agent.TOOL_REGISTRY[name], args)
+
+
+def test_small_edit_is_kept_compressed_in_memory(agent, tmp_path):
+    original = "nota repetida\n" * 2000
+    run(agent, "edit_file", filename="notas.md", new_text=original)
+    run(agent, "edit_file", filename="notas.md", new_text="nuevo")
+
+    stats = agent.undo_stack.stats()
+    assert stats["snapshots"] == 1 and stats["snapshot_bytes"] == 0
+    assert 0 < stats["memory_bytes"] < len(original) // 10
+
+    run(agent, "undo_last_action")
+    assert (tmp_path / "projects" / "p" / "notas.md").read_text() == original
+    assert os.listdir(tmp_path / ".trash" / "undo") == []
+    assert agent.undo_stack.stats()["memory_bytes"] < len(original) // 10
+
+
+def test_same_content_is_stored_once(tmp_path):
+    path = tmp_path / "a.md"
+    path.write_text("igual\n" * 100)
+    first = undo.MemorySnapshot(str(path), str(tmp_path / "undo"))
+    second = undo.MemorySnapshot(str(path), str(tmp_path / "undo"))
+
+    assert undo._blobs[first.digest][1] == 2
+    first.release()
+    first.release()
+    assert undo._blobs[second.digest][1] == 1
+    second.release()
+    assert first.digest not in undo._blobs
+
+
+def test_memory_cap_evicts_old_edits(agent):
+    agent.undo_stack.max_bytes = 2000
+    for i in range(10):
+        text = os.urandom(600).hex()
+        run(agent, "edit_file", filename="r.md", new_text=text)
+
+    stats = agent.undo_stack.stats()
+    assert stats["memory_bytes"] <= 2000 or stats["entries"] == 1
+    assert stats["evicted"] > 0
+
+
+def test_large_file_is_hard_linked(agent, tmp_path, monkeypatch):
+    monkeypatch.setattr(undo, "INLINE_BYTES", 10)
+    original = "x" * 100
+    run(agent, "edit_file", filename="grande.md", new_text=original)
+    run(agent, "edit_file", filename="grande.md", new_text="y")
+
+    stats = agent.undo_stack.stats()
+    assert stats["snapshot_bytes"] == 100 and stats["memory_bytes"] < 100
+
+    run(agent, "undo_last_action")
+    assert (tmp_path / "projects" / "p" / "grande.md").read_text() == original
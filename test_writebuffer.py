@@ -0,0 +1,154 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import taskfile
+import textfile
+import writebuffer
+
+# Write-behind: nada llega a disco hasta el flush, que aplica el turno de una vez
+
+
+def write(path, data):
+    path.write_bytes(data)
+    taskfile.invalidate(str(path))
+    return str(path)
+
+
+def test_flush_applies_the_turn_at_once(tmp_path):
+    original = b"# T\n- [ ] a\n- [ ] b"
+    path = write(tmp_path / "t.md", original)
+    buffer = writebuffer.WriteBuffer()
+
+    tf = buffer.load(path)
+    buffer.set_done(path, tf.tasks[0], True)
+    buffer.append_tasks(path, ["c", "d"])
+    buffer.set_done(path, buffer.load(path).tasks[3], True)
+
+    assert (tmp_path / "t.md").read_bytes() == original
+    assert [(t.text, t.done) for t in buffer.load(path).tasks] == [
+        ("a", True), ("b", False), ("c", False), ("d", True)
+    ]
+
+    buffer.end_turn()
+    assert (tmp_path / "t.md").read_bytes() == b"# T\n- [x] a\n- [ ] b\n- [ ] c\n- [x] d\n"
+    assert buffer.pending() == 0
+    assert taskfile.load(path) is tf
+    assert tf.completed == 2
+
+
+def test_single_status_change_is_written_in_place(tmp_path):
+    path = write(tmp_path / "t.md", b"- [ ] a\n- [ ] b\n")
+    inode = os.stat(path).st_ino
+    buffer = writebuffer.WriteBuffer()
+
+    buffer.set_done(path, buffer.load(path).tasks[1], True)
+    buffer.end_turn()
+
+    assert (tmp_path / "t.md").read_bytes() == b"- [ ] a\n- [x] b\n"
+    assert os.stat(path).st_ino == inode
+
+
+def test_crash_during_flush_keeps_the_previous_file(tmp_path, monkeypatch):
+    original = b"- [ ] a\n- [ ] b\n"
+    path = write(tmp_path / "t.md", original)
+    buffer = writebuffer.WriteBuffer()
+    tf = buffer.load(path)
+    buffer.set_done_many(path, tf.tasks, True)
+    buffer.append_tasks(path, ["c"])
+
+    def crash(*args, **kwargs):
+        raise OSError("corte")
+    monkeypatch.setattr(textfile, "_commit", crash)
+    with pytest.raises(OSError):
+        buffer.end_turn()
+
+    assert (tmp_path / "t.md").read_bytes() == original
+    assert os.listdir(tmp_path) == ["t.md"]
+
+
+def test_max_age_flushes_without_more_writes(tmp_path):
+    path = write(tmp_path / "t.md", b"- [ ] a\n")
+    buffer = writebuffer.WriteBuffer(policy=writebuffer.NONE, max_age=0.05)
+
+    buffer.append_tasks(path, ["b"])
+    deadline = time.monotonic() + 5
+    while buffer.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert buffer.pending() == 0
+    assert (tmp_path / "t.md").read_bytes() == b"- [ ] a\n- [ ] b\n"
+
+
+def test_flush_replays_over_external_changes(tmp_path):
+    path = write(tmp_path / "t.md", b"- [ ] a\n- [ ] b\n")
+    buffer = writebuffer.WriteBuffer()
+
+    tf = buffer.load(path)
+    buffer.set_done(path, tf.tasks[1], True)
+    buffer.append_tasks(path, ["c"])
+    (tmp_path / "t.md").write_bytes(b"- [ ] z\n- [ ] a\n- [ ] b\n")
+
+    buffer.flush()
+    assert (tmp_path / "t.md").read_bytes() == b"- [ ] z\n- [ ] a\n- [x] b\n- [ ] c\n"
+
+
+def test_remove_flushes_first(tmp_path):
+    path = write(tmp_path / "t.md", b"- [ ] a\n")
+    buffer = writebuffer.WriteBuffer(policy=writebuffer.NONE)
+
+    buffer.append_tasks(path, ["b", "c"])
+    buffer.remove_task(path, buffer.load(path).tasks[1])
+
+    assert (tmp_path / "t.md").read_bytes() == b"- [ ] a\n- [ ] c\n"
+
+
+def run(tmp_path, code):
+    script = (
+        "import os, sys\n"
+        f"sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})\n"
+        "import writebuffer\n"
+        "buffer = writebuffer.WriteBuffer(policy=writebuffer.NONE)\n"
+        "path = 't.md'\n"
+        "tf = buffer.load(path)\n"
+        "buffer.set_done(path, tf.tasks[0], True)\n"
+        "buffer.append_tasks(path, ['b'])\n"
+        + code
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=tmp_path, check=True)
+    return (tmp_path / "t.md").read_bytes()
+
+
+def test_crash_leaves_the_file_untouched(tmp_path):
+    write(tmp_path / "t.md", b"- [ ] a\n")
+    # Sin atexit ni flush: lo pendiente se pierde, el archivo sigue intacto
+    assert run(tmp_path, "os._exit(0)\n") == b"- [ ] a\n"
+
+
+def test_exit_flushes_pending_writes(tmp_path):
+    write(tmp_path / "t.md", b"- [ ] a\n")
+    # El flush de atexit llega con otro directorio de trabajo
+    assert run(tmp_path, "os.chdir('/')\n") == b"- [x] a\n- [ ] b\n"
+
+
+def test_failed_flush_still_answers_the_call(tmp_path, monkeypatch):
+    from agent import ProjectAgent, ToolScheduler
+
+    monkeypatch.chdir(tmp_path)
+    agent = ProjectAgent()
+    agent.echo = False
+    agent.tasks_io = writebuffer.WriteBuffer(policy=writebuffer.NONE)
+    agent._run_tool(agent.TOOL_REGISTRY["create_project"], {"project": "p"})
+    agent._run_tool(agent.TOOL_REGISTRY["create_task"], {"task": "a"})
+    # El archivo desaparece fuera del agente con una escritura pendiente
+    os.remove(agent._get_tasks_file())
+
+    scheduler = ToolScheduler(agent)
+    scheduler.submit("call_1", "read_file", '{"filename": "tasks.md"}')
+    outputs = scheduler.outputs()
+
+    assert [o["call_id"] for o in outputs] == ["call_1"]
+    assert "Error ejecutando read_file" in outputs[0]["output"]
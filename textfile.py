@@ -0,0 +1,309 @@
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+
+# Lectura por rangos de líneas de archivos de cualquier tamaño.
+# El archivo se abre con mmap y se guarda, por ruta, un índice de dónde empieza
+# cada línea. El índice se construye bajo demanda: pedir las 100 primeras
+# líneas de un log de 50 MB solo recorre su primer bloque. Se invalida si
+# cambian el mtime o el tamaño.
+
+MAX_READ_BYTES = int(os.getenv("AGENT_READ_MAX_BYTES", str(64 * 1024)))
+BINARY_SNIFF_BYTES = 8192
+MAX_CACHED_FILES = 32
+SCAN_CHUNK = 1024 * 1024
+WRITE_CHUNK = 1024 * 1024
+
+
+class LineIndex:
+    __slots__ = ("path", "mtime", "size", "offsets", "scanned", "complete", "binary")
+
+    # offsets[i]: byte donde empieza la línea i + 1
+    # scanned: bytes recorridos hasta ahora
+    # complete: ya se ha llegado al final del archivo (len(offsets) es el total)
+    def __init__(self, path, mtime, size, binary):
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.offsets = array("q", [0] if size else [])
+        self.scanned = 0
+        self.complete = size == 0
+        self.binary = binary
+
+    def extend(self, mm, line=None, until=None):
+        # Indexa hasta tener el inicio de la línea `line` o de una línea que
+        # empiece en el byte `until` o después (lo que se pida), o hasta el
+        # final. Se recorre por bloques de SCAN_CHUNK bytes con split(), que
+        # es bastante más rápido que buscar los \n uno a uno.
+        offsets = self.offsets
+        while not self.complete:
+            if line is not None and len(offsets) >= line:
+                break
+            if until is not None and offsets[-1] >= until:
+                break
+            chunk = mm[self.scanned:self.scanned + SCAN_CHUNK]
+            starts = list(accumulate(
+                (len(piece) + 1 for piece in chunk.split(b"\n")[:-1]),
+                initial=self.scanned
+            ))[1:]
+            self.scanned += len(chunk)
+            if starts and starts[-1] >= self.size:
+                starts.pop()
+            offsets.extend(starts)
+            if self.scanned >= self.size:
+                self.complete = True
+
+    def end_of(self, line):
+        # Byte donde termina la línea `line` (incluido su \n)
+        if line < len(self.offsets):
+            return self.offsets[line]
+        return self.size
+
+
+def _is_binary(mm):
+    sample = mm[:BINARY_SNIFF_BYTES]
+    if b"\0" in sample:
+        return True
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # Un carácter multibyte cortado al final de la muestra no cuenta
+        return e.start < len(sample) - 3
+    return False
+
+
+############### CACHE ###############
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _index(path, st, mm):
+    key = os.path.abspath(path)
+    with _lock:
+        index = _cache.get(key)
+        if index is not None and (index.mtime, index.size) == (st.st_mtime_ns, st.st_size):
+            _cache.move_to_end(key)
+            return index
+
+    index = LineIndex(path, st.st_mtime_ns, st.st_size, _is_binary(mm))
+    with _lock:
+        _cache[key] = index
+        while len(_cache) > MAX_CACHED_FILES:
+            _cache.popitem(last=False)
+    return index
+
+
+def invalidate(path):
+    with _lock:
+        _cache.pop(os.path.abspath(path), None)
+
+
+############### LECTURA ###############
+
+class Slice:
+    __slots__ = ("text", "start", "end", "total", "size", "truncated", "binary", "cut")
+
+    # start/end: primera y última línea devueltas (end = start - 1 si no hay ninguna)
+    # total: número de líneas del archivo, o None si aún no se ha llegado al final
+    # cut: si la línea `end` no cabía entera, byte de esa línea donde se cortó
+    def __init__(self, text, start, end, total, size, truncated, binary=False, cut=None):
+        self.text = text
+        self.start = start
+        self.end = end
+        self.total = total
+        self.size = size
+        self.truncated = truncated
+        self.binary = binary
+        self.cut = cut
+
+
+def read_lines(path, start_line=1, end_line=None, max_bytes=MAX_READ_BYTES, line_offset=0):
+    # line_offset: byte de start_line desde el que leer (para seguir una línea cortada)
+    start_line = max(1, start_line)
+    max_bytes = max(1, max_bytes)
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if st.st_size == 0:
+            return Slice("", 1, 0, 0, 0, False)
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            index = _index(path, st, mm)
+            if index.binary:
+                return Slice("", 1, 0, None, st.st_size, False, binary=True)
+
+            index.extend(mm, line=start_line)
+            if start_line > len(index.offsets):
+                total = len(index.offsets)
+                return Slice("", start_line, start_line - 1, total, st.st_size, False)
+
+            line_start = index.offsets[start_line - 1]
+            begin = line_start + max(0, line_offset)
+            # Hace falta el inicio de la línea siguiente a la última pedida, o
+            # llegar un byte más allá del máximo para saber si hay que cortar
+            if end_line is not None:
+                index.extend(mm, line=end_line + 1, until=begin + max_bytes + 1)
+            else:
+                index.extend(mm, until=begin + max_bytes + 1)
+
+            begin = min(begin, index.end_of(start_line))
+
+            last = len(index.offsets) if index.complete else len(index.offsets) - 1
+            if end_line is not None:
+                last = min(last, max(end_line, start_line - 1))
+            stop = index.end_of(last)
+
+            truncated = stop - begin > max_bytes
+            cut = None
+            if truncated:
+                # Cortar en la última línea completa que quepa; si ni la primera
+                # cabe, a mitad de línea (sin partir un carácter UTF-8)
+                last = bisect_right(index.offsets, begin + max_bytes) - 1
+                if last >= start_line:
+                    stop = index.end_of(last)
+                else:
+                    stop = begin + max_bytes
+                    while stop > begin and mm[stop] & 0xC0 == 0x80:
+                        stop -= 1
+                    if stop == begin:
+                        # Ni un carácter cabe: se devuelve uno entero
+                        stop += 1
+                        while stop < st.st_size and mm[stop] & 0xC0 == 0x80:
+                            stop += 1
+                    last = start_line
+                    cut = stop - line_start
+            text = mm[begin:stop].decode("utf-8", "ignore" if truncated else "replace")
+
+            total = len(index.offsets) if index.complete else None
+            return Slice(text, start_line, last, total, st.st_size, truncated, cut=cut)
+
+
+############### ESCRITURA ###############
+
+# Las escrituras van a un temporal en el mismo directorio que se fsync-ea y se
+# cambia por el original con os.replace: nadie ve nunca un archivo a medias.
+
+def _temp_for(path):
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    return os.fdopen(fd, "wb"), tmp
+
+
+def _commit(f, tmp, path, before=None, fsync=True):
+    # before(): se llama justo antes de sustituir el archivo (p. ej. para
+    # guardar una instantánea del original)
+    f.flush()
+    if fsync:
+        os.fsync(f.fileno())
+    f.close()
+    if os.path.exists(path):
+        shutil.copymode(path, tmp)
+    if before:
+        before()
+    os.replace(tmp, path)
+    invalidate(path)
+
+
+def write_atomic(path, data, before=None, fsync=True):
+    # fsync=False: sigue siendo atómica (nunca se ve a medias), pero tras un
+    # corte de luz puede quedar la versión anterior
+    f, tmp = _temp_for(path)
+    try:
+        f.write(data)
+        _commit(f, tmp, path, before, fsync)
+    except BaseException:
+        f.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def replace_in_file(path, old, new, count=None, before=None, chunk_size=WRITE_CHUNK):
+    # Reemplaza `old` por `new` (bytes) leyendo por bloques: en memoria solo
+    # hay un bloque más len(old) bytes arrastrados del anterior, por si una
+    # coincidencia cae entre dos bloques. Devuelve cuántos reemplazos hizo;
+    # si no hay ninguno no se toca el archivo.
+    f, tmp = _temp_for(path)
+    replaced = 0
+    try:
+        with open(path, "rb") as src:
+            carry = b""
+            while True:
+                data = src.read(chunk_size)
+                buf = carry + data
+                pos = 0
+                while count is None or replaced < count:
+                    i = buf.find(old, pos)
+                    if i == -1:
+                        break
+                    f.write(buf[pos:i])
+                    f.write(new)
+                    pos = i + len(old)
+                    replaced += 1
+
+                if not data or (count is not None and replaced >= count):
+                    f.write(buf[pos:])
+                    shutil.copyfileobj(src, f, chunk_size)
+                    break
+
+                # Lo que podría ser el comienzo de una coincidencia pasa al siguiente bloque
+                keep = max(pos, len(buf) - len(old) + 1)
+                f.write(buf[pos:keep])
+                carry = buf[keep:]
+
+        if replaced:
+            _commit(f, tmp, path, before)
+            return replaced
+    except BaseException:
+        f.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    f.close()
+    os.remove(tmp)
+    return 0
+
+
+def patch_atomic(path, patches, tail=b"", expect=None, fsync=True, chunk_size=WRITE_CHUNK):
+    # Copia `path` por bloques sobrescribiendo los bytes de `patches`
+    # ({offset: byte}) y añadiendo `tail` al final, y la cambia por el
+    # original de una vez. Con expect=(mtime_ns, tamaño), si el archivo ya no
+    # es ese no se toca y devuelve False.
+    offsets = sorted(patches)
+    f, tmp = _temp_for(path)
+    try:
+        with open(path, "rb") as src:
+            st = os.fstat(src.fileno())
+            if expect is not None and (st.st_mtime_ns, st.st_size) != expect:
+                f.close()
+                os.remove(tmp)
+                return False
+            pos = 0
+            i = 0
+            while True:
+                data = src.read(chunk_size)
+                if not data:
+                    break
+                end = pos + len(data)
+                if i < len(offsets) and offsets[i] < end:
+                    data = bytearray(data)
+                    while i < len(offsets) and offsets[i] < end:
+                        data[offsets[i] - pos] = patches[offsets[i]]
+                        i += 1
+                f.write(data)
+                pos = end
+        f.write(tail)
+        _commit(f, tmp, path, fsync=fsync)
+        return True
+    except BaseException:
+        f.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
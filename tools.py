@@ -0,0 +1,108 @@
+# Registro de herramientas: cada método de ProjectAgent declara con @tool su
+# schema y sus precondiciones; @register construye una sola vez por proceso
+# el diccionario de despacho y la lista de schemas compartida por todas las
+# instancias.
+
+# Ámbito de una herramienta, usado por ToolScheduler para decidir qué puede
+# ir en paralelo:
+FREE = "free"          # lee de todo el workspace: tras las escrituras anteriores
+FILE = "file"          # lee/escribe el archivo `filename` del proyecto activo
+TASKS = "tasks"        # lee/escribe el archivo de tareas activo
+SESSION = "session"    # cambia el estado de la sesión: se ejecuta sola
+
+# Qué archivos de tareas tiene que haber en disco antes de la herramienta
+# (tasks_io.flush: buffer de AGENT_WRITE_BEHIND o exportación de SQLite):
+FLUSH_FILE = "file"        # el archivo `filename` (u `old_name`) del proyecto activo
+FLUSH_PROJECT = "project"  # la carpeta del proyecto activo
+FLUSH_ALL = "all"          # todos
+# Por defecto: nada para TASKS (pasan por tasks_io), el archivo para FILE y
+# todo para el resto; flush=None si la herramienta no lee ni mueve .md del disco
+_FLUSH_BY_SCOPE = object()
+
+# Hooks alrededor de cada herramienta: hook(name, args) puede devolver una
+# función finish(result) que se llama al terminar (con la excepción como
+# result si la herramienta falla). Sin hooks no cuesta nada.
+TOOL_HOOKS = []
+
+
+class ToolSpec:
+    __slots__ = (
+        "name", "fn", "schema", "scope", "flush",
+        "project_required", "tasks_required", "allowed_pending"
+    )
+
+    def __init__(self, fn, schema, scope, flush, project_required, tasks_required, allowed_pending):
+        self.name = fn.__name__
+        self.fn = fn
+        self.schema = schema
+        self.scope = scope
+        self.flush = flush
+        self.project_required = project_required
+        self.tasks_required = tasks_required
+        self.allowed_pending = allowed_pending
+
+    def key(self, agent, args):
+        # None: lectura sin clave (en paralelo con otras lecturas, no con
+        # escrituras); SESSION: sola
+        if self.scope == FREE:
+            return None
+        if self.scope == FILE:
+            return (agent.current_project, args.get("filename"))
+        if self.scope == TASKS:
+            return (agent.current_project, agent.current_tasks_file)
+        return SESSION
+
+
+def tool(description, properties=None, required=(), scope=SESSION, flush=_FLUSH_BY_SCOPE,
+         project_required=False, tasks_required=False, allowed_pending=False):
+    def decorator(fn):
+        schema = {
+            "type": "function",
+            "name": fn.__name__,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": properties or {}
+            }
+        }
+        if required:
+            schema["parameters"]["required"] = list(required)
+
+        flushes = flush
+        if flushes is _FLUSH_BY_SCOPE:
+            flushes = {TASKS: None, FILE: FLUSH_FILE}.get(scope, FLUSH_ALL)
+
+        fn.tool_spec = ToolSpec(
+            fn, schema, scope, flushes,
+            project_required or tasks_required, tasks_required, allowed_pending
+        )
+        return fn
+    return decorator
+
+
+def register(cls):
+    registry = {}
+    for attr in vars(cls).values():
+        spec = getattr(attr, "tool_spec", None)
+        if spec is not None:
+            registry[spec.name] = spec
+
+    cls.TOOL_REGISTRY = registry
+    cls.tools = [spec.schema for spec in registry.values()]
+    return cls
+
+
+def call(spec, agent, args):
+    if not TOOL_HOOKS:
+        return spec.fn(agent, **args)
+
+    finishers = [f for f in (hook(spec.name, args) for hook in TOOL_HOOKS) if f]
+    try:
+        result = spec.fn(agent, **args)
+    except Exception as e:
+        for finish in finishers:
+            finish(e)
+        raise
+    for finish in finishers:
+        finish(result)
+    return result
@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+
+# Diario append-only de la papelera (.trash/journal.jsonl), una línea por operación:
+#   {"op": "push", "id": 7, "entry": {...}}   elemento movido a la papelera
+#   {"op": "pop", "id": 7}                    lápida: elemento restaurado
+# El índice en memoria se reconstruye al abrir; una última línea cortada
+# (escritura interrumpida) se detecta y se descarta.
+
+COMPACT_AFTER = 1000
+
+
+class TrashJournal:
+    def __init__(self, path, legacy_manifest=None, compact_after=COMPACT_AFTER):
+        self.path = path
+        self.compact_after = compact_after
+        self.entries = {}
+        self.next_id = 1
+        self.tombstones = 0
+        self._lock = threading.Lock()
+
+        if not os.path.exists(path) and legacy_manifest and os.path.exists(legacy_manifest):
+            self._migrate(legacy_manifest)
+        self._load()
+
+    def _migrate(self, manifest):
+        # Convierte el antiguo manifest.json (lista JSON) al diario
+        with open(manifest, "r", encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                data = []
+        self._rewrite(list(enumerate(data, 1)))
+        os.remove(manifest)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            open(self.path, "a").close()
+            return
+
+        good = 0
+        with open(self.path, "rb") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(raw)
+                except json.JSONDecodeError:
+                    good += len(raw)
+                    continue
+                good += len(raw)
+                self._apply(record)
+
+        # Descartar la línea cortada para que el siguiente append no se pegue a ella
+        if good != os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+
+    def _apply(self, record):
+        entry_id = record.get("id", 0)
+        if record.get("op") == "push":
+            self.entries[entry_id] = record["entry"]
+        elif record.get("op") == "pop":
+            self.entries.pop(entry_id, None)
+            self.tombstones += 1
+        self.next_id = max(self.next_id, entry_id + 1)
+
+    def _append(self, record):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _rewrite(self, items):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry_id, entry in items:
+                f.write(json.dumps({"op": "push", "id": entry_id, "entry": entry}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def push(self, entry):
+        with self._lock:
+            entry_id = self.next_id
+            self.next_id += 1
+            self._append({"op": "push", "id": entry_id, "entry": entry})
+            self.entries[entry_id] = entry
+            return entry_id
+
+    def pop(self):
+        with self._lock:
+            if not self.entries:
+                return None
+            entry_id = next(reversed(self.entries))
+            self._append({"op": "pop", "id": entry_id})
+            entry = self.entries.pop(entry_id)
+            self.tombstones += 1
+
+            # Compactar cuando las lápidas superan a los vivos: coste amortizado O(1)
+            if self.tombstones >= max(self.compact_after, len(self.entries)):
+                self._compact()
+            return entry
+
+    def _compact(self):
+        # Reescribe el diario solo con los elementos vivos (escritura atómica)
+        self._rewrite(self.entries.items())
+        self.tombstones = 0
+
+    def compact(self):
+        with self._lock:
+            self._compact()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def open_journal(path, legacy_manifest=None):
+    # Un diario por ruta y proceso, compartido por todas las sesiones
+    # (por ruta absoluta: la relativa depende del directorio de trabajo)
+    key = os.path.abspath(path)
+    with _journals_lock:
+        journal = _journals.get(key)
+        if journal is None:
+            journal = _journals[key] = TrashJournal(key, legacy_manifest)
+        return journal
@@ -0,0 +1,231 @@
+import atexit
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+import weakref
+import zlib
+
+# Pila de undo con límite de memoria.
+# edit_file guarda el contenido previo como una snapshot:
+# - archivos de hasta INLINE_BYTES: comprimidos con zlib en memoria, por su
+#   hash (el mismo contenido se guarda una vez para todas las pilas del proceso)
+# - los mayores: un enlace duro en spill_dir al archivo original, sin copiarlo
+#   ni leerlo (edit_file los procesa por bloques)
+# Al superar max_bytes en memoria (o max_disk_bytes en disco) se descartan las
+# entradas más antiguas.
+#
+# Las snapshots llevan el pid del proceso en el nombre: al crear la primera
+# pila de un directorio se borran las de procesos que ya no existen, y las
+# propias se borran al cerrar la pila (close, fin de sesión) o al salir.
+
+MAX_UNDO_BYTES = int(os.getenv("AGENT_UNDO_MAX_BYTES", str(8 * 1024 * 1024)))
+MAX_UNDO_DISK_BYTES = int(os.getenv("AGENT_UNDO_MAX_DISK_BYTES", str(256 * 1024 * 1024)))
+INLINE_BYTES = int(os.getenv("AGENT_UNDO_INLINE_BYTES", str(256 * 1024)))
+
+# Directorios ya purgados por este proceso, y pilas vivas para cerrarlas al salir
+_purged = set()
+_stacks = weakref.WeakSet()
+
+# Contenidos comprimidos de las MemorySnapshot: sha256 -> [datos, referencias]
+_blobs = {}
+_blobs_lock = threading.Lock()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def purge_stale(spill_dir):
+    # Borra las snapshots de procesos que ya no existen; devuelve cuántas
+    removed = 0
+    if not os.path.isdir(spill_dir):
+        return removed
+    for entry in os.scandir(spill_dir):
+        if not entry.name.startswith("snapshot-"):
+            continue
+        pid = entry.name.split("-")[1]
+        if pid.isdigit() and int(pid) > 0 and _alive(int(pid)):
+            continue
+        try:
+            os.remove(entry.path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+class FileSnapshot:
+    __slots__ = ("path", "disk_bytes", "taken")
+    memory_bytes = 0
+
+    # El archivo se va a sustituir con os.replace, así que basta un enlace
+    # duro al inodo original: ni copia ni memoria. Si no se puede enlazar
+    # (otro sistema de archivos) se copia por bloques.
+    def __init__(self, source, spill_dir):
+        os.makedirs(spill_dir, exist_ok=True)
+        self.path = os.path.join(spill_dir, f"snapshot-{os.getpid()}-{uuid.uuid4().hex}")
+        try:
+            os.link(source, self.path)
+        except OSError:
+            shutil.copyfile(source, self.path)
+        self.disk_bytes = os.path.getsize(self.path)
+        self.taken = False
+
+    def read(self):
+        # Quien deshace se queda con el archivo (lo mueve a su sitio)
+        self.taken = True
+        return self.path
+
+    def release(self):
+        if not self.taken and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class MemorySnapshot:
+    __slots__ = ("digest", "mode", "spill_dir", "memory_bytes", "released")
+    disk_bytes = 0
+
+    # Contenido comprimido en memoria; al deshacer se escribe a un archivo
+    # en spill_dir (mismo sistema de archivos: se mueve a su sitio con os.replace)
+    def __init__(self, source, spill_dir):
+        with open(source, "rb") as f:
+            data = f.read()
+            self.mode = os.fstat(f.fileno()).st_mode
+        self.digest = hashlib.sha256(data).digest()
+        self.spill_dir = spill_dir
+        self.released = False
+        with _blobs_lock:
+            blob = _blobs.get(self.digest)
+            if blob is None:
+                blob = _blobs[self.digest] = [zlib.compress(data), 0]
+            blob[1] += 1
+            self.memory_bytes = len(blob[0])
+
+    def read(self):
+        with _blobs_lock:
+            data = _blobs[self.digest][0]
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"snapshot-{os.getpid()}-{uuid.uuid4().hex}")
+        with open(path, "wb") as f:
+            f.write(zlib.decompress(data))
+        os.chmod(path, self.mode & 0o7777)
+        return path
+
+    def release(self):
+        if self.released:
+            return
+        self.released = True
+        with _blobs_lock:
+            blob = _blobs[self.digest]
+            blob[1] -= 1
+            if not blob[1]:
+                del _blobs[self.digest]
+
+
+SNAPSHOTS = (FileSnapshot, MemorySnapshot)
+
+
+def _entry_size(entry):
+    memory = disk = 0
+    for value in entry.get("payload", {}).values():
+        if isinstance(value, SNAPSHOTS):
+            memory += value.memory_bytes
+            disk += value.disk_bytes
+        elif isinstance(value, str):
+            memory += len(value)
+    return memory, disk
+
+
+class UndoStack:
+    # Se usa como la lista que había antes: append(), pop(), len() y bool().
+    # Las herramientas FILE y TASKS de una misma respuesta apilan desde los
+    # hilos de TOOL_POOL a la vez: todo pasa por _lock.
+    def __init__(self, spill_dir, max_bytes=MAX_UNDO_BYTES, max_disk_bytes=MAX_UNDO_DISK_BYTES):
+        self.spill_dir = spill_dir
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = []
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.evicted = 0
+        self._lock = threading.RLock()
+
+        key = os.path.abspath(spill_dir)
+        if key not in _purged:
+            _purged.add(key)
+            purge_stale(spill_dir)
+        _stacks.add(self)
+
+    def append(self, entry):
+        memory, disk = _entry_size(entry)
+        with self._lock:
+            self.entries.append(entry)
+            self.memory_bytes += memory
+            self.disk_bytes += disk
+
+            while len(self.entries) > 1 and (
+                self.memory_bytes > self.max_bytes or self.disk_bytes > self.max_disk_bytes
+            ):
+                self._release(self.entries.pop(0))
+                self.evicted += 1
+
+    def _release(self, entry):
+        memory, disk = _entry_size(entry)
+        self.memory_bytes -= memory
+        self.disk_bytes -= disk
+        for value in entry.get("payload", {}).values():
+            if isinstance(value, SNAPSHOTS):
+                value.release()
+
+    def pop(self):
+        with self._lock:
+            entry = self.entries.pop()
+            payload = entry.get("payload", {})
+            restored = {k: (v.read() if isinstance(v, SNAPSHOTS) else v) for k, v in payload.items()}
+            self._release(entry)
+        return dict(entry, payload=restored)
+
+    def close(self):
+        # Fin de la sesión: se descartan todas las entradas y sus snapshots
+        with self._lock:
+            while self.entries:
+                self._release(self.entries.pop())
+
+    def snapshot(self, path):
+        # Para guardar en el payload el contenido de `path` antes de sustituirlo
+        if os.path.getsize(path) <= INLINE_BYTES:
+            return MemorySnapshot(path, self.spill_dir)
+        return FileSnapshot(path, self.spill_dir)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __bool__(self):
+        return bool(self.entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "memory_bytes": self.memory_bytes,
+                "snapshot_bytes": self.disk_bytes,
+                "snapshots": sum(
+                    1 for e in self.entries for v in e.get("payload", {}).values()
+                    if isinstance(v, SNAPSHOTS)
+                ),
+                "evicted": self.evicted
+            }
+
+
+@atexit.register
+def _close_all():
+    for stack in list(_stacks):
+        stack.close()
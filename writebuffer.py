@@ -0,0 +1,308 @@
+import atexit
+import os
+import threading
+import time
+import weakref
+
+import taskfile
+import textfile
+
+# Write-behind por sesión para los archivos de tareas (opt-in, AGENT_WRITE_BEHIND).
+# Las escrituras de create_task/complete_task/... (y de sus undos) no van a
+# disco al momento: se guardan como cambios pendientes por archivo (bytes que
+# añadir al final y bytes de estado que sobrescribir) y el TaskFile en memoria
+# ya los refleja. Al final del turno, o al superar MAX_BYTES pendientes o
+# MAX_AGE segundos sin escribir, cada archivo se escribe una sola vez y de
+# forma atómica: una copia con los cambios aplicados (temporal + os.replace),
+# así que un corte a mitad nunca deja medio turno en disco. Si lo pendiente
+# es un solo byte de estado se escribe en su sitio (ya es atómico). Lo que
+# cambia la estructura del archivo (quitar tareas) vacía antes el buffer del
+# archivo y va directo a taskfile.
+#
+# Tiene la misma interfaz que el módulo taskfile (load, append_tasks, set_done,
+# ...), así que ProjectAgent usa uno u otro indistintamente. Las herramientas
+# que leen o escriben el disco por su cuenta (read_file, edit_file, búsqueda,
+# borrados...) vacían el buffer antes de ejecutarse. Si el archivo cambió
+# fuera del agente mientras había cambios pendientes, se vuelven a aplicar
+# sobre lo que haya en disco (por texto, con taskfile).
+#
+# Políticas de durabilidad:
+#   none            no se escribe al final del turno, solo por umbral o al salir
+#   flush-per-turn  se escribe al final de cada turno, sin fsync
+#   fsync-per-turn  se escribe al final de cada turno y se hace fsync
+
+NONE = "none"
+FLUSH_PER_TURN = "flush-per-turn"
+FSYNC_PER_TURN = "fsync-per-turn"
+POLICIES = (NONE, FLUSH_PER_TURN, FSYNC_PER_TURN)
+
+MAX_BYTES = int(os.getenv("AGENT_WRITE_BEHIND_MAX_BYTES", str(8 * 1024 * 1024)))
+MAX_AGE = float(os.getenv("AGENT_WRITE_BEHIND_MAX_AGE", "5"))
+
+# Buffers vivos, para escribir lo pendiente si el proceso termina
+_buffers = weakref.WeakSet()
+
+
+class BufferedFile:
+    __slots__ = ("path", "tf", "disk", "appended", "patches", "dirty_since")
+
+    # disk: (mtime_ns, tamaño) del archivo en disco al empezar a acumular
+    # appended: bytes que faltan por añadir al final
+    # patches: tareas ya en disco cuyo byte de estado hay que reescribir
+    def __init__(self, path, tf, disk):
+        self.path = path
+        self.tf = tf
+        self.disk = disk
+        self.appended = bytearray()
+        self.patches = {}
+        self.dirty_since = None
+
+    @property
+    def pending_bytes(self):
+        return len(self.appended) + len(self.patches)
+
+
+class WriteBuffer:
+    def __init__(self, policy=FLUSH_PER_TURN, max_bytes=MAX_BYTES, max_age=MAX_AGE):
+        if policy not in POLICIES:
+            raise ValueError(f"Política de durabilidad desconocida: {policy}")
+        self.policy = policy
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.files = {}
+        self._lock = threading.RLock()
+        # Temporizador de MAX_AGE: sin él, un archivo que no recibe más
+        # escrituras (política none) no se escribiría hasta salir
+        self._timer = None
+
+        self.writes = 0
+        self.flushes = 0
+        _buffers.add(self)
+
+    def _open(self, path):
+        # El TaskFile cacheado pasa al buffer (así las tareas que ya devolvió
+        # load() siguen siendo las mismas) y sale de la caché de taskfile
+        # hasta que se escriba
+        key = os.path.abspath(path)
+        bf = self.files.get(key)
+        if bf is None:
+            tf = taskfile.load(path)
+            taskfile.invalidate(path)
+            # Ruta absoluta: el flush puede llegar en atexit, con otro cwd
+            tf.path = key
+            bf = self.files[key] = BufferedFile(key, tf, (tf.mtime, tf.size))
+        return bf
+
+    def _dirty(self, bf):
+        self.writes += 1
+        if bf.dirty_since is None:
+            bf.dirty_since = time.monotonic()
+            self._schedule(self.max_age)
+        self._check_thresholds()
+
+    def _schedule(self, delay):
+        if self._timer is None:
+            self._timer = threading.Timer(max(0.0, delay), self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _expire(self):
+        with self._lock:
+            self._timer = None
+            try:
+                self._check_thresholds()
+            except OSError:
+                # Archivo borrado o movido fuera del agente: lo pendiente se descarta
+                pass
+            oldest = min(
+                (bf.dirty_since for bf in self.files.values() if bf.dirty_since is not None),
+                default=None
+            )
+            if oldest is not None:
+                self._schedule(oldest + self.max_age - time.monotonic())
+
+    def _check_thresholds(self):
+        size = sum(bf.pending_bytes for bf in self.files.values())
+        now = time.monotonic()
+        if size > self.max_bytes or any(
+            bf.dirty_since is not None and now - bf.dirty_since >= self.max_age
+            for bf in self.files.values()
+        ):
+            self.flush()
+
+    ############### INTERFAZ DE taskfile ###############
+
+    def load(self, path):
+        with self._lock:
+            bf = self.files.get(os.path.abspath(path))
+            if bf is not None:
+                return bf.tf
+        return taskfile.load(path)
+
+    def append_tasks(self, path, texts):
+        with self._lock:
+            bf = self._open(path)
+            chunk = "".join(f"- [ ] {text}\n" for text in texts).encode("utf-8")
+            if not bf.appended and bf.tf.size and not _ends_with_newline(bf.path, bf.tf.size):
+                chunk = b"\n" + chunk
+            base = bf.tf.size
+            bf.appended += chunk
+            bf.tf.extend(taskfile.parse_tasks(chunk, base))
+            bf.tf.size = base + len(chunk)
+            self._dirty(bf)
+
+    def set_done(self, path, task, done):
+        self.set_done_many(path, [task], done)
+
+    def set_done_many(self, path, tasks, done):
+        with self._lock:
+            bf = self._open(path)
+            if any(bf.tf.at(t.mark) is not t for t in tasks):
+                # Tareas de una versión anterior del archivo
+                self.flush(path)
+                return taskfile.set_done_many(path, tasks, done)
+            on_disk = bf.disk[1]
+            for task in tasks:
+                if task.done != done:
+                    bf.tf.completed += 1 if done else -1
+                task.done = done
+                if task.mark < on_disk:
+                    bf.patches[task.mark] = task
+                else:
+                    bf.appended[task.mark - on_disk] = ord("x") if done else ord(" ")
+            self._dirty(bf)
+
+    def find_at(self, path, mark, text, done):
+        return self.load(path).find_at(mark, text, done)
+
+    def remove_task(self, path, task):
+        self.remove_tasks(path, [task])
+
+    def remove_tasks(self, path, tasks):
+        # Cambia la estructura del archivo: se escribe lo pendiente y se quita
+        # directamente (las tareas siguen siendo las del TaskFile adoptado)
+        if not tasks:
+            return
+        with self._lock:
+            self.flush(path)
+            taskfile.remove_tasks(path, tasks)
+
+    def moved(self, old, new):
+        # Los renombrados ya llegan con el buffer vacío (ver ProjectAgent._run_tool)
+        self.flush()
+        taskfile.moved(old, new)
+
+    def removed(self, path):
+        self.flush()
+        taskfile.removed(path)
+
+    ############### ESCRITURA ###############
+
+    def flush(self, path=None, fsync=None):
+        if fsync is None:
+            fsync = self.policy == FSYNC_PER_TURN
+        with self._lock:
+            # `path`: un archivo o la carpeta de un proyecto
+            if path is None:
+                keys = list(self.files)
+            else:
+                root = os.path.abspath(path)
+                keys = [k for k in self.files if k == root or k.startswith(root + os.sep)]
+            for key in keys:
+                bf = self.files.pop(key, None)
+                if bf is None:
+                    continue
+                if bf.dirty_since is None:
+                    # Nada que escribir: el TaskFile vuelve a la caché si sigue valiendo
+                    if _stat(bf.path) == bf.disk:
+                        taskfile.adopt(bf.tf)
+                    continue
+                if self._write(bf, fsync):
+                    taskfile.adopt(bf.tf)
+                else:
+                    self._replay(bf)
+                self.flushes += 1
+
+    def _write(self, bf, fsync):
+        # Escribe los cambios pendientes; False si el archivo ya no es el que
+        # se cargó (y entonces no se toca)
+        patches = {mark: ord("x") if task.done else ord(" ") for mark, task in bf.patches.items()}
+        if bf.appended or len(patches) != 1:
+            return textfile.patch_atomic(
+                bf.path, patches, bytes(bf.appended), expect=bf.disk, fsync=fsync
+            )
+        with open(bf.path, "r+b") as f:
+            st = os.fstat(f.fileno())
+            if (st.st_mtime_ns, st.st_size) != bf.disk:
+                return False
+            (mark, status), = patches.items()
+            f.seek(mark)
+            f.write(bytes([status]))
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        return True
+
+    def _replay(self, bf):
+        # El archivo cambió fuera del agente: se aplican los mismos cambios por
+        # texto sobre lo que haya ahora en disco
+        on_disk = bf.disk[1]
+        new = [t for t in bf.tf.tasks if t.offset >= on_disk]
+        current = taskfile.load(bf.path)
+        for done in (True, False):
+            found = [
+                current.find_at(t.mark, t.text, not done)
+                for t in bf.patches.values() if t.done == done
+            ]
+            found = [t for t in found if t is not None]
+            if found:
+                taskfile.set_done_many(bf.path, found, done)
+        if new:
+            taskfile.append_tasks(bf.path, [t.text for t in new])
+            added = taskfile.load(bf.path).tasks[-len(new):]
+            done = [t for t, old in zip(added, new) if old.done]
+            if done:
+                taskfile.set_done_many(bf.path, done, True)
+
+    def end_turn(self):
+        if self.policy != NONE:
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for bf in self.files.values() if bf.dirty_since is not None)
+
+    def stats(self):
+        return {
+            "policy": self.policy,
+            "pending_files": self.pending(),
+            "writes": self.writes,
+            "flushes": self.flushes
+        }
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _ends_with_newline(path, size):
+    with open(path, "rb") as f:
+        f.seek(size - 1)
+        return f.read(1) == b"\n"
+
+
+@atexit.register
+def _flush_all():
+    for buffer in list(_buffers):
+        buffer.flush()
+
+
+def buffer_from_env():
+    policy = os.getenv("AGENT_WRITE_BEHIND")
+    if not policy:
+        return None
+    return WriteBuffer(policy)